@@ -0,0 +1,159 @@
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+from metrics import ADMISSIONS, StageTimings
+
+# Kleine verwerkingen gaan voor, maar wie lang wacht schuift op: na elke
+# AGING_SECONDS wachten telt de kosten nog maar half zo zwaar
+AGING_SECONDS = 10
+# Aanname voor Retry-After zolang er nog geen verwerking is afgerond
+DEFAULT_SECONDS_PER_UNIT = 0.05
+MAX_RETRY_AFTER = 300
+
+
+class OverloadedError(Exception):
+    """Er is nu geen ruimte voor deze verwerking; probeer het na retry_after seconden"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_cost(article_pages: List[List[int]], outputs: int) -> int:
+    """Kosten van een verwerking: pagina's maal het aantal uitvoertypen"""
+    return max(1, sum(len(pages) for pages in article_pages)) * max(1, outputs)
+
+
+class _Waiter:
+    def __init__(self, cost: int, order: int, patient: bool):
+        self.cost = cost
+        self.order = order
+        self.patient = patient
+        self.since = time.monotonic()
+
+    def priority(self, now: float):
+        return (self.cost / (1 + (now - self.since) / AGING_SECONDS), self.order)
+
+
+class AdmissionControl:
+    """Budget voor het werk dat deze worker tegelijk in behandeling heeft
+
+    Het budget is in kosteneenheden (pagina's maal uitvoertypen). Een
+    verwerking start pas als haar kosten binnen het vrije budget passen en
+    zij de hoogste prioriteit heeft van alle wachtenden: de goedkoopste
+    eerst, met veroudering zodat grote nummers niet eeuwig blijven wachten.
+    Een verwerking die groter is dan het hele budget mag alleen draaien.
+
+    Wie niet binnen max_wait seconden aan de beurt is, of aankomt terwijl
+    er al een volledig budget aan werk met voorrang wacht, krijgt
+    OverloadedError met een geschatte Retry-After, in plaats van te blijven
+    hangen.
+
+    Het budget geldt binnen dit proces; met meerdere workers krijgt elk
+    zijn deel van het totaal (zie app.py).
+    """
+
+    def __init__(self, budget: int, max_wait: float = 5):
+        self.budget = budget
+        self.max_wait = max_wait
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiting: Dict[int, _Waiter] = {}
+        self._order = itertools.count()
+        self._seconds_per_unit = None
+        self._condition = threading.Condition()
+
+    def _clamp(self, cost: int) -> int:
+        return min(max(1, cost), self.budget)
+
+    def _waiting_cost(self) -> int:
+        return sum(waiter.cost for waiter in self._waiting.values())
+
+    def _cost_ahead(self, cost: int, now: float) -> int:
+        """Kosten van de interactieve wachtenden die vóór een nieuwe aanvraag gaan"""
+        return sum(waiter.cost for waiter in self._waiting.values()
+                   if not waiter.patient and waiter.priority(now)[0] <= cost)
+
+    def _next(self, now: float) -> _Waiter:
+        return min(self._waiting.values(), key=lambda waiter: waiter.priority(now))
+
+    def retry_after(self, cost: int) -> int:
+        """Ruwe schatting van de seconden tot er plaats is voor cost"""
+        backlog = self.in_use + self._waiting_cost() + cost - self.budget
+        seconds_per_unit = self._seconds_per_unit or DEFAULT_SECONDS_PER_UNIT
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(backlog * seconds_per_unit)))
+
+    def acquire(self, cost: int, wait: bool = True) -> int:
+        """Wacht op een plaats; geeft de gereserveerde kosten terug
+
+        Met wait=False (achtergrondtaken) wordt nooit geweigerd, maar wel in
+        de rij gewacht, zodat interactieve verzoeken voor kunnen gaan.
+        """
+        cost = self._clamp(cost)
+        with self._condition:
+            # Past het werk dat vóór ons gaat al niet in één budget, dan meteen
+            # weigeren; grotere aanvragen en achtergrondtaken tellen niet mee
+            if wait and self.in_use and \
+                    self._cost_ahead(cost, time.monotonic()) + cost > self.budget:
+                self.rejected += 1
+                ADMISSIONS.inc(result='rejected')
+                raise OverloadedError(
+                    "De server is bezet, probeer het later opnieuw", self.retry_after(cost))
+
+            waiter = _Waiter(cost, next(self._order), patient=not wait)
+            self._waiting[waiter.order] = waiter
+            deadline = time.monotonic() + self.max_wait if wait else None
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.in_use + cost <= self.budget and self._next(now) is waiter:
+                        break
+                    if deadline is not None and now >= deadline:
+                        self.rejected += 1
+                        ADMISSIONS.inc(result='timeout')
+                        raise OverloadedError(
+                            "De server is bezet, probeer het later opnieuw",
+                            self.retry_after(cost))
+                    # Prioriteiten verouderen, dus af en toe opnieuw kijken
+                    timeout = 1.0 if deadline is None else min(1.0, deadline - now)
+                    self._condition.wait(timeout)
+            finally:
+                del self._waiting[waiter.order]
+                # De volgende in de rij kan nu misschien wel
+                self._condition.notify_all()
+
+            self.in_use += cost
+            self.admitted += 1
+            ADMISSIONS.inc(result='admitted')
+        return cost
+
+    def release(self, cost: int, seconds: float = None):
+        with self._condition:
+            self.in_use -= cost
+            if seconds is not None:
+                observed = seconds / cost
+                self._seconds_per_unit = observed if self._seconds_per_unit is None \
+                    else 0.8 * self._seconds_per_unit + 0.2 * observed
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, cost: int, wait: bool = True, timings: StageTimings = None):
+        """Houd een plaats vast zolang het blok loopt; de wachttijd telt als 'admission'"""
+        with timings.time('admission') if timings else nullcontext():
+            reserved = self.acquire(cost, wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(reserved, time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {'budget': self.budget, 'in_use': self.in_use,
+                    'waiting': len(self._waiting), 'waiting_cost': self._waiting_cost(),
+                    'admitted': self.admitted, 'rejected': self.rejected}
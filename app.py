@@ -1,14 +1,32 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Response, g, render_template, request, jsonify, send_from_directory,
+                   send_file, url_for)
 import os
+import json
 import threading
-import re
+import time
 import tempfile
-import base64
-import zipfile
-import io
 import webbrowser
+from contextlib import nullcontext
 from werkzeug.utils import secure_filename
+from admission import AdmissionControl, OverloadedError, estimate_cost
+from archive import ArchiveWriter
+from derivatives import parse_presets
 from pdf_processor import PDFProcessor
+from pdf_output import PdfOutputOptions
+from ocr import OCREngine
+from result_cache import ResultCache
+from search_index import SearchIndex
+from memory_budget import MemoryBudget
+from job_queue import JobManager, QueueFullError
+from upload_stream import PDFUploadReceiver, UploadError
+from upload_store import UploadStore
+from upload_sessions import OffsetMismatchError, UploadSessionStore
+from workspace import WorkspaceManager, WorkspaceQuotaError
+from work_queue import create_work_queue
+from previews import PreviewBuilder, preview_name
+from metrics import REGISTRY, REQUEST_SECONDS, BYTES_IN, ERRORS, StageTimings
+from validation import (validate_year, validate_number, process_ranges,
+                        process_remove_pages, process_merge_indices)
 
 # Stel de template- en statische mappen in
 app = Flask(
@@ -19,106 +37,429 @@ app = Flask(
         os.path.dirname(__file__), 'static'))
 )
 
-# Max content length
-app.config['MAX_CONTENT_LENGTH'] = 40 * 1024 * 1024  # 40MB max-limit
+# Max content length; het resultaat wordt vanaf schijf gestreamd, dus de
+# limiet hoeft niet meer op het geheugen van de worker afgestemd te zijn
+MAX_UPLOAD_MB = int(os.environ.get('MAX_UPLOAD_MB', 200))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
 
 ALLOWED_EXTENSIONS = {'pdf'}
 
-# PDF voorbeeld
-pdf_processor = PDFProcessor(max_workers=os.cpu_count() or 1)
-
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Bovengrens voor de syntaxiscontrole van bereiken zolang het aantal pagina's onbekend is
+SYNTAX_ONLY_PAGES = 100000
+
+# Resultaatcache per artikel; RESULT_CACHE_MAX_MB=0 schakelt de cache uit
+RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', 1024))
+result_cache = None
+if RESULT_CACHE_MAX_MB > 0:
+    result_cache = ResultCache(
+        root=os.environ.get('RESULT_CACHE_DIR') or os.path.join(
+            tempfile.gettempdir(), 'museum_result_cache'),
+        max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024
+    )
+
+# Aantal gunicorn-workers; gunicorn leest WEB_CONCURRENCY zelf ook als
+# standaard voor --workers. De budgetten hieronder gelden voor de hele
+# service en worden over de workers verdeeld.
+WEB_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+
+# Geheugenbudget voor renders (afbeeldingen en OCR) over alle workers; elke
+# worker krijgt RASTER_MEMORY_BUDGET_MB / WEB_WORKERS en houdt zijn deel zelf
+# bij. Het aantal gelijktijdige renders past zich aan de paginagrootte aan.
+# 0 schakelt het uit.
+RASTER_MEMORY_BUDGET_MB = int(os.environ.get('RASTER_MEMORY_BUDGET_MB', 1024))
+raster_budget = None
+if RASTER_MEMORY_BUDGET_MB > 0:
+    raster_budget = MemoryBudget(RASTER_MEMORY_BUDGET_MB * 1024 * 1024 // WEB_WORKERS)
+
+# Doorzoekbare index van de artikeltekst; zet SEARCH_INDEX_PATH op een vaste
+# schijf om de index te bewaren, een lege waarde schakelt hem uit
+SEARCH_INDEX_PATH = os.environ.get(
+    'SEARCH_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'museum_search.db'))
+search_index = SearchIndex(SEARCH_INDEX_PATH) if SEARCH_INDEX_PATH else None
+SEARCH_MAX_LIMIT = 100
+
+# Werkmap per verwerking (upload, tussenbestanden, log en ZIP), na afloop
+# altijd verwijderd. WORKSPACE_ROOT=/dev/shm/museum houdt de tussenbestanden
+# in het geheugen; WORKSPACE_QUOTA_MB begrenst de grootte per verwerking (0 = geen)
+workspace_manager = WorkspaceManager(
+    root=os.environ.get('WORKSPACE_ROOT'),
+    quota_bytes=int(os.environ.get('WORKSPACE_QUOTA_MB', 2048)) * 1024 * 1024,
+    max_age=int(os.environ.get('WORKSPACE_MAX_AGE', 21600))
+)
+if workspace_manager.swept:
+    app.logger.info(f"{workspace_manager.swept} achtergebleven werkmappen opgeruimd")
 
+# Wachtrij voor PDF_EXECUTION_MODE=queue: de artikelen gaan als taken naar
+# queue_worker.py op elke host met dezelfde gedeelde opslag, bijvoorbeeld
+# WORK_QUEUE=sqlite:////gedeeld/museum/queue.db. De workers lezen het bron-PDF
+# en schrijven in de werkmap onder dezelfde paden, dus WORKSPACE_ROOT, JOB_ROOT
+# en UPLOAD_ROOT moeten dan op die gedeelde opslag staan
+WORK_QUEUE = os.environ.get('WORK_QUEUE', '')
+work_queue = create_work_queue(WORK_QUEUE) if WORK_QUEUE else None
 
-def validate_year(year):
-    """Jaarwaarde controleren"""
-    if not year:
-        return False, "Voer een geldig jaar in"
-    if not re.match(r'^\d{4}$', year):
-        return False, "Het jaar moet uit 4 cijfers bestaan (bijvoorbeeld: 2024)"
-    return True, ""
+# PDF voorbeeld
+pdf_processor = PDFProcessor(
+    max_workers=os.cpu_count() or 1,
+    render_backend=os.environ.get('PDF_RENDER_BACKEND', 'auto'),
+    execution_mode=os.environ.get('PDF_EXECUTION_MODE', 'thread'),
+    ocr_engine=OCREngine(
+        languages=os.environ.get('OCR_LANGUAGES', 'nld+eng'),
+        dpi=int(os.environ.get('OCR_DPI', 300)),
+        workers=int(os.environ.get('OCR_WORKERS', 2)),
+        page_timeout=int(os.environ.get('OCR_PAGE_TIMEOUT', 120))
+    ),
+    result_cache=result_cache,
+    # LOG_FORMAT=json schrijft het verwerkingslog als één JSON-object per regel
+    log_format=os.environ.get('LOG_FORMAT', 'text'),
+    # Bijvoorbeeld IMAGE_PRESETS=large:1024x1280,small:500x700,grid:200x200:webp:80
+    image_presets=parse_presets(os.environ.get('IMAGE_PRESETS', '')) or None,
+    memory_budget=raster_budget,
+    search_index=search_index,
+    # PDF_OUTPUT=optimized voegt identieke objecten samen en comprimeert opnieuw;
+    # daarbij verkleint PDF_IMAGE_DPI afbeeldingen en lineariseert PDF_LINEARIZE=1
+    pdf_output=PdfOutputOptions(
+        mode=os.environ.get('PDF_OUTPUT', 'copy'),
+        image_dpi=int(os.environ.get('PDF_IMAGE_DPI', 0)) or None,
+        linearize=os.environ.get('PDF_LINEARIZE') == '1'
+    ),
+    workspaces=workspace_manager,
+    work_queue=work_queue,
+    # Renders die OCR en afbeeldingen delen, per verwerking; daarboven naar
+    # de werkmap. RASTER_CACHE_MB=0 schakelt het delen uit
+    raster_cache_bytes=int(os.environ.get('RASTER_CACHE_MB', 256)) * 1024 * 1024
+)
 
+# Achtergrondtaken
+job_manager = JobManager(
+    root=os.environ.get('JOB_ROOT'),
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', 10)),
+    result_ttl=int(os.environ.get('JOB_RESULT_TTL', 3600)),
+    max_age=int(os.environ.get('JOB_MAX_AGE', 21600))
+)
 
-def validate_number(number):
-    """Valideer de getalwaarde"""
-    if not number:
-        return False, "Voer een geldig nummer in"
-    if not re.match(r'^\d{1,2}$', number):
-        return False, "Het nummer moet uit 1 of 2 cijfers bestaan (bijvoorbeeld: 1 of 01)"
-    return True, ""
+# Eerder geüploade PDF's met voorbeeldafbeeldingen; een verwerking kan er
+# met upload_id naar verwijzen in plaats van het bestand opnieuw te sturen
+upload_store = UploadStore(
+    root=os.environ.get('UPLOAD_ROOT'),
+    ttl=int(os.environ.get('UPLOAD_TTL', 86400))
+)
+# Hervatbare uploads in stukken (elk stuk binnen MAX_UPLOAD_MB), voor grote
+# scans en trage verbindingen. Het hele bestand mag UPLOAD_SESSION_MAX_MB zijn;
+# een sessie zonder nieuw stuk verloopt na UPLOAD_SESSION_TTL seconden
+upload_sessions = UploadSessionStore(
+    # Naast de uploads, zodat het afgeronde bestand verplaatst kan worden
+    root=upload_store.root / 'sessions',
+    ttl=int(os.environ.get('UPLOAD_SESSION_TTL', 86400)),
+    max_size=int(os.environ.get('UPLOAD_SESSION_MAX_MB', 2048)) * 1024 * 1024,
+    chunk_size=int(os.environ.get('UPLOAD_CHUNK_MB', 8)) * 1024 * 1024,
+    max_chunk_size=app.config['MAX_CONTENT_LENGTH']
+)
+preview_builder = PreviewBuilder(
+    pdf_processor, workers=int(os.environ.get('PREVIEW_WORKERS', 2)))
+
+# Toelating: het werk in behandeling is voor de hele service begrensd tot
+# ADMISSION_PAGE_BUDGET eenheden (pagina's maal uitvoertypen). Elke worker
+# beheert zijn eigen deel, ADMISSION_PAGE_BUDGET / WEB_WORKERS, dus een 503
+# hangt af van de worker die het verzoek krijgt. Kleine nummers gaan voor;
+# wie niet binnen ADMISSION_MAX_WAIT seconden aan de beurt is, krijgt 503
+# met Retry-After. 0 schakelt de toelating uit.
+ADMISSION_PAGE_BUDGET = int(os.environ.get('ADMISSION_PAGE_BUDGET', 2000))
+admission = None
+if ADMISSION_PAGE_BUDGET > 0:
+    admission = AdmissionControl(
+        max(1, ADMISSION_PAGE_BUDGET // WEB_WORKERS),
+        max_wait=float(os.environ.get('ADMISSION_MAX_WAIT', 5))
+    )
+
+# Aantal voorbeeldpagina's per verzoek
+PREVIEW_PAGE_LIMIT = 48
+PREVIEW_PAGE_MAX_LIMIT = 200
+
+
+# Modules die bij het opstarten bewust niet geladen worden; warm_up laadt ze vooraf
+BACKEND_MODULES = ('fitz', 'PyPDF2', 'PIL.Image', 'pdf2image', 'pytesseract', 'numpy')
+
+
+def warm_up():
+    """Laad de PDF-backends en controleer Tesseract vóór het eerste verzoek
+
+    Zonder aanroep gebeurt dit bij het eerste gebruik. Met gunicorn --preload
+    roept gunicorn.conf.py dit in de master aan, zodat alle workers de
+    geladen modules delen in plaats van ze elk opnieuw te importeren.
+    """
+    import importlib
+
+    for module in BACKEND_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            app.logger.warning(f"Backend niet beschikbaar: {module} ({e})")
+    try:
+        pdf_processor.setup_tesseract()
+    except FileNotFoundError as e:
+        app.logger.warning(f"{e} OCR van gescande pagina's zal mislukken.")
 
 
-def process_ranges(ranges_str, max_pages):
-    """Paginabereiken verwerken"""
-    if not ranges_str:
-        return [[i + 1 for i in range(max_pages)]]
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-    try:
-        ranges = []
-        parts = ranges_str.split(',')
-        for part in parts:
-            if '-' in part:
-                start, end = map(int, part.split('-'))
-                if start > end or start < 1 or end > max_pages:
-                    raise ValueError
-                ranges.append(list(range(start, end + 1)))
-            else:
-                page = int(part)
-                if page < 1 or page > max_pages:
-                    raise ValueError
-                ranges.append([page])
-        return ranges
-    except ValueError:
-        raise ValueError(
-            "Ongeldige paginabereiken. Gebruik het formaat: 1-3,4,5-6")
-
-
-def process_remove_pages(remove_str, max_pages):
-    """Te verwijderen procespagina's"""
-    if not remove_str:
-        return []
 
+def process_to_archive(document, params, zip_path, workspace, progress_callback=None,
+                       timings=None):
+    """Verwerk het PDF in workspace en schrijf de uitvoer naar een ZIP-archief
+
+    Bestanden gaan het archief in zodra hun artikel klaar is, terwijl de
+    overige artikelen nog verwerkt worden. Geeft de uitvoerbestanden terug.
+    """
+    with ArchiveWriter(zip_path, f"output{params['year']}{params['number']}",
+                       progress_callback, timings) as archive:
+        output_files = pdf_processor.process_pdf(
+            document=document,
+            pages_to_remove=params['remove_pages'],
+            article_ranges=params['article_ranges'],
+            merge_article_indices=params['merge_indices'],
+            year=params['year'],
+            number=params['number'],
+            progress_callback=progress_callback,
+            timings=timings,
+            on_output=archive.add_files,
+            workspace=workspace
+        )
+        archive.add_files('log', output_files.get('log', []))
+    return output_files
+
+
+def admitted(params, page_count, timings, wait=True):
+    """Plaats binnen het toelatingsbudget, naar de kosten van deze verwerking"""
+    if admission is None:
+        return nullcontext()
+    ranges = params['article_ranges'] or [list(range(1, page_count + 1))]
+    removals = params['remove_pages'] or []
+    article_pages = [[page for page in page_range if page not in removals]
+                     for page_range in ranges]
+    # PDF, tekst en een afbeelding per preset
+    outputs = 2 + len(pdf_processor.image_presets)
+    return admission.admit(estimate_cost(article_pages, outputs), wait, timings)
+
+
+def log_timings(label, timings):
+    app.logger.info(f"Tijden {label}: {json.dumps(timings.as_dict(), sort_keys=True)}")
+
+
+def _remove_quietly(path):
     try:
-        pages = [int(x.strip()) for x in remove_str.split(',') if x.strip()]
-        if any(p < 1 or p > max_pages for p in pages):
-            raise ValueError
-        return pages
-    except ValueError:
-        raise ValueError(
-            "Ongeldige pagina's om te verwijderen. Gebruik komma's om pagina's te scheiden")
+        os.remove(path)
+    except OSError:
+        pass
 
 
-def process_merge_indices(merge_str):
-    """Samengevoegde indexen verwerken"""
-    if not merge_str:
-        return None
+def run_processing_job(job, document, params, timings):
+    """Voer de PDF-verwerking uit voor een achtergrondtaak"""
+    # Het ZIP blijft in de taakmap; de tussenbestanden gaan met de werkmap weg
+    with workspace_manager.create() as workspace:
+        try:
+            zip_name = f"output{params['year']}{params['number']}.zip"
+            # Achtergrondtaken wachten zonder limiet, maar laten kleinere voorgaan
+            with admitted(params, document.page_count, timings, wait=False):
+                process_to_archive(
+                    document, params, job.workdir / zip_name, workspace,
+                    progress_callback=job.update_progress, timings=timings)
+            return zip_name
+
+        finally:
+            job.set_timings(timings.as_dict())
+            log_timings(f"taak {job.id}", timings)
+            document.close()
+            _remove_quietly(document.path)
+
+
+def check_received_fields(fields, page_count=None):
+    """Controleer de velden die tijdens het ontvangen al binnen zijn
+
+    Ontbrekende velden tellen hier niet; die kunnen nog na het bestand
+    komen en worden pas na de hele upload door parse_form_fields geëist.
+    Zolang page_count onbekend is, wordt alleen de syntaxis van de bereiken
+    gecontroleerd.
+    """
+    if 'year' in fields:
+        year_valid, year_error = validate_year(fields['year'])
+        if not year_valid:
+            raise ValueError(year_error)
 
+    if 'number' in fields:
+        number_valid, number_error = validate_number(fields['number'])
+        if not number_valid:
+            raise ValueError(number_error)
+
+    max_pages = page_count or SYNTAX_ONLY_PAGES
+    if fields.get('article_ranges'):
+        process_ranges(fields['article_ranges'], max_pages)
+    if fields.get('remove_pages'):
+        process_remove_pages(fields['remove_pages'], max_pages)
+    if fields.get('merge_ranges'):
+        process_merge_indices(fields['merge_ranges'])
+
+
+def parse_form_fields(fields, total_pages):
+    """Valideer de volledige formuliervelden en zet ze om naar verwerkingsparameters"""
+    year_valid, year_error = validate_year(fields.get('year', ''))
+    if not year_valid:
+        raise ValueError(year_error)
+
+    number_valid, number_error = validate_number(fields.get('number', ''))
+    if not number_valid:
+        raise ValueError(number_error)
+
+    return {
+        'year': fields['year'],
+        'number': fields['number'],
+        'article_ranges': process_ranges(
+            fields.get('article_ranges', ''), total_pages),
+        'remove_pages': process_remove_pages(
+            fields.get('remove_pages', ''), total_pages),
+        'merge_indices': process_merge_indices(
+            fields.get('merge_ranges', '')),
+    }
+
+
+def check_upload_length():
+    """Weiger een te grote upload voordat er iets gelezen wordt
+
+    request.stream slaat de MAX_CONTENT_LENGTH-controle van Flask over; die
+    draait alleen bij het parsen van formulierdata.
+    """
+    length = request.content_length
+    if length is None:
+        raise UploadError('De grootte van de upload ontbreekt', 413)
+    if length > app.config['MAX_CONTENT_LENGTH']:
+        raise UploadError(f"Het bestand is groter dan {MAX_UPLOAD_MB} MB", 413)
+
+
+def receive_pdf_upload(filepath, timings):
+    """Stream de upload in stukken naar filepath en valideer zo vroeg mogelijk
+
+    Zonder bestand moet het formulier een upload_id van POST /uploads
+    bevatten; die upload wordt dan naar filepath gelinkt.
+    """
+    check_upload_length()
+    receiver = PDFUploadReceiver(
+        filepath,
+        validate=check_received_fields,
+        allowed_file=allowed_file,
+        file_optional=True,
+        max_size=app.config['MAX_CONTENT_LENGTH']
+    )
+    with timings.time('upload'):
+        upload = receiver.receive(request.stream, request.content_type)
+        if upload.path is None:
+            return use_stored_upload(upload, filepath)
+    BYTES_IN.inc(upload.size)
+    return upload
+
+
+def use_stored_upload(upload, filepath):
+    """Vul upload aan met het eerder geüploade bestand uit het formulier"""
+    upload_id = upload.fields.get('upload_id', '').strip()
+    if not upload_id:
+        raise UploadError('Er is geen bestand geüpload')
+    meta = upload_store.get(upload_id)
+    if meta is None:
+        raise UploadError('Onbekende of verlopen upload', 404)
+
+    upload_store.link_into(upload_id, filepath)
+    upload.path = filepath
+    upload.filename = meta['filename']
+    upload.sha256 = upload_id
+    upload.size = meta['size']
+    upload.page_count_hint = meta['page_count']
+    return upload
+
+
+def open_uploaded_document(upload, timings):
+    """Parse het geüploade PDF één keer, ook voor de verwerking"""
+    with timings.time('parse'):
+        document = pdf_processor.open_document(
+            upload.path, content_hash=upload.sha256)
+        try:
+            params = parse_form_fields(upload.fields, document.page_count)
+        except Exception:
+            document.close()
+            raise
+    return document, params
+
+
+def count_error(e):
+    """Tel een mislukt verzoek onder de stap waarin het misging"""
+    if isinstance(e, UploadError):
+        ERRORS.inc(stage='upload')
+    elif isinstance(e, ValueError):
+        ERRORS.inc(stage='validation')
+    elif isinstance(e, QueueFullError):
+        ERRORS.inc(stage='queue')
+    elif isinstance(e, WorkspaceQuotaError):
+        ERRORS.inc(stage='workspace')
+    elif isinstance(e, OverloadedError):
+        ERRORS.inc(stage='admission')
+    else:
+        ERRORS.inc(stage='request')
+
+
+def overloaded_response(e):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                endpoint=request.endpoint or 'unknown',
+                                status=response.status_code)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Metrics in het Prometheus-tekstformaat"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Zoek in de tekst van alle verwerkte artikelen"""
+    if search_index is None:
+        return jsonify({'error': 'De zoekindex is uitgeschakeld'}), 503
+
+    started = time.perf_counter()
+    limit = min(max(1, request.args.get('limit', 20, type=int)), SEARCH_MAX_LIMIT)
+    offset = max(0, request.args.get('offset', 0, type=int))
     try:
-        indices = [int(x.strip()) for x in merge_str.split(',') if x.strip()]
-        if len(indices) < 2:
-            raise ValueError
-        return indices
-    except ValueError:
-        raise ValueError(
-            "Ongeldige samenvoegingsindices. Gebruik komma's om artikelen te scheiden")
+        hits = search_index.search(request.args.get('q', ''),
+                                   year=request.args.get('year') or None,
+                                   limit=limit, offset=offset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'query': request.args.get('q', ''),
+        'hits': hits,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
 
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         try:
-            if 'pdf_file' not in request.files:
-                return render_template('index.html', error='Er is geen bestand geselecteerd')
-
-            file = request.files['pdf_file']
-            if file.filename == '':
-                return render_template('index.html', error='Er is geen bestand geselecteerd')
-
-            if not file.filename.endswith('.pdf'):
-                return render_template('index.html', error='Alleen PDF-bestanden zijn toegestaan')
-
             return upload_file()
 
         except Exception as e:
@@ -127,114 +468,358 @@ def index():
     return render_template('index.html')
 
 
+@app.context_processor
+def inject_upload_limit():
+    return {'max_upload_mb': MAX_UPLOAD_MB}
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    workspace = workspace_manager.create()
+    document = None
+    streaming = False
+    timings = StageTimings()
     try:
-        if 'pdf_file' not in request.files:
-            return jsonify({'error': 'Er is geen bestand geüpload'}), 400
+        upload = receive_pdf_upload(str(workspace.path / 'input.pdf'), timings)
+        document, params = open_uploaded_document(upload, timings)
+
+        # ZIP-archief in de werkmap, gevuld tijdens de verwerking en daarna
+        # gestreamd naar de client
+        zip_path = workspace.path / 'result.zip'
+        with admitted(params, document.page_count, timings):
+            process_to_archive(document, params, zip_path, workspace, timings=timings)
+        log_timings('/upload', timings)
+
+        response = send_file(
+            zip_path, mimetype='application/zip', as_attachment=True,
+            download_name=f"output{params['year']}{params['number']}.zip")
+        # De werkmap pas verwijderen als het ZIP verstuurd is; met
+        # direct_passthrough roept Werkzeug de close-callbacks nooit aan
+        response.direct_passthrough = False
+        response.call_on_close(workspace.remove)
+        streaming = True
+        return response
+
+    except UploadError as e:
+        count_error(e)
+        return jsonify({'error': e.message}), e.status
+    except ValueError as e:
+        count_error(e)
+        return jsonify({'error': str(e)}), 400
+    except WorkspaceQuotaError as e:
+        count_error(e)
+        return jsonify({'error': str(e)}), 507
+    except OverloadedError as e:
+        count_error(e)
+        return overloaded_response(e)
+    except Exception as e:
+        count_error(e)
+        return jsonify({'error': f'Verwerkingsfout: {str(e)}'}), 500
 
-        file = request.files['pdf_file']
-        if file.filename == '':
-            return jsonify({'error': 'Er is geen bestand geselecteerd'}), 400
+    finally:
+        # Cleanup
+        if document is not None:
+            document.close()
+        if not streaming:
+            workspace.remove()
 
-        # Year and number validation
-        year = request.form.get('year', '')
-        number = request.form.get('number', '')
 
-        year_valid, year_error = validate_year(year)
-        if not year_valid:
-            return jsonify({'error': year_error}), 400
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """Sla een PDF op voor hergebruik en begin met de voorbeeldafbeeldingen"""
+    filepath = upload_store.spool_path()
+    try:
+        check_upload_length()
+        receiver = PDFUploadReceiver(filepath, allowed_file=allowed_file,
+                                     max_size=app.config['MAX_CONTENT_LENGTH'])
+        upload = receiver.receive(request.stream, request.content_type)
+        BYTES_IN.inc(upload.size)
+        return store_upload(filepath, upload.sha256, upload.filename, upload.size)
+
+    except UploadError as e:
+        count_error(e)
+        _remove_quietly(filepath)
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        count_error(e)
+        _remove_quietly(filepath)
+        return jsonify({'error': f'Het PDF-bestand kan niet worden gelezen: {str(e)}'}), 400
 
-        number_valid, number_error = validate_number(number)
-        if not number_valid:
-            return jsonify({'error': number_error}), 400
-
-        if file and allowed_file(file.filename):
-            try:
-                # Temporary file creation
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    file.save(temp_file.name)
-                    filepath = temp_file.name
-
-                    # PDF reader and page count
-                    reader = pdf_processor.get_pdf_reader(filepath)
-                    total_pages = len(reader.pages)
-
-                    try:
-                        # Process form data
-                        article_ranges = process_ranges(
-                            request.form.get('article_ranges', ''), total_pages)
-                        remove_pages = process_remove_pages(
-                            request.form.get('remove_pages', ''), total_pages)
-                        merge_indices = process_merge_indices(
-                            request.form.get('merge_ranges', ''))
-                    except ValueError as e:
-                        return jsonify({'error': str(e)}), 400
-
-                    # PDF Processing
-                    output_files = pdf_processor.process_pdf(
-                        input_pdf=filepath,
-                        pages_to_remove=remove_pages,
-                        article_ranges=article_ranges,
-                        merge_article_indices=merge_indices,
-                        year=year,
-                        number=number
-                    )
-
-                    # ZIP files
-                    memory_file = io.BytesIO()
-                    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-                        for file_type, file_list in output_files.items():
-                            for file_path in file_list:
-                                arcname = f"output{year}{number}/{file_type}/{os.path.basename(file_path)}"
-                                zf.write(file_path, arcname)
-
-                    memory_file.seek(0)
-                    zip_data = base64.b64encode(
-                        memory_file.getvalue()).decode('utf-8')
-
-                    return jsonify({
-                        'success': True,
-                        'message': 'Bestand is succesvol verwerkt',
-                        'zip_file': {
-                            'name': f'output{year}{number}.zip',
-                            'data': zip_data
-                        },
-                        'sound': 'notification.mp3'
-                    })
-
-            except Exception as e:
-                return jsonify({'error': f'Verwerkingsfout: {str(e)}'}), 500
-
-            finally:
-                # Cleanup
-                if 'filepath' in locals():
-                    try:
-                        os.remove(filepath)
-                    except:
-                        pass
-                if 'output_files' in locals():
-                    for file_list in output_files.values():
-                        for file_path in file_list:
-                            try:
-                                os.remove(file_path)
-                            except:
-                                pass
-
-        return jsonify({'error': 'Niet-toegestaan bestandstype'}), 400
 
+def store_upload(filepath, sha256, filename, size):
+    """Neem een ontvangen PDF op en begin met de voorbeeldafbeeldingen"""
+    document = pdf_processor.open_document(filepath, content_hash=sha256)
+    try:
+        page_count = document.page_count
+    finally:
+        document.close()
+
+    upload_id = upload_store.add(filepath, sha256, filename, size, page_count)
+    preview_builder.build_all(upload_id, upload_store.pdf_path(upload_id),
+                              upload_store.preview_dir(upload_id), page_count)
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'filename': filename,
+        'page_count': page_count,
+        'pages_url': url_for('upload_pages', upload_id=upload_id)
+    }), 201
+
+
+def session_error(e):
+    """Foutantwoord voor een uploadsessie; bij 409 met de offset om te hervatten"""
+    count_error(e)
+    body = {'error': e.message}
+    if isinstance(e, OffsetMismatchError):
+        body.update(offset=e.offset, chunks=e.chunks)
+    return jsonify(body), e.status
+
+
+def describe_session(state):
+    """Sessiestatus; stukken gaan naar <url>/chunks/<nummer>, afronden via <url>/complete"""
+    return {**upload_sessions.describe(state),
+            'url': url_for('get_upload_session', session_id=state['id'])}
+
+
+@app.route('/uploads/sessions', methods=['POST'])
+def create_upload_session():
+    """Begin een upload in stukken: {"filename": ..., "size": bytes}"""
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename') or '')
+    try:
+        if not allowed_file(filename):
+            raise UploadError('Niet-toegestaan bestandstype')
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            raise UploadError('Geef de bestandsgrootte in bytes op')
+        state = upload_sessions.create(filename, size)
+    except UploadError as e:
+        return session_error(e)
+    return jsonify(describe_session(state)), 201
+
+
+@app.route('/uploads/sessions/<session_id>', methods=['GET'])
+def get_upload_session(session_id):
+    """Bevestigde offset, om na een onderbreking te hervatten"""
+    try:
+        state = upload_sessions.get(session_id)
+    except UploadError as e:
+        return session_error(e)
+    return jsonify(describe_session(state))
+
+
+@app.route('/uploads/sessions/<session_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(session_id, index):
+    """Ontvang stuk index; Upload-Offset en X-Chunk-SHA256 zijn verplicht"""
+    try:
+        if request.content_length is None:
+            raise UploadError('Content-Length ontbreekt', 411)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise UploadError('Upload-Offset ontbreekt of is ongeldig')
+        state = upload_sessions.put_chunk(
+            session_id, index, offset, request.content_length, request.stream,
+            request.headers.get('X-Chunk-SHA256'))
+    except UploadError as e:
+        return session_error(e)
+    BYTES_IN.inc(request.content_length)
+    return jsonify(describe_session(state))
+
+
+@app.route('/uploads/sessions/<session_id>/complete', methods=['POST'])
+def complete_upload_session(session_id):
+    """Rond de upload af; het antwoord is gelijk aan dat van POST /uploads"""
+    data = request.get_json(silent=True) or {}
+    try:
+        path, sha256, state = upload_sessions.finish(session_id, data.get('sha256'))
+    except UploadError as e:
+        return session_error(e)
+
+    try:
+        # store_upload verplaatst het bestand naar de uploads
+        return store_upload(str(path), sha256, state['filename'], state['size'])
     except Exception as e:
-        return jsonify({'error': f'Onverwachte fout: {str(e)}'}), 500
+        count_error(e)
+        return jsonify({'error': f'Het PDF-bestand kan niet worden gelezen: {str(e)}'}), 400
+    finally:
+        upload_sessions.remove(session_id)
+
+
+@app.route('/uploads/sessions/<session_id>', methods=['DELETE'])
+def delete_upload_session(session_id):
+    try:
+        upload_sessions.get(session_id)
+    except UploadError as e:
+        return session_error(e)
+    upload_sessions.remove(session_id)
+    return '', 204
+
+
+@app.route('/uploads/<upload_id>/pages', methods=['GET'])
+def upload_pages(upload_id):
+    """Gepagineerde lijst van voorbeeldafbeeldingen van een upload"""
+    meta = upload_store.get(upload_id)
+    if meta is None:
+        return jsonify({'error': 'Onbekende of verlopen upload'}), 404
+
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', PREVIEW_PAGE_LIMIT, type=int)
+    limit = min(max(1, limit), PREVIEW_PAGE_MAX_LIMIT)
+    page_count = meta['page_count']
+    preview_dir = upload_store.preview_dir(upload_id)
+
+    pages = []
+    for page_index in range(offset, min(offset + limit, page_count)):
+        page = page_index + 1
+        pages.append({
+            'page': page,
+            'url': url_for('upload_page_image', upload_id=upload_id, page=page),
+            'ready': (preview_dir / preview_name(page_index)).is_file()
+        })
+
+    next_url = None
+    if offset + limit < page_count:
+        next_url = url_for('upload_pages', upload_id=upload_id,
+                           offset=offset + limit, limit=limit)
+    return jsonify({
+        'upload_id': upload_id,
+        'page_count': page_count,
+        'pages': pages,
+        'next': next_url
+    })
+
+
+@app.route('/uploads/<upload_id>/pages/<int:page>.jpg', methods=['GET'])
+def upload_page_image(upload_id, page):
+    """Voorbeeldafbeelding van één pagina; wordt zo nodig direct gerenderd"""
+    meta = upload_store.get(upload_id)
+    if meta is None:
+        return jsonify({'error': 'Onbekende of verlopen upload'}), 404
+    if not 1 <= page <= meta['page_count']:
+        return jsonify({'error': 'Pagina bestaat niet'}), 404
+
+    path = preview_builder.ensure_page(upload_store.pdf_path(upload_id),
+                                       upload_store.preview_dir(upload_id), page - 1)
+    if not path.is_file():
+        return jsonify({'error': 'De pagina kan niet worden weergegeven'}), 500
+    # De upload_id is de hash van het bestand, dus de afbeelding verandert nooit
+    return send_file(path, mimetype='image/jpeg', max_age=86400)
+
+
+@app.route('/uploads/<upload_id>/analysis', methods=['GET'])
+def upload_analysis(upload_id):
+    """Voorstel voor te verwijderen pagina's: blanco en dubbele pagina's"""
+    meta = upload_store.get(upload_id)
+    if meta is None:
+        return jsonify({'error': 'Onbekende of verlopen upload'}), 404
+
+    # NumPy pas laden als er echt geanalyseerd wordt
+    from page_analysis import ANALYSIS_VERSION, analyze_document
+
+    analysis_path = upload_store.analysis_path(upload_id)
+    try:
+        with open(analysis_path, encoding='utf-8') as f:
+            analysis = json.load(f)
+        if analysis.get('version') == ANALYSIS_VERSION:
+            return jsonify(analysis)
+    except (OSError, ValueError):
+        pass
+
+    started = time.perf_counter()
+    executor = None
+    if pdf_processor.execution_mode == 'process':
+        executor = pdf_processor.get_process_pool()
+    analysis = analyze_document(str(upload_store.pdf_path(upload_id)), meta['page_count'],
+                                pdf_processor.render_backend, executor)
+    analysis['took_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    tmp_path = analysis_path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f)
+    os.replace(tmp_path, analysis_path)
+    return jsonify(analysis)
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Sla de upload op en plan de verwerking in de achtergrond in"""
+    job = job_manager.create_job()
+    document = None
+    timings = StageTimings()
+    try:
+        filepath = str(job.workdir / 'input.pdf')
+        upload = receive_pdf_upload(filepath, timings)
+        job.update_progress('upload', 1, 1)
 
+        document, params = open_uploaded_document(upload, timings)
 
-def open_browser():
+        job_manager.submit(
+            job, lambda j: run_processing_job(j, document, params, timings))
+
+    except Exception as e:
+        count_error(e)
+        if document is not None:
+            document.close()
+        job_manager.discard(job)
+        if isinstance(e, UploadError):
+            return jsonify({'error': e.message}), e.status
+        if isinstance(e, ValueError):
+            return jsonify({'error': str(e)}), 400
+        if isinstance(e, QueueFullError):
+            return jsonify({'error': str(e)}), 503
+        return jsonify({'error': f'Verwerkingsfout: {str(e)}'}), 500
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id)
+    }), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status en voortgang van een taak"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Taak niet gevonden'}), 404
+
+    status = job.to_dict()
+    if job.status == 'done':
+        status['result_url'] = url_for('job_result', job_id=job.id)
+        status['sound'] = 'notification.mp3'
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Download het ZIP-archief van een afgeronde taak"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Taak niet gevonden'}), 404
+
+    if job.status != 'done' or not job.result_path.is_file():
+        return jsonify({'error': 'Het resultaat is nog niet beschikbaar'}), 409
+
+    return send_file(job.result_path, mimetype='application/zip',
+                     as_attachment=True, download_name=job.result_name)
+
+
+def open_browser(port):
     """Open de standaardbrowser naar de webapp."""
     webbrowser.open(f'http://127.0.0.1:{port}')
 
 
-if __name__ == '__main__':
+def main():
+    """Start de webapp op PORT en open lokaal de browser."""
     port = int(os.environ.get('PORT', 10010))
     if os.environ.get('RENDER') is None:
-        threading.Timer(1, open_browser).start()
+        threading.Timer(1, open_browser, args=(port,)).start()
 
     app.run(host='0.0.0.0', port=port)
+
+
+if __name__ == '__main__':
+    main()
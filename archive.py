@@ -0,0 +1,116 @@
+import os
+import queue
+import threading
+import time
+import zipfile
+import zlib
+from typing import Callable, List
+
+from metrics import StageTimings, BYTES_OUT
+
+
+# Al gecomprimeerde afbeeldingen worden opgeslagen; deflate levert daar
+# vrijwel niets op. Tekst (.txt, .log) en al het andere wordt gecomprimeerd.
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+# PDF's zijn alleen gecomprimeerd als hun streams dat zijn; een steekproef beslist
+SAMPLED_EXTENSIONS = {'.pdf'}
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_MIN_RATIO = 0.9
+
+
+def compression_for(path: str) -> int:
+    """Compressie voor één bestand op basis van de extensie"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    if extension in SAMPLED_EXTENSIONS:
+        with open(path, 'rb') as f:
+            sample = f.read(SAMPLE_SIZE)
+        if sample and len(zlib.compress(sample, 1)) > SAMPLE_MIN_RATIO * len(sample):
+            return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class ArchiveWriter:
+    """ZIP-archief dat bestanden toevoegt zodra ze klaar zijn
+
+    add() zet een bestand in de wachtrij en keert meteen terug; een eigen
+    thread schrijft het archief, zodat comprimeren gelijk oploopt met het
+    verwerken van de volgende artikelen. close() wacht tot alles is
+    geschreven en geeft een fout uit de schrijfthread door.
+    """
+
+    _DONE = object()
+
+    def __init__(self, zip_path, folder: str,
+                 progress_callback: Callable[[str, int, int], None] = None,
+                 timings: StageTimings = None):
+        self.zip_path = zip_path
+        self.folder = folder
+        self.progress_callback = progress_callback
+        self.timings = timings if timings is not None else StageTimings()
+        self.added = 0
+        self.written = 0
+        self._queue = queue.Queue()
+        self._error = None
+        self._closed = False
+        self._zip = zipfile.ZipFile(zip_path, 'w')
+        self._thread = threading.Thread(
+            target=self._run, name='archive', daemon=True)
+        self._thread.start()
+
+    def add(self, file_type: str, file_path: str):
+        """Voeg één bestand toe onder <folder>/<file_type>/"""
+        self.added += 1
+        self._queue.put((file_type, file_path))
+
+    def add_files(self, file_type: str, file_paths: List[str]):
+        for file_path in file_paths:
+            self.add(file_type, file_path)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            if self._error is not None:
+                continue
+            file_type, file_path = item
+            try:
+                start = time.perf_counter()
+                arcname = f"{self.folder}/{file_type}/{os.path.basename(file_path)}"
+                self._zip.write(file_path, arcname,
+                                compress_type=compression_for(file_path))
+                self.timings.add('archive', time.perf_counter() - start)
+            except Exception as e:
+                # Verder lezen tot het einde, zodat close() niet blijft hangen
+                self._error = e
+                continue
+            self.written += 1
+            if self.progress_callback:
+                self.progress_callback('archive', self.written, self.added)
+
+    def close(self):
+        """Wacht tot alle bestanden zijn geschreven en sluit het archief"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._DONE)
+        self._thread.join()
+        self._zip.close()
+        if self._error is not None:
+            raise self._error
+        BYTES_OUT.inc(os.path.getsize(self.zip_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # De oorspronkelijke fout is belangrijker dan een fout bij het afsluiten
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,285 @@
+"""Batchverwerking van een map met PDF's of een manifest met nummers.
+
+Gebruik:
+    python batch.py <map|manifest.csv|manifest.json> --output <map> [opties]
+
+Een map wordt doorzocht op bestanden als 2012_02.pdf of 201202.pdf; jaar en
+nummer komen dan uit de bestandsnaam en elk nummer wordt als één artikel
+verwerkt. Een manifest (CSV met kopregel of JSON-lijst) bevat per nummer de
+velden file, year, number en optioneel ranges, removals en merges, in
+dezelfde notatie als het webformulier.
+
+Alle nummers delen één pool van workerprocessen. Een nummer waarvan de
+uitvoermap al compleet is (summary.json met status 'done') wordt
+overgeslagen, tenzij --force is opgegeven. Mislukt zo'n herhaling, dan blijft
+de complete uitvoer staan en komt de fout in <nummer>.failed.json ernaast.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from derivatives import parse_presets
+from memory_budget import MemoryBudget
+from metrics import StageTimings
+from ocr import OCREngine
+from pdf_output import PDF_OUTPUT_MODES, PdfOutputOptions
+from pdf_processor import PDFProcessor
+from search_index import SearchIndex
+from workspace import WorkspaceManager
+from work_queue import create_work_queue
+from validation import (validate_year, validate_number, process_ranges,
+                        process_remove_pages, process_merge_indices)
+
+
+FILENAME_PATTERN = re.compile(r'^(\d{4})[-_ ]?(\d{1,2})\D*\.pdf$', re.IGNORECASE)
+SUMMARY_FILE = 'summary.json'
+
+
+class Issue:
+    """Eén te verwerken nummer uit de map of het manifest"""
+
+    def __init__(self, file, year, number, ranges='', removals='', merges=''):
+        self.file = Path(file)
+        self.year = str(year).strip()
+        self.number = str(number).strip()
+        self.ranges = (ranges or '').strip()
+        self.removals = (removals or '').strip()
+        self.merges = (merges or '').strip()
+
+    @property
+    def name(self):
+        return f"output{self.year}{self.number}"
+
+
+def load_issues(source: Path):
+    """Lees de nummers uit een map of een CSV/JSON-manifest"""
+    if source.is_dir():
+        issues = []
+        for path in sorted(source.iterdir()):
+            match = FILENAME_PATTERN.match(path.name)
+            if match:
+                issues.append(Issue(path, match.group(1), match.group(2)))
+            elif path.suffix.lower() == '.pdf':
+                print(f"Overgeslagen (jaar/nummer niet in bestandsnaam): {path.name}")
+        return issues
+
+    if source.suffix.lower() == '.json':
+        with open(source, encoding='utf-8') as f:
+            rows = json.load(f)
+    elif source.suffix.lower() == '.csv':
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Onbekend manifestformaat: {source}")
+
+    issues = []
+    for row in rows:
+        path = Path(row['file'])
+        if not path.is_absolute():
+            path = source.parent / path
+        issues.append(Issue(path, row['year'], row['number'], row.get('ranges'),
+                            row.get('removals'), row.get('merges')))
+    return issues
+
+
+def is_complete(issue_dir: Path) -> bool:
+    try:
+        with open(issue_dir / SUMMARY_FILE, encoding='utf-8') as f:
+            return json.load(f).get('status') == 'done'
+    except (OSError, ValueError):
+        return False
+
+
+def process_issue(processor: PDFProcessor, issue: Issue, output_root: Path):
+    """Verwerk één nummer en schrijf de uitvoer plus summary.json"""
+    issue_dir = output_root / issue.name
+    partial_dir = output_root / f".{issue.name}.partial"
+    timings = {}
+    stage_timings = StageTimings()
+    summary = {'file': str(issue.file), 'year': issue.year, 'number': issue.number}
+    started = time.perf_counter()
+    workspace = processor.workspaces.create()
+
+    try:
+        for valid, error in (validate_year(issue.year), validate_number(issue.number)):
+            if not valid:
+                raise ValueError(error)
+
+        stage_start = time.perf_counter()
+        document = processor.open_document(str(issue.file))
+        total_pages = document.page_count
+        timings['parse'] = time.perf_counter() - stage_start
+
+        with document:
+            article_ranges = process_ranges(issue.ranges, total_pages)
+            remove_pages = process_remove_pages(issue.removals, total_pages)
+            merge_indices = process_merge_indices(issue.merges)
+
+            stage_start = time.perf_counter()
+            output_files = processor.process_pdf(
+                document=document,
+                pages_to_remove=remove_pages,
+                article_ranges=article_ranges,
+                merge_article_indices=merge_indices,
+                year=issue.year,
+                number=issue.number,
+                timings=stage_timings,
+                workspace=workspace
+            )
+            timings['process'] = time.perf_counter() - stage_start
+
+        # Eerst naar een tijdelijke map, zodat een half nummer nooit als compleet geldt
+        stage_start = time.perf_counter()
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        for file_type, file_list in output_files.items():
+            (partial_dir / file_type).mkdir(parents=True, exist_ok=True)
+            for file_path in file_list:
+                shutil.move(file_path, partial_dir / file_type / os.path.basename(file_path))
+        timings['store'] = time.perf_counter() - stage_start
+
+        summary.update({
+            'status': 'done',
+            'pages': total_pages,
+            'articles': len(output_files.get('pdf', [])),
+            'files': {file_type: len(file_list) for file_type, file_list in output_files.items()},
+        })
+
+    except Exception as e:
+        summary.update({'status': 'failed', 'error': str(e)})
+        shutil.rmtree(partial_dir, ignore_errors=True)
+
+    finally:
+        # De werkmap van process_pdf altijd opruimen, ook na een fout
+        workspace.remove()
+
+    timings['total'] = time.perf_counter() - started
+    summary['timings'] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    summary['stages'] = stage_timings.as_dict()
+
+    failed_file = output_root / f"{issue.name}.failed.json"
+    if summary['status'] == 'failed':
+        if is_complete(issue_dir):
+            # Een eerdere complete uitvoer (bij --force) blijft staan; de fout komt ernaast
+            with open(failed_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            return summary
+        issue_dir.mkdir(parents=True, exist_ok=True)
+        with open(issue_dir / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    # Alleen een geslaagde verwerking vervangt de vorige uitvoer
+    with open(partial_dir / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    shutil.rmtree(issue_dir, ignore_errors=True)
+    os.rename(partial_dir, issue_dir)
+    if failed_file.exists():
+        failed_file.unlink()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verwerk een map of manifest met museumbulletins in één keer.")
+    parser.add_argument('source', type=Path,
+                        help="map met PDF's of een CSV/JSON-manifest")
+    parser.add_argument('--output', type=Path, required=True,
+                        help="uitvoermap; per nummer een submap output<jaar><nummer>")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="grootte van de gedeelde workerpool")
+    parser.add_argument('--issues', type=int, default=2,
+                        help="aantal nummers dat tegelijk wordt ingepland")
+    parser.add_argument('--mode', choices=PDFProcessor.EXECUTION_MODES, default='process',
+                        help="uitvoeringsmodus van PDFProcessor")
+    parser.add_argument('--work-queue', default=None,
+                        help="wachtrij voor --mode queue, bijvoorbeeld sqlite:////gedeeld/queue.db")
+    parser.add_argument('--render-backend', default='auto')
+    parser.add_argument('--ocr-workers', type=int, default=2)
+    parser.add_argument('--image-presets', type=parse_presets, default=None,
+                        help="bijvoorbeeld large:1024x1280,small:500x700,grid:200x200:webp:80")
+    parser.add_argument('--log-format', choices=('text', 'json'), default='text',
+                        help="formaat van het verwerkingslog per nummer")
+    parser.add_argument('--memory-budget-mb', type=int, default=1024,
+                        help="geheugenbudget voor renders, gedeeld door alle nummers (0 = geen)")
+    parser.add_argument('--raster-cache-mb', type=int, default=256,
+                        help="geheugen per nummer voor renders die OCR en afbeeldingen delen (0 = niet delen)")
+    parser.add_argument('--pdf-output', choices=PDF_OUTPUT_MODES, default='copy',
+                        help="'optimized' voegt identieke objecten samen en comprimeert opnieuw")
+    parser.add_argument('--pdf-image-dpi', type=int, default=None,
+                        help="verklein afbeeldingen in de artikel-PDF's tot deze DPI (met optimized)")
+    parser.add_argument('--pdf-linearize', action='store_true',
+                        help="lineariseer de artikel-PDF's voor snelle webweergave (met optimized)")
+    parser.add_argument('--search-index', type=Path, default=None,
+                        help="SQLite-bestand waarin de artikeltekst doorzoekbaar wordt opgeslagen")
+    parser.add_argument('--workspace-root', default=None,
+                        help="map voor de werkmappen per nummer, bijvoorbeeld /dev/shm/museum")
+    parser.add_argument('--workspace-quota-mb', type=int, default=0,
+                        help="maximale grootte van de werkmap per nummer (0 = geen)")
+    parser.add_argument('--force', action='store_true',
+                        help="ook nummers verwerken die al compleet zijn")
+    args = parser.parse_args(argv)
+    try:
+        pdf_output = PdfOutputOptions(args.pdf_output, args.pdf_image_dpi,
+                                      linearize=args.pdf_linearize)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.mode == 'queue' and not args.work_queue:
+        parser.error("--mode queue heeft --work-queue nodig (en queue_worker.py-processen)")
+
+    issues = load_issues(args.source)
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    todo = []
+    for issue in issues:
+        if not args.force and is_complete(args.output / issue.name):
+            print(f"Al compleet, overgeslagen: {issue.name}")
+        else:
+            todo.append(issue)
+
+    processor = PDFProcessor(
+        max_workers=args.workers,
+        render_backend=args.render_backend,
+        execution_mode=args.mode,
+        ocr_engine=OCREngine(workers=args.ocr_workers),
+        log_format=args.log_format,
+        image_presets=args.image_presets,
+        memory_budget=(MemoryBudget(args.memory_budget_mb * 1024 * 1024)
+                       if args.memory_budget_mb > 0 else None),
+        search_index=SearchIndex(args.search_index) if args.search_index else None,
+        pdf_output=pdf_output,
+        workspaces=WorkspaceManager(args.workspace_root,
+                                    quota_bytes=args.workspace_quota_mb * 1024 * 1024),
+        work_queue=create_work_queue(args.work_queue) if args.work_queue else None,
+        raster_cache_bytes=args.raster_cache_mb * 1024 * 1024
+    )
+
+    started = time.perf_counter()
+    summaries = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.issues)) as executor:
+            futures = [executor.submit(process_issue, processor, issue, args.output)
+                       for issue in todo]
+            for issue, future in zip(todo, futures):
+                summary = future.result()
+                summaries.append(summary)
+                print(f"{issue.name}: {summary['status']} "
+                      f"({summary['timings']['total']:.1f}s)"
+                      + (f" - {summary['error']}" if summary.get('error') else ''))
+    finally:
+        processor.shutdown()
+
+    failed = [summary for summary in summaries if summary['status'] != 'done']
+    print(f"{len(summaries)} nummers verwerkt in {time.perf_counter() - started:.1f}s, "
+          f"{len(failed)} mislukt, {len(issues) - len(todo)} overgeslagen")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Vergelijk de eind-tot-eind-tijd van verwerken plus ZIP-archief.
+
+Gebruik:
+    python benchmarks/bench_archive.py issue.pdf [--articles 40] [--repeat 3]
+
+'sequentieel' is de oude route: eerst alle artikelen verwerken, daarna
+alles met ZIP_DEFLATED inpakken. 'pipeline' vult het archief met
+ArchiveWriter terwijl de artikelen klaarkomen, met opslaan zonder
+compressie voor afbeeldingen en al gecomprimeerde PDF's.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from archive import ArchiveWriter  # noqa: E402
+from bench_render import first_pages  # noqa: E402
+from ocr import OCREngine  # noqa: E402
+from pdf_processor import PDFProcessor  # noqa: E402
+
+
+def article_ranges(total_pages, articles):
+    starts = first_pages(total_pages, articles)
+    ends = starts[1:] + [total_pages]
+    return [list(range(start + 1, end + 1)) for start, end in zip(starts, ends)]
+
+
+def run_sequential(processor, pdf_path, ranges, zip_path):
+    output_files = processor.process_pdf(pdf_path, article_ranges=ranges,
+                                         year='2000', number='1')
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for file_type, file_list in output_files.items():
+            for file_path in file_list:
+                zf.write(file_path, f"output20001/{file_type}/{os.path.basename(file_path)}")
+    return output_files
+
+
+def run_pipelined(processor, pdf_path, ranges, zip_path):
+    with ArchiveWriter(zip_path, 'output20001') as archive:
+        output_files = processor.process_pdf(pdf_path, article_ranges=ranges,
+                                             year='2000', number='1',
+                                             on_output=archive.add_files)
+        archive.add_files('log', output_files['log'])
+    return output_files
+
+
+def measure(run, processor, pdf_path, ranges):
+    fd, zip_path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    start = time.perf_counter()
+    output_files = run(processor, pdf_path, ranges, zip_path)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(zip_path)
+    os.remove(zip_path)
+    for base_path in {Path(path).parent.parent
+                      for paths in output_files.values() for path in paths}:
+        shutil.rmtree(base_path, ignore_errors=True)
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf')
+    parser.add_argument('--articles', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mode', choices=PDFProcessor.EXECUTION_MODES, default='thread')
+    args = parser.parse_args()
+
+    processor = PDFProcessor(execution_mode=args.mode, ocr_engine=OCREngine())
+    with processor.open_document(args.pdf) as document:
+        total_pages = document.page_count
+    ranges = article_ranges(total_pages, args.articles)
+
+    print(f"{args.pdf}: {total_pages} pagina's, {len(ranges)} artikelen")
+    try:
+        for name, run in (('sequentieel', run_sequential), ('pipeline', run_pipelined)):
+            results = [measure(run, processor, args.pdf, ranges) for _ in range(args.repeat)]
+            timings = [elapsed for elapsed, _ in results]
+            print(f"{name:>12}: best {min(timings):.3f}s, mediaan {statistics.median(timings):.3f}s, "
+                  f"archief {results[0][1] / 1024:.0f} KiB")
+    finally:
+        processor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
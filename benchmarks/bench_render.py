@@ -0,0 +1,66 @@
+"""Vergelijk de render-backends voor artikel-thumbnails.
+
+Gebruik:
+    python benchmarks/bench_render.py issue.pdf [--articles 40] [--repeat 3]
+
+Rendert de eerste pagina van elk artikel (gelijk verdeeld over het
+document) op de grootte die de afbeeldingspresets nodig hebben, eerst met PyMuPDF
+(één geopend document) en daarna met pdf2image (één pdftoppm-proces
+per artikel).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyPDF2 import PdfReader  # noqa: E402
+
+from derivatives import DEFAULT_PRESETS, render_size  # noqa: E402
+from renderers import RENDERERS, create_renderer  # noqa: E402
+
+
+def first_pages(total_pages, articles):
+    """Startpagina's (0-gebaseerd) van gelijk verdeelde artikelen"""
+    articles = max(1, min(articles, total_pages))
+    step = total_pages / articles
+    return [int(i * step) for i in range(articles)]
+
+
+def run_backend(backend, pdf_path, pages, size):
+    start = time.perf_counter()
+    with create_renderer(pdf_path, backend) as renderer:
+        for page_index in pages:
+            renderer.render_page(page_index, size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf')
+    parser.add_argument('--articles', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backends', nargs='+', default=list(RENDERERS))
+    args = parser.parse_args()
+
+    total_pages = len(PdfReader(args.pdf).pages)
+    pages = first_pages(total_pages, args.articles)
+    size = render_size(DEFAULT_PRESETS)
+
+    print(f"{args.pdf}: {total_pages} pagina's, {len(pages)} artikelen, doel {size}")
+    for backend in args.backends:
+        try:
+            timings = [run_backend(backend, args.pdf, pages, size)
+                       for _ in range(args.repeat)]
+        except Exception as e:
+            print(f"{backend:>10}: overgeslagen ({e})")
+            continue
+        best = min(timings)
+        print(f"{backend:>10}: best {best:.3f}s, mediaan {statistics.median(timings):.3f}s, "
+              f"{len(pages) / best:.1f} artikelen/s")
+
+
+if __name__ == '__main__':
+    main()
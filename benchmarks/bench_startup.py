@@ -0,0 +1,93 @@
+"""Opstarttijd van de webapp, met een budget voor de importtijd.
+
+Gebruik:
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-ms 400] [--top 15]
+
+Elke meting start een vers Python-proces dat `import app` uitvoert en
+daarna het eerste verzoek (GET /) afhandelt. Vastgelegd worden de
+importtijd, de tijd tot het eerste antwoord en welke zware backends
+(app.BACKEND_MODULES) al bij het importeren geladen zijn.
+
+Exitcode 1 als de mediaan van de importtijd boven --budget-ms ligt of als
+een backend bij het opstarten geladen wordt; die horen pas bij het eerste
+gebruik (of via app.warm_up) te laden. Met --top worden de traagste
+imports uit `python -X importtime` getoond.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/')
+answered = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (answered - started) * 1000,
+    'backends_loaded': [m for m in app.BACKEND_MODULES if m in sys.modules],
+}}))
+"""
+
+
+def run_probe():
+    result = subprocess.run([sys.executable, '-c', PROBE.format(root=ROOT)],
+                            capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top):
+    """De traagste modules (cumulatief) uit python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True, cwd=ROOT)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=400)
+    parser.add_argument('--top', type=int, default=0,
+                        help="toon de N traagste imports")
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(max(1, args.repeat))]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    first_request_ms = statistics.median(run['first_request_ms'] for run in runs)
+    loaded = sorted({module for run in runs for module in run['backends_loaded']})
+
+    print(f"import app:        {import_ms:7.1f} ms (mediaan van {len(runs)}, budget {args.budget_ms:.0f} ms)")
+    print(f"eerste antwoord:   {first_request_ms:7.1f} ms")
+    print(f"backends geladen:  {', '.join(loaded) or '-'}")
+
+    if args.top:
+        print("\nTraagste imports (cumulatief):")
+        for milliseconds, module in slowest_imports(args.top):
+            print(f"  {milliseconds:7.1f} ms  {module}")
+
+    failed = False
+    if import_ms > args.budget_ms:
+        print(f"\nTe traag: import app duurt {import_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        failed = True
+    if loaded:
+        print(f"\nBackends horen lui te laden, maar zijn al geïmporteerd: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Benchmarksuite voor de verwerkingspijplijn op synthetische nummers.
+
+Gebruik:
+    python benchmarks/bench_suite.py [--kinds text scanned mixed] [--pages 10 100 500]
+                                     [--benchmarks pipeline parse ...] [--data bench_data]
+                                     [--output resultaten.json] [--baseline baseline.json]
+                                     [--save-baseline baseline.json] [--threshold 0.10]
+
+Per nummer draait de volledige pijplijn (process_pdf plus ZIP-archief) en
+elke stap los: parse, text_extract, page_copy, rasterize, thumbnail en ocr.
+Elke meting draait in een eigen subprocess, zodat het piekgeheugen (RSS,
+inclusief Tesseract-subprocessen) per meting klopt. Vastgelegd worden de
+tijd, pagina's per seconde, piek-RSS en uitvoergrootte, als JSON.
+
+Met --baseline wordt vergeleken met eerder opgeslagen resultaten; een
+meting die meer dan --threshold trager is telt als regressie en geeft
+exitcode 1. Draait op Linux met poppler en Tesseract zoals in de Dockerfile.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyPDF2 import PdfWriter  # noqa: E402
+
+from archive import ArchiveWriter  # noqa: E402
+from derivatives import DEFAULT_PRESETS, render_size, write_derivatives  # noqa: E402
+from metrics import StageTimings  # noqa: E402
+from ocr import OCREngine  # noqa: E402
+from pdf_processor import PDFProcessor  # noqa: E402
+from synthetic_issues import KINDS, PAGE_COUNTS, ensure_issue, issue_name  # noqa: E402
+
+ARTICLE_PAGES = 4
+STAGES = ('parse', 'text_extract', 'page_copy', 'rasterize', 'thumbnail', 'ocr')
+BENCHMARKS = ('pipeline',) + STAGES
+# Verschillen kleiner dan dit zijn meetruis, ook als ze procentueel groot zijn
+MIN_DELTA_S = 0.01
+
+
+def article_ranges(total_pages):
+    return [list(range(start, min(start + ARTICLE_PAGES, total_pages + 1)))
+            for start in range(1, total_pages + 1, ARTICLE_PAGES)]
+
+
+def bench_pipeline(pdf_path, workdir, options):
+    processor = PDFProcessor(max_workers=options['workers'],
+                             execution_mode=options['mode'],
+                             ocr_engine=OCREngine(workers=options['ocr_workers']))
+    timings = StageTimings(observe=False)
+    zip_path = workdir / 'output.zip'
+    try:
+        with processor.open_document(str(pdf_path)) as document:
+            start = time.perf_counter()
+            with ArchiveWriter(zip_path, 'output20001', timings=timings) as archive:
+                output_files = processor.process_pdf(
+                    document=document, article_ranges=article_ranges(document.page_count),
+                    year='2000', number='1', timings=timings, on_output=archive.add_files)
+                archive.add_files('log', output_files['log'])
+            elapsed = time.perf_counter() - start
+    finally:
+        processor.shutdown()
+
+    for base_path in {Path(path).parent.parent
+                      for paths in output_files.values() for path in paths}:
+        shutil.rmtree(base_path, ignore_errors=True)
+    return elapsed, os.path.getsize(zip_path), {'stages': timings.as_dict()}
+
+
+def bench_parse(pdf_path, workdir, options):
+    start = time.perf_counter()
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        document.page_count
+    return time.perf_counter() - start, 0, {}
+
+
+def bench_text_extract(pdf_path, workdir, options):
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        start = time.perf_counter()
+        chars = sum(len(document.page_text(i)) for i in range(document.page_count))
+        return time.perf_counter() - start, 0, {'chars': chars}
+
+
+def bench_page_copy(pdf_path, workdir, options):
+    output_bytes = 0
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        start = time.perf_counter()
+        for i, page_range in enumerate(article_ranges(document.page_count)):
+            writer = PdfWriter()
+            for page_num in page_range:
+                writer.add_page(document.page(page_num - 1))
+            path = workdir / f"{i}.pdf"
+            with open(path, 'wb') as f:
+                writer.write(f)
+            output_bytes += os.path.getsize(path)
+        return time.perf_counter() - start, output_bytes, {}
+
+
+def bench_rasterize(pdf_path, workdir, options):
+    size = render_size(DEFAULT_PRESETS)
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        start = time.perf_counter()
+        for page_range in article_ranges(document.page_count):
+            document.renderer.render_page(page_range[0] - 1, size)
+        return time.perf_counter() - start, 0, {'renderer': document.renderer.name}
+
+
+def bench_thumbnail(pdf_path, workdir, options):
+    # Alleen het afleiden en coderen telt; het renderen zelf valt erbuiten
+    size = render_size(DEFAULT_PRESETS)
+    for preset in DEFAULT_PRESETS:
+        (workdir / preset.name).mkdir(exist_ok=True)
+    elapsed = 0.0
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        for i, page_range in enumerate(article_ranges(document.page_count)):
+            image = document.renderer.render_page(page_range[0] - 1, size)
+            start = time.perf_counter()
+            write_derivatives(image, DEFAULT_PRESETS, workdir, str(i))
+            elapsed += time.perf_counter() - start
+    output_bytes = sum(path.stat().st_size for path in workdir.rglob('*') if path.is_file())
+    return elapsed, output_bytes, {}
+
+
+def bench_ocr(pdf_path, workdir, options):
+    engine = OCREngine(workers=options['ocr_workers'])
+    with PDFProcessor().open_document(str(pdf_path)) as document:
+        start = time.perf_counter()
+        run = engine.start(document, list(range(document.page_count)))
+        texts = run.result()
+        elapsed = time.perf_counter() - start
+    return elapsed, sum(len(text.encode('utf-8')) for text in texts.values()), \
+        {'methods': run.methods}
+
+
+RUNNERS = {
+    'pipeline': bench_pipeline,
+    'parse': bench_parse,
+    'text_extract': bench_text_extract,
+    'page_copy': bench_page_copy,
+    'rasterize': bench_rasterize,
+    'thumbnail': bench_thumbnail,
+    'ocr': bench_ocr,
+}
+
+
+def run_one(benchmark, pdf_path, options):
+    """Eén meting in dit (sub)proces; de beste van options['repeat'] keer"""
+    best = None
+    for _ in range(options['repeat']):
+        workdir = Path(tempfile.mkdtemp(prefix='museum_bench_'))
+        try:
+            elapsed, output_bytes, extra = RUNNERS[benchmark](pdf_path, workdir, options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, output_bytes, extra)
+
+    elapsed, output_bytes, extra = best
+    # ru_maxrss is in KiB op Linux; kinderen = Tesseract en workerprocessen
+    peak_kib = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {'wall_s': round(elapsed, 4), 'output_bytes': output_bytes,
+            'peak_rss_mb': round(peak_kib / 1024, 1), **extra}
+
+
+def measure(benchmark, pdf_path, pages, options):
+    """Start een schoon subprocess voor één meting"""
+    command = [sys.executable, os.path.abspath(__file__), '--run-one', benchmark, str(pdf_path),
+               '--repeat', str(options['repeat']), '--mode', options['mode'],
+               '--workers', str(options['workers']), '--ocr-workers', str(options['ocr_workers'])]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1:] or ['onbekende fout']}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['pages_per_s'] = round(pages / result['wall_s'], 2) if result['wall_s'] else None
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Druk de vergelijking af en geef het aantal regressies"""
+    previous = {(entry['issue'], entry['benchmark']): entry
+                for entry in baseline.get('results', []) if 'wall_s' in entry}
+    regressions = 0
+    print(f"\nVergelijking met baseline {baseline.get('meta', {}).get('commit')} "
+          f"(drempel {threshold:.0%}):")
+    for entry in results:
+        base = previous.get((entry['issue'], entry['benchmark']))
+        if base is None or 'wall_s' not in entry or not base['wall_s']:
+            continue
+        change = entry['wall_s'] / base['wall_s'] - 1
+        regression = change > threshold and entry['wall_s'] - base['wall_s'] > MIN_DELTA_S
+        regressions += regression
+        entry['baseline_wall_s'] = base['wall_s']
+        entry['change'] = round(change, 4)
+        print(f"  {entry['issue']:>12} {entry['benchmark']:>12}: {base['wall_s']:.3f}s -> "
+              f"{entry['wall_s']:.3f}s ({change:+.1%}){'  REGRESSIE' if regression else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--pages', nargs='+', type=int, default=list(PAGE_COUNTS))
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--data', type=Path,
+                        default=Path(tempfile.gettempdir()) / 'museum_bench_data',
+                        help="map voor de gegenereerde nummers (wordt hergebruikt)")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--mode', choices=PDFProcessor.EXECUTION_MODES, default='thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--ocr-workers', type=int, default=2)
+    parser.add_argument('--output', type=Path, help="resultaten als JSON")
+    parser.add_argument('--baseline', type=Path, help="eerder opgeslagen resultaten")
+    parser.add_argument('--save-baseline', type=Path, help="resultaten ook als baseline opslaan")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--run-one', nargs=2, metavar=('BENCHMARK', 'PDF'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    options = {'repeat': max(1, args.repeat), 'mode': args.mode,
+               'workers': args.workers, 'ocr_workers': args.ocr_workers}
+
+    if args.run_one:
+        benchmark, pdf_path = args.run_one
+        print(json.dumps(run_one(benchmark, Path(pdf_path), options)))
+        return 0
+
+    results = []
+    for kind in args.kinds:
+        for pages in args.pages:
+            pdf_path = ensure_issue(kind, pages, args.data)
+            for benchmark in args.benchmarks:
+                result = measure(benchmark, pdf_path, pages, options)
+                results.append({'issue': issue_name(kind, pages), 'benchmark': benchmark,
+                                'pages': pages, **result})
+                if 'error' in result:
+                    print(f"{issue_name(kind, pages):>12} {benchmark:>12}: fout {result['error']}")
+                else:
+                    print(f"{issue_name(kind, pages):>12} {benchmark:>12}: "
+                          f"{result['wall_s']:.3f}s, {result['pages_per_s']} pagina's/s, "
+                          f"piek {result['peak_rss_mb']} MB, "
+                          f"uitvoer {result['output_bytes'] / 1024:.0f} KiB")
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+        },
+        'results': results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Genereer synthetische bulletins voor benchmarks, zonder netwerk of bronbestanden.
+
+Gebruik:
+    python benchmarks/synthetic_issues.py --output bench_data [--kinds text scanned mixed]
+                                          [--pages 10 100 500]
+
+Soorten:
+    text     alleen pagina's met een tekstlaag
+    scanned  alleen afbeeldingen van tekst (geen tekstlaag, zoals een scan)
+    mixed    afwisselend; elke derde pagina is gescand
+
+Dezelfde parameters geven altijd hetzelfde bestand (vaste seed), zodat
+resultaten tussen machines en commits vergelijkbaar zijn.
+"""
+import argparse
+import io
+import os
+import random
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageFilter
+
+KINDS = ('text', 'scanned', 'mixed')
+PAGE_COUNTS = (10, 100, 500)
+# A4 in punten
+PAGE_SIZE = (595, 842)
+SCAN_DPI = 150
+
+WORDS = ("museum collectie tentoonstelling bulletin archief schilderij beeldhouwwerk "
+         "restauratie aanwinst conservator bruikleen catalogus depot expositie "
+         "kunstenaar eeuw prent tekening vereniging jaarverslag bezoekers").split()
+
+
+def issue_name(kind: str, pages: int) -> str:
+    return f"{kind}-{pages}"
+
+
+def _paragraphs(rng: random.Random, count: int):
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 90))]
+        yield ' '.join(words).capitalize() + '.'
+
+
+def _text_page(doc, rng: random.Random, page_number: int):
+    page = doc.new_page(width=PAGE_SIZE[0], height=PAGE_SIZE[1])
+    page.insert_text((56, 60), f"Bulletin - pagina {page_number}", fontsize=16)
+    rect = fitz.Rect(56, 90, PAGE_SIZE[0] - 56, PAGE_SIZE[1] - 56)
+    page.insert_textbox(rect, '\n\n'.join(_paragraphs(rng, 5)), fontsize=10)
+    return page
+
+
+def _scanned_page(doc, rng: random.Random, page_number: int):
+    # Eerst een tekstpagina renderen, dan als ruizige grijsafbeelding terugplaatsen
+    scratch = fitz.open()
+    _text_page(scratch, rng, page_number)
+    pix = scratch[0].get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+    image = Image.frombytes('L', (pix.width, pix.height), pix.samples)
+    scratch.close()
+
+    image = image.rotate(rng.uniform(-0.8, 0.8), fillcolor=255)
+    # Ruis uit de eigen seed, zodat het bestand reproduceerbaar blijft
+    noise = Image.frombytes('L', image.size, rng.randbytes(image.width * image.height))
+    image = Image.blend(image, noise.filter(ImageFilter.GaussianBlur(0.6)), 0.08)
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=70)
+    page = doc.new_page(width=PAGE_SIZE[0], height=PAGE_SIZE[1])
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    return page
+
+
+def generate_issue(kind: str, pages: int, path: Path, seed: int = 2024) -> Path:
+    """Schrijf één synthetisch nummer naar path"""
+    if kind not in KINDS:
+        raise ValueError(f"Onbekende soort: {kind}")
+
+    rng = random.Random(f"{seed}-{kind}-{pages}")
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        scanned = kind == 'scanned' or (kind == 'mixed' and page_number % 3 == 0)
+        if scanned:
+            _scanned_page(doc, rng, page_number)
+        else:
+            _text_page(doc, rng, page_number)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    doc.save(tmp_path, garbage=3, deflate=True)
+    doc.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def ensure_issue(kind: str, pages: int, directory: Path) -> Path:
+    """Geef het pad van een nummer en genereer het alleen als het nog ontbreekt"""
+    path = Path(directory) / f"{issue_name(kind, pages)}.pdf"
+    if not path.is_file():
+        generate_issue(kind, pages, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', type=Path, required=True)
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--pages', nargs='+', type=int, default=list(PAGE_COUNTS))
+    args = parser.parse_args()
+
+    for kind in args.kinds:
+        for pages in args.pages:
+            path = ensure_issue(kind, pages, args.output)
+            print(f"{path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+
+
+if __name__ == '__main__':
+    main()
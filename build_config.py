@@ -38,29 +38,91 @@ def copy_dependencies():
         shutil.copytree(poppler_path, "build/poppler", dirs_exist_ok=True)
 
 
-def create_executable():
-    """PyInstaller ile executable oluştur"""
-    spec_content = """# -*- mode: python ; coding: utf-8 -*-
+def create_spec(onefile=False):
+    """PyInstaller spec içeriğini oluştur"""
+    if onefile:
+        # Tek dosya: tesseract ve poppler exe'ye gömülmez, exe'nin yanına
+        # kopyalanır; yoksa her açılışta yüzlerce MB geçici klasöre açılır
+        bundled_files = ""
+        build_target = """exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    [],
+    name='MuseumPDFTool',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,  # UPX her açılışta açmayı yavaşlatır
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon='app.ico'  # Ikon dosyası
+)
+"""
+    else:
+        bundled_files = """    ('build/tesseract', 'tesseract'),
+    ('build/poppler', 'poppler'),
+"""
+        build_target = """exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='MuseumPDFTool',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,  # UPX sıkıştırmasını etkinleştir
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon='app.ico'  # Ikon dosyası
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=True,  # UPX sıkıştırmasını etkinleştir
+    upx_exclude=[],
+    name='MuseumPDFTool'
+)
+"""
+
+    return """# -*- mode: python ; coding: utf-8 -*-
 
 block_cipher = None
 
 added_files = [
     ('templates', 'templates'),
     ('static', 'static'),
-    ('build/tesseract', 'tesseract'),
-    ('build/poppler', 'poppler'),
-    ('app.ico', '.')  # app.ico
+""" + bundled_files + """    ('app.ico', '.')  # app.ico
 ]
 
 a = Analysis(
-    ['app.py'],
+    ['launcher.py'],
     pathex=[],
     binaries=[],
     datas=added_files,
     hiddenimports=[
+        'app',
+        'fitz',  # PyMuPDF, ilk kullanımda yüklenir
         'PyPDF2',
         'pdf2image',
         'pytesseract',
+        'numpy',
         'werkzeug.middleware.proxy_fix',
         'PIL',  # Pillow için
         'flask',  # Flask için
@@ -77,66 +139,69 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    [],
-    exclude_binaries=True,
-    name='MuseumPDFTool',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,  # UPX sıkıştırmasını etkinleştir
-    console=True,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon='app.ico'  # Ikon dosyası
-)
+""" + build_target
 
-coll = COLLECT(
-    exe,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    strip=False,
-    upx=True,  # UPX sıkıştırmasını etkinleştir
-    upx_exclude=[],
-    name='MuseumPDFTool'
-)
-"""
 
+def create_executable(onefile=False):
+    """PyInstaller ile executable oluştur"""
     with open("museumapp.spec", "w", encoding='utf-8') as f:
-        f.write(spec_content)
+        f.write(create_spec(onefile))
 
     # PyInstaller'ı çalıştır
-    subprocess.run(["pyinstaller", "--noconfirm", "museumapp.spec"])
+    command = ["pyinstaller", "--noconfirm", "museumapp.spec"]
+    if onefile:
+        command += ["--distpath", "dist/onefile"]
+    subprocess.run(command, check=True)
+
+    if onefile:
+        # Büyük ikili dosyalar exe'nin yanında kalır, bir kez açılır
+        for name in ("tesseract", "poppler"):
+            if Path("build", name).is_dir():
+                shutil.copytree(Path("build", name), Path("dist/onefile", name), dirs_exist_ok=True)
 
 
 def create_launcher():
     """Bir başlatıcı scripti oluştur"""
-    launcher_content = """import os
+    launcher_content = """import multiprocessing
+import os
 import sys
 
+def find_bundled(name):
+    # Önce exe'nin yanındaki klasör (onefile: her açılışta yeniden açılmaz),
+    # sonra PyInstaller'ın açtığı klasör, en son kaynak dizini
+    candidates = []
+    if getattr(sys, 'frozen', False):
+        candidates.append(os.path.dirname(sys.executable))
+    if hasattr(sys, '_MEIPASS'):
+        candidates.append(sys._MEIPASS)
+    candidates.append(os.path.abspath(os.path.dirname(__file__)))
+    for base_path in candidates:
+        path = os.path.join(base_path, name)
+        if os.path.isdir(path):
+            return path
+    return None
+
 def setup_environment():
-    # Uygulama dizinini belirle
-    base_path = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-    
     # Tesseract yolunu ayarla
-    tesseract_path = os.path.join(base_path, 'tesseract')
-    os.environ['PATH'] = tesseract_path + os.pathsep + os.environ.get('PATH', '')
-    os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_path, 'tessdata')
-    
+    tesseract_path = find_bundled('tesseract')
+    if tesseract_path:
+        os.environ['PATH'] = tesseract_path + os.pathsep + os.environ.get('PATH', '')
+        os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_path, 'tessdata')
+        executable = os.path.join(tesseract_path, 'tesseract.exe' if sys.platform == 'win32' else 'tesseract')
+        if os.path.isfile(executable):
+            os.environ.setdefault('TESSERACT_PATH', executable)
+
     # Poppler yolunu ayarla
-    poppler_path = os.path.join(base_path, 'poppler')
-    os.environ['PATH'] = poppler_path + os.pathsep + os.environ.get('PATH', '')
+    poppler_path = find_bundled('poppler')
+    if poppler_path:
+        os.environ['PATH'] = poppler_path + os.pathsep + os.environ.get('PATH', '')
 
 if __name__ == '__main__':
+    # Dondurulmuş (PyInstaller) build'de süreç havuzu için gerekli
+    multiprocessing.freeze_support()
     setup_environment()
-    from app import app
-    app.run(debug=False)
+    from app import main
+    main()
 """
 
     with open("launcher.py", "w", encoding='utf-8') as f:
@@ -145,19 +210,23 @@ if __name__ == '__main__':
 
 def main():
     """Ana build işlemi"""
+    # --onefile: tek exe, tesseract ve poppler yanında (dist/onefile)
+    onefile = "--onefile" in sys.argv[1:]
+    dist_folder = "dist/onefile" if onefile else "dist/MuseumPDFTool"
     try:
         print("Build işlemi başlıyor...")
         create_build_folders()
         print("Bağımlılıklar kopyalanıyor...")
         copy_dependencies()
-        print("Executable oluşturuluyor...")
-        create_executable()
+        # Launcher, executable'ın giriş noktası; önce oluşturulmalı
         print("Launcher oluşturuluyor...")
         create_launcher()
+        print("Executable oluşturuluyor...")
+        create_executable(onefile)
         print("Build işlemi tamamlandı!")
 
         # Dist klasörünü ZIP yap
-        shutil.make_archive("MuseumPDFTool", "zip", "dist/MuseumPDFTool")
+        shutil.make_archive("MuseumPDFTool", "zip", dist_folder)
         print("Zip dosyası oluşturuldu: MuseumPDFTool.zip")
 
     except Exception as e:
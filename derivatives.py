@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+FORMATS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+# Uitvoermappen die al voor iets anders gebruikt worden
+RESERVED_NAMES = {'pdf', 'ocr', 'log'}
+
+
+class ImagePreset:
+    """Eén afgeleide afbeelding: naam (= uitvoermap), maximale maat en codering"""
+
+    def __init__(self, name: str, size: Tuple[int, int], format: str = 'JPEG',
+                 quality: int = 85, progressive: bool = False):
+        format = format.upper()
+        if format == 'JPG':
+            format = 'JPEG'
+        if format not in FORMATS:
+            raise ValueError(f"Onbekend afbeeldingsformaat: {format}")
+        if not name.isidentifier() or name in RESERVED_NAMES:
+            raise ValueError(f"Ongeldige presetnaam: {name}")
+        self.name = name
+        self.size = (int(size[0]), int(size[1]))
+        self.format = format
+        self.quality = int(quality)
+        self.progressive = progressive
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.format]
+
+    def save_options(self) -> Dict:
+        if self.format == 'WEBP':
+            return {'quality': self.quality, 'method': 4}
+        return {'quality': self.quality, 'optimize': True, 'progressive': self.progressive}
+
+    def to_dict(self) -> Dict:
+        """Voor de cachesleutel: alles wat de uitvoer bepaalt"""
+        return {'name': self.name, 'size': list(self.size), 'format': self.format,
+                'quality': self.quality, 'progressive': self.progressive}
+
+
+DEFAULT_PRESETS = [
+    ImagePreset('large', (1024, 1280)),
+    ImagePreset('small', (500, 700)),
+]
+
+
+def parse_presets(spec: str) -> List[ImagePreset]:
+    """Lees presets als 'naam:BxH[:formaat[:kwaliteit[:progressive]]]', kommagescheiden
+
+    Bijvoorbeeld: large:1024x1280,small:500x700,grid:200x200:webp:80
+    """
+    presets = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        parts = item.split(':')
+        try:
+            width, height = (int(value) for value in parts[1].lower().split('x'))
+            preset = ImagePreset(
+                parts[0], (width, height),
+                format=parts[2] if len(parts) > 2 and parts[2] else 'JPEG',
+                quality=int(parts[3]) if len(parts) > 3 and parts[3] else 85,
+                progressive=len(parts) > 4 and parts[4].lower() == 'progressive')
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Ongeldige afbeeldingspreset '{item}': {e}") from e
+        presets.append(preset)
+
+    if len({preset.name for preset in presets}) != len(presets):
+        raise ValueError("Presetnamen moeten uniek zijn")
+    return presets
+
+
+def render_size(presets: List[ImagePreset]) -> Tuple[int, int]:
+    """Kleinste rendermaat waar elke preset uit afgeleid kan worden"""
+    return (max(preset.size[0] for preset in presets),
+            max(preset.size[1] for preset in presets))
+
+
+def _target_size(image: 'Image.Image', max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Maat binnen max_size met behoud van verhouding; nooit vergroten"""
+    scale = min(max_size[0] / image.width, max_size[1] / image.height, 1)
+    return (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+
+
+def write_derivatives(image: 'Image.Image', presets: List[ImagePreset], base_path: Path,
+                      file_base_name: str) -> Dict[str, List[str]]:
+    """Schrijf alle presets van één render; geeft {presetnaam: [pad]}
+
+    Van groot naar klein: elke maat wordt afgeleid uit de kleinste eerdere
+    afgeleide die groot genoeg is, in plaats van uit de volledige render.
+    Er wordt geen kopie van het frame gemaakt.
+    """
+    from PIL import Image
+
+    outputs = {}
+    sources = [image]
+    for preset in sorted(presets, key=lambda p: p.size[0] * p.size[1], reverse=True):
+        target = _target_size(image, preset.size)
+        source = min((candidate for candidate in sources
+                      if candidate.width >= target[0] and candidate.height >= target[1]),
+                     key=lambda candidate: candidate.width * candidate.height)
+        if source.size != target:
+            # reducing_gap laat Pillow eerst goedkoop met een geheel getal verkleinen
+            source = source.resize(target, Image.LANCZOS, reducing_gap=3.0)
+            sources.append(source)
+
+        path = base_path / preset.name / f"{file_base_name}{preset.extension}"
+        source.save(path, preset.format, **preset.save_options())
+        outputs[preset.name] = [str(path)]
+    return outputs
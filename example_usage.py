@@ -1,33 +1,44 @@
 from pdf_processor import PDFProcessor
+from validation import process_ranges, process_remove_pages, process_merge_indices
 
-# Dizinleri belirleyin
-upload_dir = "uploads"  # PDF'lerin yükleneceği dizin
-output_dir = "output"   # İşlenmiş dosyaların kaydedileceği dizin
 
-# PDFProcessor sınıfını başlatın
-processor = PDFProcessor(upload_dir, output_dir)
+def main():
+    # PDFProcessor sınıfını başlatın ('process' modu çok çekirdekli makineler için)
+    processor = PDFProcessor(max_workers=4, execution_mode='process')
 
-# Örnek kullanım:
-pdf_path = "ornek.pdf"
+    # Örnek kullanım:
+    pdf_path = "ornek.pdf"
 
-# Reklamları kaldırmak için (örneğin 2. ve 4. sayfaları kaldırmak için)
-pages_to_remove = [1, 3]  # 0-tabanlı indeksleme
-no_ads_pdf = processor.remove_ads(pdf_path, pages_to_remove)
+    # PDF'yi bir kez açın; sayfa sayısı ve işleme için aynı belge kullanılır
+    with processor.open_document(pdf_path) as document:
+        total_pages = document.page_count
 
-# PDF'yi makalelere bölmek için
-article_ranges = [[0, 1], [2, 3]]  # Her makale için sayfa aralıkları
-articles = processor.split_into_articles(pdf_path, article_ranges)
+        # Web formundaki ile aynı biçim (1 tabanlı sayfa numaraları)
+        article_ranges = process_ranges("1-3,4-6,7", total_pages)
+        pages_to_remove = process_remove_pages("2,5", total_pages)
+        merge_indices = process_merge_indices("1,3")  # İsteğe bağlı: makaleleri birleştirmek için
 
-# Küçük resim oluşturmak için
-thumbnail = processor.create_thumbnails(pdf_path)
+        # Tüm işlemleri birden yapmak için
+        result = processor.process_pdf(
+            document=document,
+            pages_to_remove=pages_to_remove,
+            article_ranges=article_ranges,
+            merge_article_indices=merge_indices,
+            year="2024",
+            number="3"
+        )
 
-# Metni çıkarmak için
-text_file = processor.extract_text(pdf_path)
+    # Sonuç: {'pdf': [...], 'large': [...], 'small': [...], 'ocr': [...], 'log': [...]}
+    # Resim boyutları PDFProcessor(image_presets=...) ile ayarlanabilir
+    for file_type, files in result.items():
+        print(file_type, files)
 
-# Tüm işlemleri birden yapmak için
-result = processor.process_pdf(
-    pdf_path,
-    pages_to_remove=[1, 3],
-    article_ranges=[[0, 1], [2, 3]],
-    merge_pages=[0, 1]  # İsteğe bağlı: makaleleri birleştirmek için
-)
+    processor.shutdown()
+
+    # Bir klasörü veya manifesti toplu işlemek için:
+    #   python batch.py bultenler/ --output cikti/
+
+
+# 'process' modu alt süreçler başlatır; bu yüzden __main__ koruması gerekir
+if __name__ == '__main__':
+    main()
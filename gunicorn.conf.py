@@ -0,0 +1,22 @@
+# Gunicorn-instellingen; opties op de opdrachtregel (zie Dockerfile) gaan voor
+
+# De app één keer in de master laden en de workers daarna forken, zodat ze
+# het geïmporteerde en opgewarmde geheugen delen (copy-on-write)
+preload_app = True
+
+
+def when_ready(server):
+    """Draait in de master nadat de app geladen is, vóór de eerste fork"""
+    from app import warm_up
+
+    warm_up()
+    server.log.info("Backends vooraf geladen voor alle workers")
+
+    # De budgetten in app.py zijn over WEB_CONCURRENCY workers verdeeld
+    from app import WEB_WORKERS
+
+    if server.cfg.workers != WEB_WORKERS:
+        server.log.warning(
+            "Gunicorn draait %d workers, maar de budgetten zijn verdeeld over "
+            "WEB_CONCURRENCY=%d; zet WEB_CONCURRENCY gelijk aan --workers",
+            server.cfg.workers, WEB_WORKERS)
@@ -0,0 +1,84 @@
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+
+LOG_FORMATS = ('text', 'json')
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_job_counter = 0
+_counter_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Eén JSON-object per regel, voor het verzamelen van logs"""
+
+    def __init__(self, job: str = None):
+        super().__init__()
+        self.job = job
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if self.job:
+            entry['job'] = self.job
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class JobLog:
+    """Eigen logbestand voor één verwerking
+
+    De logger schrijft via een wachtrij; een QueueListener-thread doet het
+    schrijven naar het bestand, zodat verwerkingsthreads nooit op
+    bestands-I/O wachten. De logger valt buiten logging.getLogger, zodat
+    hij na close() volledig wordt opgeruimd.
+    """
+
+    def __init__(self, log_path: Path, log_format: str = 'text', job: str = None):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Onbekend logformaat: {log_format}")
+
+        global _job_counter
+        with _counter_lock:
+            _job_counter += 1
+            name = f"pdf_processor.job{_job_counter}"
+
+        self.path = Path(log_path)
+        self._file_handler = logging.FileHandler(self.path, encoding='utf-8')
+        if log_format == 'json':
+            self._file_handler.setFormatter(JsonFormatter(job))
+        else:
+            self._file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        self._queue = queue.SimpleQueue()
+        self._listener = QueueListener(self._queue, self._file_handler)
+        self._listener.start()
+
+        self.logger = logging.Logger(name, logging.INFO)
+        self.logger.addHandler(QueueHandler(self._queue))
+        self._closed = False
+
+    def close(self):
+        """Schrijf de resterende regels weg en sluit het bestand"""
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.stop()
+        self._file_handler.close()
+        self.logger.handlers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
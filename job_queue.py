@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from workspace import owner_alive
+
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Relatieve weging van de stappen voor de totale voortgang
+STAGE_WEIGHTS = {
+    'upload': 5,
+    'articles': 55,
+    'ocr': 30,
+    'archive': 10,
+}
+
+
+# Eindstatussen; een taak komt daar niet meer uit
+TERMINAL_STATUSES = ('done', 'failed')
+
+
+class QueueFullError(Exception):
+    """De wachtrij zit vol, probeer het later opnieuw"""
+
+
+class Job:
+    """Status van één verwerkingstaak
+
+    De status wordt als JSON in de taakmap bewaard, zodat iedere
+    gunicorn-worker de voortgang kan opvragen, ongeacht welke worker
+    de taak uitvoert. Host en pid van die worker staan erbij, zodat een
+    taak van een gestopte worker herkend wordt.
+    """
+
+    def __init__(self, job_id: str, workdir: Path):
+        self.id = job_id
+        self.workdir = workdir
+        self.status = 'queued'
+        self.progress = {stage: {'done': 0, 'total': 0}
+                         for stage in STAGE_WEIGHTS}
+        self.error = None
+        self.result_name = None
+        self.timings = {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @property
+    def result_path(self) -> Optional[Path]:
+        if not self.result_name:
+            return None
+        return self.workdir / self.result_name
+
+    def update_progress(self, stage: str, done: int, total: int):
+        """Werk de voortgang van één stap bij"""
+        with self._lock:
+            self.progress[stage] = {'done': done, 'total': total}
+            self._save()
+
+    def set_timings(self, timings: Dict[str, float]):
+        """Bewaar de duur per verwerkingsstap"""
+        with self._lock:
+            self.timings = timings
+            self._save()
+
+    def set_status(self, status: str, error: str = None, result_name: str = None):
+        with self._lock:
+            self.status = status
+            if error is not None:
+                self.error = error
+            if result_name is not None:
+                self.result_name = result_name
+            if status in TERMINAL_STATUSES:
+                self.finished_at = time.time()
+            self._save()
+
+    def percent(self) -> int:
+        if self.status == 'done':
+            return 100
+        total_weight = sum(STAGE_WEIGHTS.values())
+        achieved = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            stage_progress = self.progress.get(stage, {})
+            if stage_progress.get('total'):
+                achieved += weight * \
+                    stage_progress['done'] / stage_progress['total']
+        return min(99, int(achieved * 100 / total_weight))
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'percent': self.percent(),
+            'error': self.error,
+            'result_name': self.result_name,
+            'timings': self.timings,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'host': self.host,
+            'pid': self.pid,
+        }
+
+    def _save(self):
+        status_file = self.workdir / 'status.json'
+        # Een andere worker kan de taak intussen als mislukt gemarkeerd
+        # hebben (zie JobManager); een afgeronde status blijft staan
+        stored = Job.load(self.workdir)
+        if stored is not None and stored.status in TERMINAL_STATUSES:
+            self.status = stored.status
+            self.error = stored.error
+            self.result_name = stored.result_name
+            self.finished_at = stored.finished_at
+
+        # Eigen tijdelijk bestand per schrijver, zodat gelijktijdige
+        # schrijvers elkaars bestand niet vervangen
+        fd, tmp_path = tempfile.mkstemp(prefix='status.', suffix='.tmp', dir=self.workdir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, status_file)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, workdir: Path) -> Optional['Job']:
+        try:
+            with open(workdir / 'status.json', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        job = cls(data['id'], workdir)
+        job.status = data['status']
+        job.progress = data['progress']
+        job.error = data.get('error')
+        job.result_name = data.get('result_name')
+        job.timings = data.get('timings', {})
+        job.created_at = data.get('created_at', job.created_at)
+        job.finished_at = data.get('finished_at')
+        job.host = data.get('host')
+        job.pid = data.get('pid')
+        return job
+
+
+class JobManager:
+    """Begrensde achtergrondpool voor PDF-verwerking
+
+    Een taak die nog wacht of loopt terwijl de worker die hem uitvoert niet
+    meer bestaat (gecrasht of door gunicorn vervangen), of die ouder is dan
+    max_age, wordt als mislukt gemarkeerd en daarna na result_ttl opgeruimd.
+    """
+
+    def __init__(self, root: str = None, max_workers: int = 2,
+                 max_pending: int = 10, result_ttl: int = 3600, max_age: int = 21600):
+        self.root = Path(root or os.path.join(
+            tempfile.gettempdir(), 'museum_jobs'))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_age = max_age
+        self._host = socket.gethostname()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def create_job(self) -> Job:
+        """Maak een nieuwe taak met een eigen werkmap"""
+        self.cleanup_expired()
+        job_id = uuid.uuid4().hex
+        workdir = self.root / job_id
+        workdir.mkdir(parents=True)
+        job = Job(job_id, workdir)
+        job.set_status('queued')
+        return job
+
+    def submit(self, job: Job, func: Callable[[Job], str]):
+        """Plan een taak in; func geeft de bestandsnaam van het resultaat terug"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(
+                    "Te veel taken in behandeling, probeer het later opnieuw")
+            self._pending += 1
+
+        self._executor.submit(self._run, job, func)
+
+    def _run(self, job: Job, func: Callable[[Job], str]):
+        try:
+            job.set_status('running')
+            result_name = func(job)
+            job.set_status('done', result_name=result_name)
+        except Exception as e:
+            job.set_status('failed', error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        job = Job.load(self.root / job_id)
+        if job is not None:
+            try:
+                self._fail_if_orphaned(job, time.time())
+            except OSError:
+                return None
+        return job
+
+    def _fail_if_orphaned(self, job: Job, now: float):
+        """Markeer een onafgeronde taak van een verdwenen worker als mislukt"""
+        if job.status in TERMINAL_STATUSES:
+            return
+        if now - job.created_at > self.max_age:
+            job.set_status('failed', error="De taak duurde te lang en is afgebroken")
+        elif job.host == self._host and job.pid and not owner_alive(job.pid, job.created_at):
+            # Een pid zegt alleen iets op dezelfde host
+            job.set_status('failed', error="De worker die de taak uitvoerde is gestopt")
+
+    def discard(self, job: Job):
+        shutil.rmtree(job.workdir, ignore_errors=True)
+
+    def cleanup_expired(self):
+        """Verwijder afgeronde taken waarvan de bewaartijd verstreken is"""
+        now = time.time()
+        for workdir in self.root.iterdir():
+            if not workdir.is_dir() or not JOB_ID_PATTERN.match(workdir.name):
+                continue
+            job = Job.load(workdir)
+            if job is None:
+                try:
+                    expired = now - workdir.stat().st_mtime > self.result_ttl
+                except OSError:
+                    # Net door een andere worker verwijderd
+                    continue
+                if expired:
+                    shutil.rmtree(workdir, ignore_errors=True)
+                continue
+            try:
+                self._fail_if_orphaned(job, now)
+            except OSError:
+                continue
+            if job.finished_at and now - job.finished_at > self.result_ttl:
+                shutil.rmtree(workdir, ignore_errors=True)
@@ -1,20 +1,40 @@
+import multiprocessing
 import os
 import sys
 
+def find_bundled(name):
+    # Önce exe'nin yanındaki klasör (onefile: her açılışta yeniden açılmaz),
+    # sonra PyInstaller'ın açtığı klasör, en son kaynak dizini
+    candidates = []
+    if getattr(sys, 'frozen', False):
+        candidates.append(os.path.dirname(sys.executable))
+    if hasattr(sys, '_MEIPASS'):
+        candidates.append(sys._MEIPASS)
+    candidates.append(os.path.abspath(os.path.dirname(__file__)))
+    for base_path in candidates:
+        path = os.path.join(base_path, name)
+        if os.path.isdir(path):
+            return path
+    return None
+
 def setup_environment():
-    # Uygulama dizinini belirle
-    base_path = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-    
     # Tesseract yolunu ayarla
-    tesseract_path = os.path.join(base_path, 'tesseract')
-    os.environ['PATH'] = tesseract_path + os.pathsep + os.environ.get('PATH', '')
-    os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_path, 'tessdata')
-    
+    tesseract_path = find_bundled('tesseract')
+    if tesseract_path:
+        os.environ['PATH'] = tesseract_path + os.pathsep + os.environ.get('PATH', '')
+        os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_path, 'tessdata')
+        executable = os.path.join(tesseract_path, 'tesseract.exe' if sys.platform == 'win32' else 'tesseract')
+        if os.path.isfile(executable):
+            os.environ.setdefault('TESSERACT_PATH', executable)
+
     # Poppler yolunu ayarla
-    poppler_path = os.path.join(base_path, 'poppler')
-    os.environ['PATH'] = poppler_path + os.pathsep + os.environ.get('PATH', '')
+    poppler_path = find_bundled('poppler')
+    if poppler_path:
+        os.environ['PATH'] = poppler_path + os.pathsep + os.environ.get('PATH', '')
 
 if __name__ == '__main__':
+    # Dondurulmuş (PyInstaller) build'de süreç havuzu için gerekli
+    multiprocessing.freeze_support()
     setup_environment()
-    from app import app
-    app.run(debug=False)
+    from app import main
+    main()
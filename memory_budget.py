@@ -0,0 +1,61 @@
+import threading
+from contextlib import contextmanager
+from typing import Tuple
+
+
+# Bytes per pixel (RGB) en het aantal gelijktijdige kopieën per render:
+# de pixmap van de renderer plus het PIL-beeld dat ervan gemaakt wordt
+BYTES_PER_PIXEL = 3
+RENDER_COPIES = 2
+
+
+def estimate_render_bytes(page_size: Tuple[float, float], zoom: float) -> int:
+    """Geschat geheugen van één render; page_size in punten (1/72 inch)"""
+    width = max(1, int(page_size[0] * zoom))
+    height = max(1, int(page_size[1] * zoom))
+    return width * height * BYTES_PER_PIXEL * RENDER_COPIES
+
+
+class MemoryBudget:
+    """Geheugenbudget voor renders, gedeeld door alle threads van dit proces
+
+    Werk wordt pas gestart als de geschatte pixelbytes binnen het budget
+    passen, zodat het aantal gelijktijdige renders met de paginagrootte
+    meeschaalt in plaats van met een vast aantal threads. Een render die
+    groter is dan het hele budget mag alleen draaien.
+
+    Processen delen het budget niet: geef elk proces zijn deel van het
+    totaal (app.py deelt door het aantal gunicorn-workers).
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit = limit_bytes
+        self.in_use = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def _clamp(self, nbytes: int) -> int:
+        return min(max(0, nbytes), self.limit)
+
+    def acquire(self, nbytes: int) -> int:
+        """Wacht tot nbytes vrij is; geeft het gereserveerde aantal terug"""
+        nbytes = self._clamp(nbytes)
+        with self._condition:
+            while self.in_use + nbytes > self.limit:
+                self._condition.wait()
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        return nbytes
+
+    def release(self, nbytes: int):
+        with self._condition:
+            self.in_use -= nbytes
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        reserved = self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(reserved)
@@ -0,0 +1,199 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+
+# Standaard-buckets (seconden) voor stappen van milliseconden tot minuten
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Oplopende teller, optioneel met labels"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            values = dict(self._values) or ({(): 0} if not self.labelnames else {})
+        for key, value in sorted(values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histogram met cumulatieve buckets, zoals Prometheus verwacht"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            series = {key: (list(counts), total)
+                      for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Metrics van dit proces
+
+    Elke gunicorn-worker houdt een eigen registry bij; Prometheus ziet
+    per scrape dus de worker die het verzoek beantwoordt.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Alle metrics in het Prometheus-tekstformaat"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'museum_stage_seconds', 'Duur per verwerkingsstap in seconden', ['stage']))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'museum_request_seconds', 'Duur van HTTP-verzoeken in seconden', ['endpoint', 'status']))
+PAGES_PROCESSED = REGISTRY.register(Counter(
+    'museum_pages_processed_total', "Aantal verwerkte pagina's"))
+ARTICLES_PROCESSED = REGISTRY.register(Counter(
+    'museum_articles_processed_total', 'Aantal verwerkte artikelen', ['source']))
+BYTES_IN = REGISTRY.register(Counter(
+    'museum_bytes_in_total', "Ontvangen bytes (geüploade PDF's)"))
+BYTES_OUT = REGISTRY.register(Counter(
+    'museum_bytes_out_total', 'Geschreven bytes (ZIP-archieven)'))
+PDF_BYTES_SAVED = REGISTRY.register(Counter(
+    'museum_pdf_bytes_saved_total', 'Bytes bespaard door geoptimaliseerde artikel-PDF\'s'))
+ERRORS = REGISTRY.register(Counter(
+    'museum_errors_total', 'Aantal fouten per stap', ['stage']))
+ADMISSIONS = REGISTRY.register(Counter(
+    'museum_admissions_total', 'Toegelaten en geweigerde verwerkingen', ['result']))
+
+
+class StageTimings:
+    """Verzamelt de duur per stap voor één verzoek of artikel
+
+    Met observe=True gaat elke meting ook naar het histogram
+    museum_stage_seconds. Workerprocessen meten met observe=False en
+    geven de tijden terug; het hoofdproces neemt ze over met merge().
+    """
+
+    def __init__(self, observe: bool = True):
+        self.observe = observe
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        if self.observe:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def merge(self, durations: Dict[str, float]):
+        """Neem metingen uit een ander proces over"""
+        for stage, seconds in durations.items():
+            self.add(stage, seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {stage: round(seconds, 4) for stage, seconds in self.durations.items()}
@@ -11,14 +11,17 @@ added_files = [
 ]
 
 a = Analysis(
-    ['app.py'],
+    ['launcher.py'],
     pathex=[],
     binaries=[],
     datas=added_files,
     hiddenimports=[
+        'app',
+        'fitz',  # PyMuPDF, ilk kullanımda yüklenir
         'PyPDF2',
         'pdf2image',
         'pytesseract',
+        'numpy',
         'werkzeug.middleware.proxy_fix',
         'PIL',  # Pillow için
         'flask',  # Flask için
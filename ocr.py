@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from memory_budget import MemoryBudget, estimate_render_bytes
+from metrics import StageTimings, ERRORS
+from pdf_document import PDFDocument
+from raster_cache import RasterCache
+
+
+_tesseract_lock = threading.Lock()
+_tesseract_ready = False
+
+
+def setup_tesseract():
+    """Tesseract konfiguratie, één keer per proces
+
+    Pas nodig bij de eerste pagina zonder tekstlaag, zodat opstarten niet
+    wacht op pytesseract en een ontbrekende Tesseract alleen OCR raakt.
+    """
+    global _tesseract_ready
+    with _tesseract_lock:
+        if _tesseract_ready:
+            return
+        import platform
+        import pytesseract
+
+        tesseract_path = os.getenv('TESSERACT_PATH')
+
+        if not tesseract_path:
+            if platform.system() == "Windows":
+                tesseract_path = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+            else:
+                tesseract_path = "/usr/bin/tesseract"
+
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+        if not os.path.isfile(pytesseract.pytesseract.tesseract_cmd):
+            raise FileNotFoundError(
+                f"Tesseract niet gevonden: {tesseract_path}. Installeer Tesseract.")
+        _tesseract_ready = True
+
+
+class OCREngine:
+    """Per-pagina tekstherkenning met een snelle route via de tekstlaag
+
+    Pagina's met een bruikbare tekstlaag worden niet gerasterd. Voor de
+    overige pagina's wordt de pagina op `dpi` gerenderd en door Tesseract
+    gehaald. Elke Tesseract-aanroep is een eigen proces; `workers` begrenst
+    hoeveel daarvan tegelijk draaien; met een memory_budget wacht een
+    pagina bovendien tot haar render in het geheugenbudget past. Met een
+    raster_cache wordt een render gedeeld met de afbeeldingen van het artikel.
+    """
+
+    def __init__(self, languages: str = 'nld+eng', dpi: int = 300, workers: int = 2,
+                 page_timeout: int = 120, min_text_chars: int = 20,
+                 memory_budget: MemoryBudget = None):
+        self.languages = languages
+        self.dpi = dpi
+        self.workers = max(1, workers)
+        self.page_timeout = page_timeout
+        self.min_text_chars = min_text_chars
+        self.memory_budget = memory_budget
+        if self.workers > 1:
+            # Tesseract gebruikt anders per proces alle kernen (OpenMP)
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    def has_text_layer(self, text: str) -> bool:
+        return sum(1 for char in text if char.isalnum()) >= self.min_text_chars
+
+    def start(self, document: PDFDocument, page_indices: List[int], logger: logging.Logger = None,
+              progress_callback: Callable[[str, int, int], None] = None,
+              timings: StageTimings = None, raster_cache: RasterCache = None) -> 'OCRRun':
+        """Start de OCR-stap op de achtergrond voor de gegeven 0-gebaseerde pagina's"""
+        return OCRRun(self, document, page_indices, logger, progress_callback, timings,
+                      raster_cache)
+
+    def recognize_page(self, document: PDFDocument, page_index: int,
+                       timings: StageTimings = None, raster_cache: RasterCache = None):
+        """Geef (tekst, methode) voor één pagina"""
+        timings = timings if timings is not None else StageTimings(observe=False)
+        with timings.time('text_extract'):
+            text = document.page_text(page_index)
+        if self.has_text_layer(text):
+            return text, 'text'
+
+        reserved = 0
+        if self.memory_budget:
+            estimate = estimate_render_bytes(document.page_size(page_index), self.dpi / 72)
+            with timings.time('memory_wait'):
+                reserved = self.memory_budget.acquire(estimate)
+        try:
+            def render():
+                return document.renderer.render_page_at_dpi(page_index, self.dpi)
+
+            with timings.time('ocr_rasterize'):
+                image = raster_cache.get(page_index, self.dpi, render) if raster_cache \
+                    else render()
+            if image is None:
+                return text, 'text'
+            setup_tesseract()
+            import pytesseract
+
+            with timings.time('tesseract'):
+                text = pytesseract.image_to_string(
+                    image, lang=self.languages, timeout=self.page_timeout)
+            return text, 'tesseract'
+        finally:
+            if reserved:
+                self.memory_budget.release(reserved)
+
+
+class OCRRun:
+    """Lopende OCR-stap; result() wacht op alle pagina's"""
+
+    def __init__(self, engine: OCREngine, document: PDFDocument, page_indices: List[int],
+                 logger: logging.Logger = None, progress_callback=None,
+                 timings: StageTimings = None, raster_cache: RasterCache = None):
+        self.engine = engine
+        self.document = document
+        self.raster_cache = raster_cache
+        self.logger = logger or logging.getLogger(__name__)
+        self.progress_callback = progress_callback
+        self.timings = timings if timings is not None else StageTimings()
+        self.page_indices = list(page_indices)
+        self.total = len(self.page_indices)
+        self.done = 0
+        self.methods = {'text': 0, 'tesseract': 0, 'failed': 0}
+        self.failed_pages = set()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+        if self.progress_callback:
+            self.progress_callback('ocr', 0, self.total)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=engine.workers, thread_name_prefix='ocr')
+        self._futures = {
+            page_index: self._executor.submit(self._run_page, page_index)
+            for page_index in self.page_indices
+        }
+
+    def _run_page(self, page_index):
+        try:
+            text, method = self.engine.recognize_page(
+                self.document, page_index, self.timings, self.raster_cache)
+        except Exception as e:
+            # Een time-out of fout op één pagina mag de rest niet tegenhouden
+            ERRORS.inc(stage='ocr')
+            self.logger.error(f"OCR mislukt voor pagina {page_index + 1}: {e}")
+            text, method = "", 'failed'
+
+        with self._lock:
+            self.done += 1
+            self.methods[method] += 1
+            if method == 'failed':
+                self.failed_pages.add(page_index)
+            if self.progress_callback:
+                self.progress_callback('ocr', self.done, self.total)
+        return text
+
+    def texts(self, page_indices: List[int]) -> Dict[int, str]:
+        """Wacht alleen op de gegeven pagina's en geef {pagina-index: tekst}"""
+        return {page_index: self._futures[page_index].result()
+                for page_index in page_indices}
+
+    def cancel(self):
+        """Sla pagina's over die nog niet begonnen zijn en wacht op de lopende"""
+        self._executor.shutdown(cancel_futures=True)
+
+    def result(self) -> Dict[int, str]:
+        """Wacht op alle pagina's en geef {pagina-index: tekst}"""
+        try:
+            texts = {page_index: future.result()
+                     for page_index, future in self._futures.items()}
+        finally:
+            self._executor.shutdown()
+
+        elapsed = time.perf_counter() - self._started
+        rate = self.total / elapsed if elapsed > 0 else 0.0
+        self.logger.info(
+            f"OCR voltooid: {self.total} pagina's in {elapsed:.2f}s ({rate:.2f} pagina's/s); "
+            f"tekstlaag: {self.methods['text']}, tesseract: {self.methods['tesseract']}, "
+            f"mislukt: {self.methods['failed']}")
+        return texts
@@ -0,0 +1,143 @@
+from concurrent.futures import Executor
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from renderers import create_renderer
+
+
+# Verhogen als de uitkomst van de analyse verandert (ongeldig maakt opgeslagen resultaten)
+ANALYSIS_VERSION = 1
+
+# Elke pagina wordt herschaald naar dit raster (breedte, hoogte); deelbaar
+# in 9x8 blokken voor een dHash van 64 bits
+GRID = (144, 128)
+RENDER_SIZE = (192, 256)
+# Een pixel is inkt als hij zoveel donkerder is dan het papier van die pagina
+INK_CONTRAST = 24
+# Minder inkt dan dit (fractie van het binnenste deel) geldt als blanco pagina
+BLANK_INK = 0.002
+# Dubbele pagina's: ruime dHash-afstand (van 64 bits) als voorfilter, daarna
+# de correlatie van het fijne detail; verschillende pagina's met dezelfde
+# opmaak blijven daar ruim onder, een nieuwe scan van dezelfde pagina erboven
+DUPLICATE_DISTANCE = 16
+DUPLICATE_CORRELATION = 0.5
+# Pagina's per rendertaak
+ANALYSIS_CHUNK = 32
+
+
+def render_grid(pdf_path: str, page_indices: List[int], render_backend: str = 'auto') -> bytes:
+    """Render pagina's als grijswaardenraster; len(page_indices) * GRID bytes
+
+    Staat op moduleniveau, zodat het ook in een workerproces kan draaien.
+    """
+    empty = bytes([255]) * (GRID[0] * GRID[1])
+    parts = []
+    with create_renderer(pdf_path, render_backend) as renderer:
+        for page_index in page_indices:
+            image = renderer.render_page(page_index, RENDER_SIZE)
+            if image is None:
+                parts.append(empty)
+                continue
+            parts.append(image.convert('L').resize(GRID, Image.BILINEAR).tobytes())
+    return b''.join(parts)
+
+
+def analyze_pages(pixels: np.ndarray) -> Dict:
+    """Zoek blanco en dubbele pagina's in één keer over alle pagina's
+
+    pixels: uint8-array (pagina's, hoogte, breedte) in de vorm van GRID.
+    Paginanummers in het resultaat beginnen bij 1, zoals in het formulier.
+    """
+    count, height, width = pixels.shape
+    gray = pixels.astype(np.float32)
+
+    # Inktdekking ten opzichte van het papier, zonder de randen waar scans
+    # vaak donkere stroken hebben
+    margin_y, margin_x = height // 20, width // 20
+    inner = gray[:, margin_y:height - margin_y, margin_x:width - margin_x]
+    paper = np.percentile(inner.reshape(count, -1), 90, axis=1)
+    ink = (inner < (paper - INK_CONTRAST)[:, None, None]).mean(axis=(1, 2))
+    blank = ink < BLANK_INK
+
+    # dHash: per blok het gemiddelde, dan horizontaal lichter/donkerder
+    blocks = gray.reshape(count, 8, height // 8, 9, width // 9).mean(axis=(2, 4))
+    bits = (blocks[:, :, 1:] > blocks[:, :, :-1]).reshape(count, 64)
+    # Hamming-afstand tussen alle paren als matrixproduct
+    ones = bits.astype(np.float32)
+    distances = ones @ (1 - ones).T + (1 - ones) @ ones.T
+
+    # Fijn detail op halve resolutie (bestand tegen een paar pixels
+    # verschuiving), genormaliseerd zodat het product de correlatie is
+    half = gray[:, :height // 2 * 2, :width // 2 * 2].reshape(
+        count, height // 2, 2, width // 2, 2).mean(axis=(2, 4))
+    detail = half - (np.roll(half, 1, axis=2) + np.roll(half, -1, axis=2)) / 2
+    detail = detail.reshape(count, -1)
+    detail -= detail.mean(axis=1, keepdims=True)
+    detail /= np.linalg.norm(detail, axis=1, keepdims=True) + 1e-6
+    correlation = detail @ detail.T
+
+    # Blanco pagina's lijken allemaal op elkaar; die niet als dubbel tellen
+    duplicates = ((distances <= DUPLICATE_DISTANCE)
+                  & (correlation >= DUPLICATE_CORRELATION)
+                  & ~blank[:, None] & ~blank[None, :])
+    first, second = np.nonzero(np.triu(duplicates, k=1))
+
+    groups = _group_pairs(count, first, second)
+    blank_pages = [int(i) + 1 for i in np.flatnonzero(blank)]
+    # Van een groep dubbele pagina's blijft de eerste staan
+    suggested = sorted(set(blank_pages) | {page for group in groups for page in group[1:]})
+
+    return {
+        'version': ANALYSIS_VERSION,
+        'page_count': count,
+        'blank_pages': blank_pages,
+        'duplicate_groups': groups,
+        'remove_pages': ','.join(str(page) for page in suggested),
+        'ink_coverage': [round(float(value), 4) for value in ink],
+        'hashes': [bytes(np.packbits(row)).hex() for row in bits],
+    }
+
+
+def _group_pairs(count: int, first: np.ndarray, second: np.ndarray) -> List[List[int]]:
+    """Voeg paren van gelijke pagina's samen tot groepen (1-gebaseerd)"""
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in zip(first.tolist(), second.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for i in sorted(set(first.tolist()) | set(second.tolist())):
+        groups.setdefault(find(i), []).append(i + 1)
+    return sorted(groups.values())
+
+
+def analyze_document(pdf_path: str, page_count: int, render_backend: str = 'auto',
+                     executor: Executor = None) -> Dict:
+    """Render alle pagina's op lage resolutie en analyseer ze samen
+
+    Met een executor (bij voorkeur een procespool) wordt het renderen over
+    stukken van ANALYSIS_CHUNK pagina's verdeeld; de analyse zelf is één
+    NumPy-stap over alle pagina's.
+    """
+    chunks = [list(range(start, min(start + ANALYSIS_CHUNK, page_count)))
+              for start in range(0, page_count, ANALYSIS_CHUNK)]
+    if executor is None:
+        parts = [render_grid(pdf_path, chunk, render_backend) for chunk in chunks]
+    else:
+        futures = [executor.submit(render_grid, pdf_path, chunk, render_backend)
+                   for chunk in chunks]
+        parts = [future.result() for future in futures]
+
+    pixels = np.frombuffer(b''.join(parts), dtype=np.uint8).reshape(
+        page_count, GRID[1], GRID[0])
+    return analyze_pages(pixels)
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from renderers import MuPDFHandles, PageRenderer, create_renderer
+
+
+class PDFDocument:
+    """Eén keer geparst PDF-document, herbruikbaar binnen een verzoek
+
+    De PdfReader, de renderer en de geëxtraheerde paginatekst worden
+    gedeeld, zodat het bestand maar één keer geparst wordt. PdfReader is
+    niet thread-safe; gebruik `lock` rond alles wat de reader aanraakt.
+    De PyMuPDF-renderer en mupdf() delen één geopend document per thread.
+    """
+
+    def __init__(self, path: str, render_backend: str = 'auto', content_hash: str = None):
+        self.path = str(path)
+        self.render_backend = render_backend
+        # PyPDF2 pas laden als er echt een document geopend wordt
+        from PyPDF2 import PdfReader
+
+        self.reader = PdfReader(self.path)
+        self.lock = threading.RLock()
+        self._renderer = None
+        self._mupdf = MuPDFHandles(self.path)
+        self._texts = {}
+        self._sizes = {}
+        self._content_hash = content_hash
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 van het bestand, berekend bij het eerste gebruik"""
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            with open(self.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def page(self, index: int):
+        """Pagina op 0-gebaseerde index"""
+        return self.reader.pages[index]
+
+    def page_size(self, index: int):
+        """(breedte, hoogte) in punten zoals weergegeven, dus na /Rotate"""
+        with self.lock:
+            if index not in self._sizes:
+                page = self.reader.pages[index]
+                box = page.mediabox
+                width, height = float(box.width), float(box.height)
+                if (page.get('/Rotate') or 0) % 180:
+                    width, height = height, width
+                self._sizes[index] = (width, height)
+            return self._sizes[index]
+
+    def page_text(self, index: int) -> str:
+        """Tekstlaag van een pagina, maximaal één keer geëxtraheerd"""
+        with self.lock:
+            if index not in self._texts:
+                self._texts[index] = self.reader.pages[index].extract_text() or ""
+            return self._texts[index]
+
+    @property
+    def renderer(self) -> PageRenderer:
+        with self.lock:
+            if self._renderer is None:
+                self._renderer = create_renderer(
+                    self.path, self.render_backend, self._mupdf)
+            return self._renderer
+
+    def mupdf(self):
+        """Het fitz.Document (PyMuPDF) van de huidige thread"""
+        return self._mupdf.get()
+
+    def close(self):
+        with self.lock:
+            if self._renderer is not None:
+                self._renderer.close()
+                self._renderer = None
+            self._mupdf.close()
+            self._texts.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DocumentCache:
+    """LRU-cache van geopende documenten, sleutel: pad, mtime en grootte"""
+
+    def __init__(self, limit: int = 2, render_backend: str = 'auto'):
+        self.limit = limit
+        self.render_backend = render_backend
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str):
+        stat = os.stat(path)
+        return (str(path), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path: str) -> PDFDocument:
+        key = self._key(path)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                return document
+
+            document = PDFDocument(path, self.render_backend)
+            self._documents[key] = document
+            while len(self._documents) > self.limit:
+                _, old_document = self._documents.popitem(last=False)
+                old_document.close()
+            return document
+
+    def clear(self):
+        with self._lock:
+            for document in self._documents.values():
+                document.close()
+            self._documents.clear()
@@ -1,63 +1,200 @@
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
+import multiprocessing
 import os
+import json
 import logging
+import queue
 from datetime import datetime
-from PyPDF2 import PdfReader, PdfWriter
-from pdf2image import convert_from_path
-import pytesseract
-import tempfile
-from typing import List, Dict
+from typing import TYPE_CHECKING, Callable, List, Dict, Set, Tuple
 from pathlib import Path
-from PIL import Image
 import re
+import sqlite3
+import threading
+from pdf_document import DocumentCache, PDFDocument
+from renderers import fit_zoom
+from ocr import OCREngine, setup_tesseract
+from result_cache import ResultCache
+from search_index import SearchIndex
+from derivatives import DEFAULT_PRESETS, ImagePreset, render_size, write_derivatives
+from job_logging import JobLog
+from memory_budget import MemoryBudget, estimate_render_bytes
+from metrics import (StageTimings, PAGES_PROCESSED, ARTICLES_PROCESSED, PDF_BYTES_SAVED,
+                     ERRORS)
+from pdf_output import PdfOutputOptions, write_optimized_pdf
+from raster_cache import RasterCache
+from workspace import Workspace, WorkspaceManager
+from work_queue import QueueExecutor, WorkQueue
+
+if TYPE_CHECKING:
+    from PyPDF2 import PdfReader, PdfWriter
+
+
+class _ProgressCounter:
+    """Telt afgeronde onderdelen en meldt de voortgang"""
+
+    def __init__(self, stage: str, total: int, callback=None, done: int = 0):
+        self.stage = stage
+        self.total = total
+        self.done = done
+        self.callback = callback
+        self._lock = threading.Lock()
+        if self.callback:
+            self.callback(self.stage, self.done, self.total)
+
+    def increment(self, _future=None):
+        if not self.callback:
+            return
+        with self._lock:
+            self.done += 1
+            self.callback(self.stage, self.done, self.total)
+
+
+# Logger buiten een verwerking, bijvoorbeeld in workerprocessen
+_default_logger = logging.getLogger(__name__)
+
+# Procesmodus: elke worker opent de invoer zelf en houdt die open (shared-nothing)
+_worker_processor = None
+_worker_documents = None
+
+
+def _init_process_worker(settings):
+    global _worker_processor, _worker_documents
+    _worker_processor = PDFProcessor(**settings)
+    _worker_documents = DocumentCache(
+        render_backend=_worker_processor.render_backend)
+
+
+def _process_range_in_worker(input_pdf, page_range, pages_to_remove, base_path, year, number):
+    """Verwerk één artikel in een workerproces; geeft alleen bestandspaden, tijden en verslag terug"""
+    document = _worker_documents.get(input_pdf)
+    return _worker_processor._process_single_range(
+        document, page_range, pages_to_remove, base_path, year, number)
+
+
+# Wachtrijmodus: per set instellingen één processor met eigen documentcache
+_queue_processors = {}
+
+
+def run_queue_task(payload: Dict) -> Dict:
+    """Verwerk één artikel uit de werkwachtrij; draait in queue_worker.py"""
+    settings = payload['settings']
+    key = json.dumps(settings, sort_keys=True)
+    if key not in _queue_processors:
+        processor = PDFProcessor(
+            max_workers=1,
+            render_backend=settings['render_backend'],
+            image_presets=[ImagePreset(**preset) for preset in settings['image_presets']],
+            pdf_output=PdfOutputOptions(**settings['pdf_output']))
+        _queue_processors[key] = (processor, DocumentCache(render_backend=processor.render_backend))
+    processor, documents = _queue_processors[key]
+
+    # De paden komen van een andere host; zonder gedeelde opslag bestaan ze hier niet
+    if not os.path.isfile(payload['input_pdf']):
+        raise FileNotFoundError(
+            f"Bron-PDF niet gevonden op deze worker: {payload['input_pdf']} "
+            f"(staan WORKSPACE_ROOT, JOB_ROOT en UPLOAD_ROOT op gedeelde opslag?)")
+    if not os.path.isdir(payload['base_path']):
+        raise FileNotFoundError(
+            f"Werkmap niet gevonden op deze worker: {payload['base_path']} "
+            f"(staat WORKSPACE_ROOT op gedeelde opslag?)")
+
+    document = documents.get(payload['input_pdf'])
+    outputs, timings, pdf_report = processor._process_single_range(
+        document, payload['page_range'], payload['pages_to_remove'],
+        Path(payload['base_path']), payload['year'], payload['number'])
+    return {'outputs': outputs, 'timings': timings, 'pdf_report': pdf_report}
 
 
 class PDFProcessor:
-    def __init__(self, max_workers=None):
-        self.setup_tesseract()
-        self.logger = None
+    EXECUTION_MODES = ('thread', 'process', 'queue')
+
+    def __init__(self, max_workers=None, render_backend='auto', execution_mode='thread',
+                 ocr_engine: OCREngine = None, result_cache: ResultCache = None,
+                 log_format: str = 'text', image_presets: List[ImagePreset] = None,
+                 memory_budget: MemoryBudget = None, search_index: SearchIndex = None,
+                 pdf_output: PdfOutputOptions = None, workspaces: WorkspaceManager = None,
+                 work_queue: WorkQueue = None, raster_cache_bytes: int = 256 * 1024 * 1024):
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Onbekende uitvoeringsmodus: {execution_mode}")
+        if execution_mode == 'queue' and work_queue is None:
+            raise ValueError("De uitvoeringsmodus 'queue' heeft een werkwachtrij nodig")
+
+        self.log_format = log_format
+        self.image_presets = list(image_presets or DEFAULT_PRESETS)
+        if not self.image_presets:
+            raise ValueError("Er is minstens één afbeeldingspreset nodig")
         self.max_workers = max_workers or (os.cpu_count() or 1)
+        self.render_backend = render_backend
+        self.execution_mode = execution_mode
+        self.ocr_engine = ocr_engine or OCREngine()
+        self.result_cache = result_cache
+        self.memory_budget = memory_budget
+        self.search_index = search_index
+        self.pdf_output = pdf_output or PdfOutputOptions()
+        self._workspaces = workspaces
+        # In de wachtrijmodus moeten invoer en werkmappen op gedeelde opslag staan
+        self.work_queue = work_queue
+        # Gedeelde renders per verwerking (threadmodus); 0 schakelt dat uit
+        self.raster_cache_bytes = raster_cache_bytes
+        if memory_budget and self.ocr_engine.memory_budget is None:
+            # Renders voor OCR en voor afbeeldingen delen hetzelfde budget
+            self.ocr_engine.memory_budget = memory_budget
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+
+    def get_process_pool(self) -> ProcessPoolExecutor:
+        """Gedeelde procespool, pas bij het eerste gebruik gestart"""
+        with self._pool_lock:
+            if self._process_pool is None:
+                # 'spawn': forken vanuit een multithreaded server is niet veilig
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_process_worker,
+                    initargs=({'max_workers': 1,
+                               'render_backend': self.render_backend,
+                               'image_presets': self.image_presets,
+                               'pdf_output': self.pdf_output},))
+            return self._process_pool
+
+    def shutdown(self):
+        """Stop de procespool"""
+        with self._pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
 
     @staticmethod
     def setup_tesseract():
-        """Tesseract konfiguratie"""
-        import platform
-
-        tesseract_path = os.getenv('TESSERACT_PATH')
-
-        if not tesseract_path:
-            if platform.system() == "Windows":
-                tesseract_path = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-            else:
-                tesseract_path = "/usr/bin/tesseract"
-
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
-        if not os.path.isfile(pytesseract.pytesseract.tesseract_cmd):
-            raise FileNotFoundError(
-                f"Tesseract niet gevonden: {tesseract_path}. Installeer Tesseract.")
-
-    def create_output_folders(self) -> Path:
-        """Maak tijdelijke uitvoermappen"""
-        temp_dir = tempfile.mkdtemp()
-        base_path = Path(temp_dir)
-
-        for folder in ['pdf', 'ocr', 'small', 'large', 'log']:
-            (base_path / folder).mkdir(parents=True, exist_ok=True)
-
-        return base_path
-
-    def setup_logging(self, base_path: Path) -> logging.Logger:
-        """Logging configuratie"""
+        """Tesseract konfiguratie; gebeurt anders vanzelf bij de eerste OCR-pagina"""
+        setup_tesseract()
+
+    @property
+    def workspaces(self) -> WorkspaceManager:
+        """Werkmappen van de verwerkingen, standaard in de tijdelijke map"""
+        with self._pool_lock:
+            if self._workspaces is None:
+                self._workspaces = WorkspaceManager()
+            return self._workspaces
+
+    def create_output_folders(self, workspace: Workspace) -> Path:
+        """Maak de uitvoermappen in de werkmap"""
+        folders = ['pdf', 'ocr', 'log'] + [preset.name for preset in self.image_presets]
+        for folder in folders:
+            workspace.folder(folder)
+
+        return workspace.path
+
+    def setup_logging(self, base_path: Path, job: str = None) -> JobLog:
+        """Eigen log voor deze verwerking in base_path/log"""
         log_file = base_path / 'log' / f"{datetime.now():%Y%m%d_%H%M%S}.log"
-        logging.basicConfig(filename=log_file, level=logging.INFO,
-                            format='%(asctime)s - %(levelname)s - %(message)s')
-        logger = logging.getLogger()
+        job_log = JobLog(log_file, self.log_format, job)
 
-        logger.info("PDF verwerking gestart.")
-        logger.info(f"Tijdelijke map aangemaakt: {base_path}")
+        job_log.logger.info("PDF verwerking gestart.")
+        job_log.logger.info(f"Tijdelijke map aangemaakt: {base_path}")
 
-        return logger
+        return job_log
 
     @staticmethod
     def generate_filename(year: str, number: str, range_str: str) -> str:
@@ -65,27 +202,67 @@ class PDFProcessor:
         start, end = range_str.split('-')
         return f"{year}{number.zfill(2)}{start.zfill(2)}{end.zfill(2)}"
 
-    def get_pdf_reader(self, input_pdf: str) -> PdfReader:
+    def get_pdf_reader(self, input_pdf: str) -> 'PdfReader':
         """Lees PDF-bestand"""
+        from PyPDF2 import PdfReader
+
         return PdfReader(input_pdf)
 
-    def process_pdf(self, input_pdf: str, pages_to_remove: List[int] = None,
+    def open_document(self, input_pdf: str, content_hash: str = None) -> PDFDocument:
+        """Open een PDF één keer, om te hergebruiken in process_pdf"""
+        return PDFDocument(input_pdf, self.render_backend, content_hash)
+
+    def process_pdf(self, input_pdf: str = None, pages_to_remove: List[int] = None,
                     article_ranges: List[List[int]] = None, merge_article_indices: List[int] = None,
-                    year: str = None, number: str = None) -> Dict[str, List[str]]:
+                    year: str = None, number: str = None,
+                    progress_callback: Callable[[str, int, int], None] = None,
+                    document: PDFDocument = None,
+                    timings: StageTimings = None,
+                    on_output: Callable[[str, List[str]], None] = None,
+                    workspace: Workspace = None) -> Dict[str, List[str]]:
+        """Verwerk de artikelen; geeft de uitvoerbestanden per type
+
+        on_output(type, paden) wordt aangeroepen zodra bestanden van een
+        artikel klaar zijn, in de volgorde waarin ze klaarkomen; zo kan een
+        archief al gevuld worden terwijl andere artikelen nog lopen. Het log
+        is pas compleet als deze methode terugkeert en komt alleen in de
+        teruggegeven uitvoer.
+
+        De uitvoer komt in workspace; die ruimt de aanroeper op. Zonder
+        workspace wordt een nieuwe werkmap gemaakt, die na een fout meteen
+        weer verwijderd wordt.
+        """
+        # Een meegegeven document is van de aanroeper en wordt hier niet gesloten
+        owns_document = document is None
+        owns_workspace = workspace is None
+        succeeded = False
+        timings = timings if timings is not None else StageTimings()
+        job_log = None
+        logger = None
+        raster_cache = None
+        ocr_run = None
         try:
-            base_path = self.create_output_folders()
-            self.logger = self.setup_logging(base_path)
-            self.logger.info(
+            if document is None:
+                with timings.time('parse'):
+                    document = self.open_document(input_pdf)
+            input_pdf = input_pdf or document.path
+
+            if workspace is None:
+                workspace = self.workspaces.create()
+            base_path = self.create_output_folders(workspace)
+            job_log = self.setup_logging(base_path, f"output{year}{number}")
+            logger = job_log.logger
+            logger.info(
                 f"PDF verwerking gestart: {os.path.basename(input_pdf)}")
 
-            reader = self.get_pdf_reader(input_pdf)
-            total_pages = len(reader.pages)
+            total_pages = document.page_count
 
             if total_pages == 0:
                 raise ValueError(
                     "PDF-bestand is leeg of kan niet worden gelezen")
 
-            outputs = {'pdf': [], 'small': [], 'large': [], 'ocr': []}
+            outputs = {'pdf': [], **{preset.name: [] for preset in self.image_presets},
+                       'ocr': []}
 
             if not article_ranges:
                 article_ranges = [[i + 1 for i in range(total_pages)]]
@@ -94,94 +271,384 @@ class PDFProcessor:
                 article_ranges = self._merge_articles(
                     article_ranges, merge_article_indices)
 
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = []
-                for page_range in article_ranges:
-                    futures.append(executor.submit(
-                        self._process_single_range,
-                        reader,
-                        page_range,
-                        pages_to_remove,
-                        base_path,
-                        year,
-                        number
-                    ))
-
-                for future in futures:
-                    try:
-                        result = future.result()
-                        for key, value in result.items():
-                            outputs[key].extend(value)
-                    except Exception as e:
-                        self.logger.error(f"Fout: {e}")
-
-            self.logger.info("PDF verwerking voltooid.")
+            article_pages = [self._kept_pages(page_range, pages_to_remove)
+                             for page_range in article_ranges]
+            base_names = [self._article_base_name(page_range, year, number)
+                          for page_range in article_ranges]
+
+            # Artikelen uit de resultaatcache halen; alleen de rest wordt berekend
+            article_results = [None] * len(article_ranges)
+            cache_keys = [None] * len(article_ranges)
+            if self.result_cache:
+                settings = self._cache_settings()
+                for i, page_range in enumerate(article_ranges):
+                    cache_keys[i] = self.result_cache.make_key(
+                        document.content_hash, page_range, pages_to_remove, settings)
+                    article_results[i] = self.result_cache.get(
+                        cache_keys[i], base_path, base_names[i])
+            pending = [i for i, result in enumerate(article_results)
+                       if result is None]
+            if self.result_cache:
+                logger.info(
+                    f"Resultaatcache: {len(article_ranges) - len(pending)} van "
+                    f"{len(article_ranges)} artikelen uit de cache "
+                    f"({self.result_cache.stats()})")
+            if on_output:
+                for result in article_results:
+                    if result is not None:
+                        self._emit_outputs(on_output, result)
+
+            # OCR per pagina, parallel aan het samenstellen van de artikelen
+            ocr_pages = sorted({page_num for i in pending
+                                for page_num in article_pages[i]})
+
+            # Elke bronpagina hooguit één keer renderen: de OCR en de
+            # afbeeldingen van een artikel delen de render van de eerste pagina.
+            # Alleen in de threadmodus; anders renderen andere processen.
+            first_pages = [article_pages[i][0] - 1 for i in pending if article_pages[i]]
+            render_dpis = {}
+            if self.execution_mode == 'thread' and self.raster_cache_bytes > 0:
+                raster_cache = RasterCache(workspace.path / 'raster', self.raster_cache_bytes)
+                render_dpis = self._plan_renders(
+                    document, first_pages, {page_num - 1 for page_num in ocr_pages},
+                    raster_cache)
+
+            ocr_run = self.ocr_engine.start(
+                document, [page_num - 1 for page_num in ocr_pages],
+                logger, progress_callback, timings, raster_cache)
+
+            pdf_totals = {'pdf_bytes': 0, 'pdf_bytes_saved': 0}
+
+            progress = _ProgressCounter(
+                'articles', len(article_ranges), progress_callback,
+                done=len(article_ranges) - len(pending))
+
+            if self.execution_mode == 'queue':
+                logger.info(f"Uitvoeringsmodus: queue ({self.work_queue!r})")
+                executor = QueueExecutor(self.work_queue)
+                settings = self._worker_settings()
+                submit_args = [
+                    ({'input_pdf': os.path.abspath(input_pdf), 'page_range': article_ranges[i],
+                      'pages_to_remove': sorted(pages_to_remove or []),
+                      'base_path': os.path.abspath(base_path), 'year': year, 'number': number,
+                      'settings': settings},)
+                    for i in pending]
+            elif self.execution_mode == 'process':
+                logger.info(
+                    f"Uitvoeringsmodus: process ({self.max_workers} workers)")
+                executor = nullcontext(self.get_process_pool())
+                submit_args = [
+                    (_process_range_in_worker, input_pdf, article_ranges[i],
+                     pages_to_remove, base_path, year, number)
+                    for i in pending]
+            else:
+                logger.info(
+                    f"Uitvoeringsmodus: thread, render-backend: {document.renderer.name}")
+                executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                submit_args = [
+                    (self._process_single_range, document, article_ranges[i],
+                     pages_to_remove, base_path, year, number, logger, raster_cache,
+                     render_dpis.get(article_pages[i][0] - 1) if article_pages[i] else None)
+                    for i in pending]
+
+            failed = {}
+
+            def collect(future):
+                i = futures[future]
+                try:
+                    article_results[i], article_timings, pdf_report = future.result()
+                except Exception as e:
+                    ERRORS.inc(stage='article')
+                    logger.error(f"Fout: {e}")
+                    failed[base_names[i]] = str(e)
+                    return
+                timings.merge(article_timings)
+                for key in pdf_totals:
+                    pdf_totals[key] += pdf_report[key]
+                logger.info(
+                    f"Artikel {base_names[i]}: {len(article_pages[i])} pagina's, "
+                    f"PDF {pdf_report['pdf_bytes']} bytes "
+                    f"({pdf_report['pdf_bytes_saved']} bespaard), "
+                    f"tijden {json.dumps(article_timings, sort_keys=True)}")
+                if on_output:
+                    self._emit_outputs(on_output, article_results[i])
+
+            with executor as pool:
+                futures = {}
+                finished = queue.Queue()
+                handled = 0
+                for i, args in zip(pending, submit_args):
+                    # Pas indienen als de render binnen het geheugenbudget past;
+                    # het budget komt vrij zodra het artikel klaar is
+                    reserved = 0
+                    # Workers uit de wachtrij renderen niet in dit proces
+                    if self.memory_budget and article_pages[i] and self.execution_mode != 'queue':
+                        with timings.time('memory_wait'):
+                            first_page_index = article_pages[i][0] - 1
+                            reserved = self.memory_budget.acquire(self._render_estimate(
+                                document, first_page_index, render_dpis.get(first_page_index)))
+                    future = pool.submit(*args)
+                    futures[future] = i
+                    if reserved:
+                        future.add_done_callback(
+                            lambda _future, nbytes=reserved: self.memory_budget.release(nbytes))
+                    future.add_done_callback(progress.increment)
+                    future.add_done_callback(finished.put)
+                    # Wat intussen klaar is meteen afhandelen
+                    while not finished.empty():
+                        collect(finished.get())
+                        handled += 1
+                        workspace.check_quota()
+
+                while handled < len(futures):
+                    collect(finished.get())
+                    handled += 1
+                    workspace.check_quota()
+
+            # Een onvolledig nummer is geen geslaagde verwerking
+            if failed:
+                raise RuntimeError(
+                    f"{len(failed)} van {len(article_ranges)} artikelen mislukt: "
+                    + "; ".join(f"{name}: {error}" for name, error in sorted(failed.items())))
+
+            # Tekst per artikel wegschrijven zodra de OCR van zijn pagina's klaar is
+            for i in pending:
+                page_texts = ocr_run.texts(
+                    [page_num - 1 for page_num in article_pages[i]])
+                text = "".join(page_texts[page_num - 1]
+                               for page_num in article_pages[i])
+                ocr_path = self._save_text(text, base_names[i], base_path)
+                if on_output:
+                    on_output('ocr', [ocr_path])
+                if article_results[i] is None:
+                    article_results[i] = {'ocr': [ocr_path]}
+                    continue
+
+                article_results[i]['ocr'] = [ocr_path]
+                # Mislukte OCR niet cachen, dan wordt het later opnieuw geprobeerd
+                ocr_failed = any(page_num - 1 in ocr_run.failed_pages
+                                 for page_num in article_pages[i])
+                if self.result_cache and not ocr_failed:
+                    self.result_cache.put(cache_keys[i], {
+                        output_type: paths[0]
+                        for output_type, paths in article_results[i].items() if paths})
+            ocr_run.result()
+            workspace.check_quota()
+            if raster_cache:
+                logger.info(f"Rastercache: {raster_cache.stats()}")
+
+            if self.search_index and year and number:
+                with timings.time('index'):
+                    self._index_articles(year, number, article_ranges, base_names,
+                                         article_results, logger)
+
+            for result in article_results:
+                for key, value in result.items():
+                    outputs[key].extend(value)
+
+            PAGES_PROCESSED.inc(sum(len(pages) for pages in article_pages))
+            ARTICLES_PROCESSED.inc(len(article_ranges) - len(pending), source='cache')
+            ARTICLES_PROCESSED.inc(len(pending), source='computed')
+            PDF_BYTES_SAVED.inc(pdf_totals['pdf_bytes_saved'])
+            logger.info(
+                f"PDF-uitvoer ({self.pdf_output.mode}): {pdf_totals['pdf_bytes']} bytes, "
+                f"{pdf_totals['pdf_bytes_saved']} bytes bespaard")
+            logger.info(
+                f"Tijden per stap: {json.dumps(timings.as_dict(), sort_keys=True)}")
+            logger.info("PDF verwerking voltooid.")
+            # Het log wordt bij het afsluiten (finally) volledig weggeschreven
+            outputs['log'] = [str(job_log.path)]
+            succeeded = True
             return outputs
 
         except Exception as e:
-            if self.logger:
-                self.logger.error(f"PDF verwerkingsfout: {str(e)}")
+            ERRORS.inc(stage='process')
+            if logger:
+                logger.error(f"PDF verwerkingsfout: {str(e)}")
             raise
 
-    def _process_single_range(self, reader, page_range, pages_to_remove, base_path, year, number):
-        writer = PdfWriter()
-        for page_num in page_range:
-            if not pages_to_remove or page_num not in pages_to_remove:
-                writer.add_page(reader.pages[page_num - 1])
+        finally:
+            if ocr_run is not None:
+                # Na een fout niet doorgaan met OCR op een document dat sluit
+                ocr_run.cancel()
+            if raster_cache is not None:
+                raster_cache.clear()
+            if job_log is not None:
+                job_log.close()
+            if owns_document and document is not None:
+                document.close()
+            if owns_workspace and not succeeded and workspace is not None:
+                workspace.remove()
+
+    def _index_articles(self, year: str, number: str, article_ranges: List[List[int]],
+                        base_names: List[str], article_results: List[Dict[str, List[str]]],
+                        logger: logging.Logger):
+        """Vervang de artikelen van dit nummer in de zoekindex"""
+        articles = []
+        try:
+            for page_range, base_name, result in zip(article_ranges, base_names, article_results):
+                with open(result['ocr'][0], encoding='utf-8') as text_file:
+                    text = text_file.read()
+                articles.append({'start_page': min(page_range), 'end_page': max(page_range),
+                                 'filename': f"{base_name}.pdf", 'text': text})
+            self.search_index.replace_issue(year, number, articles)
+        except (OSError, KeyError, sqlite3.Error) as e:
+            # De zoekindex is een extra; de verwerking zelf is wel gelukt
+            ERRORS.inc(stage='index')
+            logger.error(f"Fout bij het bijwerken van de zoekindex: {e}")
+            return
+        logger.info(f"Zoekindex bijgewerkt: {len(articles)} artikelen")
+
+    def _render_estimate(self, document: PDFDocument, page_index: int, dpi: float = None) -> int:
+        """Geschatte pixelbytes van de render voor de afbeeldingen van één artikel"""
+        dpi = dpi or self._thumbnail_dpi(document, page_index)
+        return estimate_render_bytes(document.page_size(page_index), dpi / 72)
+
+    def _thumbnail_dpi(self, document: PDFDocument, page_index: int) -> float:
+        """DPI waarop de pagina precies de grootste afbeelding vult"""
+        page_size = document.page_size(page_index)
+        return fit_zoom(page_size[0], page_size[1], render_size(self.image_presets)) * 72
+
+    def _plan_renders(self, document: PDFDocument, first_pages: List[int],
+                      ocr_pages: Set[int], raster_cache: RasterCache) -> Dict[int, float]:
+        """Kies per eerste pagina de render-DPI en meld de verwachte gebruiken
+
+        Rendert de OCR de pagina toch (geen tekstlaag), dan worden de
+        afbeeldingen uit die render gemaakt, mits die groot genoeg is en de
+        renderer een losse kleine render niet goedkoper maakt.
+        """
+        share_ocr = document.renderer.reuse_larger_renders
+        dpis = {}
+        for page_index in first_pages:
+            if page_index not in dpis:
+                dpis[page_index] = self._thumbnail_dpi(document, page_index)
+                if (share_ocr and page_index in ocr_pages
+                        and self.ocr_engine.dpi >= dpis[page_index]
+                        and not self.ocr_engine.has_text_layer(document.page_text(page_index))):
+                    dpis[page_index] = self.ocr_engine.dpi
+                    # Het gebruik door de OCR
+                    raster_cache.expect(page_index, self.ocr_engine.dpi)
+            # Overlappende artikelen kunnen dezelfde eerste pagina hebben
+            raster_cache.expect(page_index, dpis[page_index])
+        return dpis
 
-        range_str = f"{min(page_range)}-{max(page_range)}"
-        file_base_name = self.generate_filename(year, number, range_str)
+    @staticmethod
+    def _emit_outputs(on_output, result: Dict[str, List[str]]):
+        for output_type, paths in result.items():
+            if paths:
+                on_output(output_type, paths)
+
+    def _worker_settings(self) -> Dict:
+        """Instellingen waarmee een worker uit de wachtrij dezelfde uitvoer maakt"""
+        return {
+            'render_backend': self.render_backend,
+            'image_presets': [preset.to_dict() for preset in self.image_presets],
+            'pdf_output': self.pdf_output.to_dict(),
+        }
+
+    def _cache_settings(self) -> Dict:
+        """Instellingen die de uitvoer van een artikel bepalen"""
+        return {
+            'image_presets': [preset.to_dict() for preset in self.image_presets],
+            'render_backend': self.render_backend,
+            'pdf_output': self.pdf_output.to_dict(),
+            'ocr': {
+                'languages': self.ocr_engine.languages,
+                'dpi': self.ocr_engine.dpi,
+                'min_text_chars': self.ocr_engine.min_text_chars,
+            },
+        }
 
-        return self._save_outputs(writer, file_base_name, base_path)
+    @staticmethod
+    def _kept_pages(page_range, pages_to_remove) -> List[int]:
+        return [page_num for page_num in page_range
+                if not pages_to_remove or page_num not in pages_to_remove]
 
-    def _save_outputs(self, writer: PdfWriter, file_base_name: str, base_path: Path) -> Dict[str, List[str]]:
-        outputs = {'pdf': [], 'small': [], 'large': [], 'ocr': []}
+    def _article_base_name(self, page_range, year, number) -> str:
+        range_str = f"{min(page_range)}-{max(page_range)}"
+        return self.generate_filename(year, number, range_str)
+
+    def _process_single_range(self, document: PDFDocument, page_range, pages_to_remove, base_path,
+                              year, number, job_logger: logging.Logger = None,
+                              raster_cache: RasterCache = None, render_dpi: float = None):
+        """Maak de bestanden van één artikel; geeft (uitvoer, tijden per stap, PDF-verslag)"""
+        # Ook in een workerproces bruikbaar: de aanroeper neemt de tijden over
+        timings = StageTimings(observe=False)
+        kept_pages = self._kept_pages(page_range, pages_to_remove)
+        writer = None
+        # Geoptimaliseerd kopieert PyMuPDF de pagina's zelf; een leeg
+        # artikel kan alleen PyPDF2 schrijven
+        if not (self.pdf_output.optimize and kept_pages):
+            from PyPDF2 import PdfWriter
+
+            writer = PdfWriter()
+            with timings.time('page_copy'), document.lock:
+                for page_num in kept_pages:
+                    writer.add_page(document.page(page_num - 1))
+
+        file_base_name = self._article_base_name(page_range, year, number)
+
+        # De eerste pagina van het artikel direct uit het bron-PDF renderen
+        first_page_index = kept_pages[0] - 1 if kept_pages else None
+
+        outputs, pdf_report = self._save_outputs(
+            writer, file_base_name, base_path, document, first_page_index, timings,
+            job_logger, kept_pages, raster_cache, render_dpi)
+        return outputs, timings.as_dict(), pdf_report
+
+    def _save_outputs(self, writer: 'PdfWriter', file_base_name: str, base_path: Path,
+                      document: PDFDocument, first_page_index: int = None,
+                      timings: StageTimings = None,
+                      job_logger: logging.Logger = None,
+                      kept_pages: List[int] = None, raster_cache: RasterCache = None,
+                      render_dpi: float = None) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+        """Schrijf PDF en afbeeldingen; zonder writer wordt het PDF geoptimaliseerd"""
+        outputs = {'pdf': [], **{preset.name: [] for preset in self.image_presets}}
+        timings = timings if timings is not None else StageTimings(observe=False)
         try:
             pdf_path = base_path / 'pdf' / f"{file_base_name}.pdf"
-            with open(pdf_path, 'wb') as pdf_file:
-                writer.write(pdf_file)
+            if writer is None:
+                pdf_report = write_optimized_pdf(
+                    document.mupdf(), [page_num - 1 for page_num in kept_pages], pdf_path,
+                    self.pdf_output, timings)
+            else:
+                # writer.write leest de gekopieerde objecten uit de bron-reader
+                with timings.time('pdf_write'), document.lock, open(pdf_path, 'wb') as pdf_file:
+                    writer.write(pdf_file)
+                pdf_report = {'pdf_bytes': pdf_path.stat().st_size, 'pdf_bytes_saved': 0}
             outputs['pdf'].append(str(pdf_path))
 
-            images = convert_from_path(pdf_path, first_page=1, last_page=1)
-            if images:
-                first_image = images[0]
-
-                small_path = base_path / 'small' / f"{file_base_name}.jpg"
-                large_path = base_path / 'large' / f"{file_base_name}.jpg"
-
-                self._save_optimized_image(first_image, small_path, (500, 700))
-                self._save_optimized_image(
-                    first_image, large_path, (1024, 1280))
-
-                outputs['small'].append(str(small_path))
-                outputs['large'].append(str(large_path))
-
-            # OCR işlemi (sadece metin içeren sayfalar için)
-            ocr_text = self._perform_ocr_from_pdf(pdf_path)
-            ocr_path = base_path / 'ocr' / f"{file_base_name}.txt"
-            with open(ocr_path, 'w', encoding='utf-8') as ocr_file:
-                ocr_file.write(ocr_text)
-            outputs['ocr'].append(str(ocr_path))
+            first_image = None
+            if first_page_index is not None:
+                def render():
+                    if render_dpi == self.ocr_engine.dpi:
+                        # Dezelfde render als de OCR, zodat de cache hem deelt
+                        return document.renderer.render_page_at_dpi(first_page_index, render_dpi)
+                    # Alleen renderen op de resolutie die de grootste afbeelding nodig heeft
+                    return document.renderer.render_page(
+                        first_page_index, render_size(self.image_presets))
+
+                with timings.time('rasterize'):
+                    first_image = raster_cache.get(first_page_index, render_dpi, render) \
+                        if raster_cache and render_dpi else render()
+
+            if first_image:
+                with timings.time('thumbnail'):
+                    outputs.update(write_derivatives(
+                        first_image, self.image_presets, base_path, file_base_name))
 
         except Exception as e:
-            self.logger.error(
+            (job_logger or _default_logger).error(
                 f"Fout bij het opslaan van bestanden {file_base_name}: {str(e)}")
             raise
 
-        return outputs
-
-    def _save_optimized_image(self, image, path, max_size):
-        img = image.copy()
-        img.thumbnail(max_size, Image.LANCZOS)
-        img.save(path, optimize=True, quality=85)
+        return outputs, pdf_report
 
-    def _perform_ocr_from_pdf(self, pdf_path: str) -> str:
-        """Voer OCR uit op de tekst in de PDF (zonder afbeeldingen te converteren)"""
-        reader = PdfReader(pdf_path)
-        ocr_text = ""
-        for page in reader.pages:
-            ocr_text += page.extract_text() or ""
-        return ocr_text
+    def _save_text(self, text: str, file_base_name: str, base_path: Path) -> str:
+        ocr_path = base_path / 'ocr' / f"{file_base_name}.txt"
+        with open(ocr_path, 'w', encoding='utf-8') as ocr_file:
+            ocr_file.write(text)
+        return str(ocr_path)
 
     def _merge_articles(self, article_ranges: List[List[int]], merge_indices: List[int]) -> List[List[int]]:
         if not merge_indices or len(merge_indices) < 2:
@@ -0,0 +1,100 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from renderers import create_renderer
+
+
+# Klein genoeg voor een contactvel met tientallen pagina's per scherm
+PREVIEW_SIZE = (170, 240)
+PREVIEW_QUALITY = 70
+# Pagina's per taak; elke taak opent het document één keer
+PREVIEW_CHUNK = 16
+
+
+def preview_name(page_index: int) -> str:
+    return f"{page_index + 1:04d}.jpg"
+
+
+def render_previews(pdf_path: str, page_indices: List[int], preview_dir: str,
+                    render_backend: str = 'auto', size: Tuple[int, int] = PREVIEW_SIZE) -> int:
+    """Render de ontbrekende voorbeelden van page_indices; geeft het aantal nieuwe
+
+    Staat op moduleniveau, zodat het ook in een workerproces kan draaien.
+    """
+    preview_dir = Path(preview_dir)
+    preview_dir.mkdir(parents=True, exist_ok=True)
+    missing = [page_index for page_index in page_indices
+               if not (preview_dir / preview_name(page_index)).is_file()]
+    if not missing:
+        return 0
+
+    with create_renderer(pdf_path, render_backend) as renderer:
+        for page_index in missing:
+            image = renderer.render_page(page_index, size)
+            if image is None:
+                continue
+            # Eerst onder een tijdelijke naam, zodat nooit een half bestand wordt geserveerd
+            tmp_path = preview_dir / f".{uuid.uuid4().hex}.jpg"
+            image.save(tmp_path, 'JPEG', quality=PREVIEW_QUALITY)
+            os.replace(tmp_path, preview_dir / preview_name(page_index))
+    return len(missing)
+
+
+class PreviewBuilder:
+    """Bouwt voorbeeldafbeeldingen van alle pagina's op de achtergrond
+
+    De pagina's worden in stukken verdeeld die parallel renderen; in de
+    procesmodus van PDFProcessor via diens procespool, anders via threads.
+    Een pagina die nog niet klaar is kan met ensure_page direct worden
+    gerenderd, zodat de eerste schermen niet op de rest wachten.
+    """
+
+    def __init__(self, processor, workers: int = 2):
+        self.processor = processor
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix='preview')
+        self._building = set()
+        self._lock = threading.Lock()
+
+    def build_all(self, key: str, pdf_path: str, preview_dir: Path, page_count: int):
+        """Plan het renderen van alle pagina's in; dubbele aanvragen worden genegeerd"""
+        with self._lock:
+            if key in self._building:
+                return
+            self._building.add(key)
+
+        chunks = [list(range(start, min(start + PREVIEW_CHUNK, page_count)))
+                  for start in range(0, page_count, PREVIEW_CHUNK)]
+        if self.processor.execution_mode == 'process':
+            pool = self.processor.get_process_pool()
+        else:
+            pool = self._executor
+        futures = [pool.submit(render_previews, str(pdf_path), chunk, str(preview_dir),
+                               self.processor.render_backend)
+                   for chunk in chunks]
+
+        remaining = [len(futures)]
+
+        def chunk_done(_future):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._building.discard(key)
+
+        for future in futures:
+            future.add_done_callback(chunk_done)
+        if not futures:
+            with self._lock:
+                self._building.discard(key)
+
+    def ensure_page(self, pdf_path: str, preview_dir: Path, page_index: int) -> Path:
+        """Pad van het voorbeeld van één pagina; rendert het zo nodig meteen"""
+        path = Path(preview_dir) / preview_name(page_index)
+        if not path.is_file():
+            render_previews(str(pdf_path), [page_index], str(preview_dir),
+                            self.processor.render_backend)
+        return path
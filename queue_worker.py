@@ -0,0 +1,117 @@
+"""Worker voor de werkwachtrij (PDF_EXECUTION_MODE=queue).
+
+Gebruik:
+    python queue_worker.py <wachtrij> [--concurrency 2] [--lease 120]
+
+De wachtrij is een URL zoals sqlite:////gedeeld/museum/queue.db. Een
+worker claimt artikeltaken, maakt de PDF en afbeeldingen in de werkmap van
+de verwerking en meldt de bestandspaden terug. Start er zoveel als nodig,
+op elke host die de wachtrij, de invoer-PDF's en de werkmappen
+(WORKSPACE_ROOT) onder hetzelfde pad ziet.
+
+Zolang een taak loopt wordt de lease verlengd; stopt een worker halverwege,
+dan geeft de wachtrij de taak na het verlopen van de lease aan een ander.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+from pdf_processor import run_queue_task
+from work_queue import create_work_queue
+
+
+# Afgeronde of achtergelaten taken van verdwenen verwerkingen na een dag opruimen
+PURGE_AGE = 86400
+PURGE_INTERVAL = 600
+
+
+def _keep_lease(queue, task, worker, lease, done):
+    """Verleng de lease elke derde van de leaseduur tot de taak klaar is"""
+    while not done.wait(lease / 3):
+        try:
+            if not queue.heartbeat(task.id, worker, lease):
+                # De taak is aan een ander gegeven; het resultaat telt dan niet meer
+                return
+        except Exception as e:
+            print(f"Lease van taak {task.id} niet verlengd: {e}", file=sys.stderr)
+
+
+def run_worker(queue_url, lease=120, poll_interval=1.0, once=False):
+    """Claim en verwerk taken; met once stopt de worker zodra de rij leeg is"""
+    queue = create_work_queue(queue_url)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    last_purge = 0.0
+    print(f"Worker {worker} luistert op {queue!r}")
+
+    while True:
+        if time.time() - last_purge > PURGE_INTERVAL:
+            queue.purge(PURGE_AGE)
+            last_purge = time.time()
+
+        task = queue.claim(worker, lease)
+        if task is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=_keep_lease, args=(queue, task, worker, lease, done), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            result = run_queue_task(task.payload)
+        except KeyboardInterrupt:
+            # Netjes teruggeven in plaats van de lease te laten verlopen
+            queue.fail(task.id, worker, "Worker gestopt")
+            raise
+        except Exception as e:
+            queue.fail(task.id, worker, str(e))
+            print(f"Taak {task.id} mislukt (poging {task.attempt}): {e}", file=sys.stderr)
+            continue
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if queue.complete(task.id, worker, result):
+            print(f"Taak {task.id} klaar in {time.perf_counter() - started:.2f}s")
+        else:
+            print(f"Taak {task.id} klaar, maar de lease was al verlopen", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verwerk artikeltaken uit een gedeelde werkwachtrij.")
+    parser.add_argument('queue', help="bijvoorbeeld sqlite:////gedeeld/museum/queue.db")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="aantal workerprocessen op deze host")
+    parser.add_argument('--lease', type=float, default=120,
+                        help="seconden voordat een taak van een zwijgende worker vrijkomt")
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--once', action='store_true',
+                        help="stop zodra de wachtrij leeg is")
+    args = parser.parse_args(argv)
+
+    worker_args = (args.queue, args.lease, args.poll_interval, args.once)
+    if args.concurrency <= 1:
+        run_worker(*worker_args)
+        return 0
+
+    # 'spawn', net als de procespool van PDFProcessor
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=run_worker, args=worker_args)
+                 for _ in range(args.concurrency)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
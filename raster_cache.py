@@ -0,0 +1,167 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+Key = Tuple[int, float]
+
+
+class RasterCache:
+    """Renders van bronpagina's binnen één verwerking, sleutel (pagina, DPI)
+
+    Wie een render nodig heeft, meldt dat vooraf met expect(); get() geeft
+    dan de gedeelde render en telt één gebruik af. Na het laatste verwachte
+    gebruik verdwijnt de render. Een render waarop niemand anders wacht
+    wordt niet bewaard, dus de cache kost niets voor pagina's die maar
+    één keer nodig zijn.
+
+    Renders staan in het geheugen tot memory_limit bytes; daarboven gaan de
+    minst recent gebruikte als ruwe pixels naar spill_dir (de werkmap van de
+    verwerking). Gelijktijdige get() op dezelfde sleutel renderen één keer.
+    """
+
+    def __init__(self, spill_dir: Path = None, memory_limit: int = 256 * 1024 * 1024):
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.memory_limit = memory_limit
+        self._memory: 'OrderedDict[Key, Image.Image]' = OrderedDict()
+        self._spilled: Dict[Key, Tuple[Path, str, Tuple[int, int]]] = {}
+        self._uses: Dict[Key, int] = {}
+        self._rendering: Dict[Key, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.counts = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'uncached': 0,
+                       'spills': 0, 'peak_memory_bytes': 0, 'peak_disk_bytes': 0}
+
+    @staticmethod
+    def _key(page_index: int, dpi: float) -> Key:
+        return (page_index, round(float(dpi), 3))
+
+    @staticmethod
+    def _size(image: 'Image.Image') -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def expect(self, page_index: int, dpi: float, uses: int = 1):
+        """Meld dat de render van deze pagina nog uses keer opgevraagd wordt"""
+        key = self._key(page_index, dpi)
+        with self._lock:
+            self._uses[key] = self._uses.get(key, 0) + uses
+
+    def get(self, page_index: int, dpi: float,
+            render: Callable[[], Optional['Image.Image']]) -> Optional['Image.Image']:
+        """Render van de pagina, uit de cache of via render()"""
+        key = self._key(page_index, dpi)
+        while True:
+            with self._lock:
+                if key not in self._uses:
+                    self.counts['uncached'] += 1
+                    uncached = True
+                    break
+                image = self._take(key)
+                if image is not None:
+                    return image
+                pending = self._rendering.get(key)
+                if pending is None:
+                    # Deze thread rendert; anderen wachten op het resultaat
+                    self._rendering[key] = threading.Event()
+                    self.counts['misses'] += 1
+                    uncached = False
+                    break
+            pending.wait()
+
+        if uncached:
+            return render()
+
+        image = None
+        try:
+            image = render()
+        finally:
+            with self._lock:
+                if image is not None and self._consume(key):
+                    self._store(key, image)
+                self._rendering.pop(key).set()
+        return image
+
+    def _take(self, key: Key) -> Optional['Image.Image']:
+        """Haal een bewaarde render op en tel het gebruik af; onder de lock"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            image = self._memory[key]
+            self.counts['hits'] += 1
+        elif key in self._spilled:
+            from PIL import Image
+
+            path, mode, size = self._spilled[key]
+            image = Image.frombytes(mode, size, path.read_bytes())
+            self.counts['disk_hits'] += 1
+            if self._uses[key] > 1:
+                # Weer in het geheugen, want hij is nog een keer nodig
+                self._store(key, image)
+        else:
+            return None
+
+        if not self._consume(key):
+            self._drop(key)
+        return image
+
+    def _consume(self, key: Key) -> bool:
+        """Tel één gebruik af; True als de render daarna nog nodig is"""
+        self._uses[key] -= 1
+        if self._uses[key] > 0:
+            return True
+        del self._uses[key]
+        return False
+
+    def _store(self, key: Key, image: 'Image.Image'):
+        self._drop_spilled(key)
+        self._memory[key] = image
+        self.memory_bytes += self._size(image)
+        while self.memory_bytes > self.memory_limit and len(self._memory) > 1:
+            self._spill(*self._memory.popitem(last=False))
+        self.counts['peak_memory_bytes'] = max(self.counts['peak_memory_bytes'],
+                                               self.memory_bytes)
+
+    def _spill(self, key: Key, image: 'Image.Image'):
+        self.memory_bytes -= self._size(image)
+        if self.spill_dir is None:
+            # Zonder schijf gaat de render verloren en wordt hij zo nodig opnieuw gemaakt
+            del self._uses[key]
+            return
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{key[0] + 1:04d}_{key[1]:g}_{uuid.uuid4().hex[:8]}.raw"
+        data = image.tobytes()
+        path.write_bytes(data)
+        self._spilled[key] = (path, image.mode, image.size)
+        self.disk_bytes += len(data)
+        self.counts['spills'] += 1
+        self.counts['peak_disk_bytes'] = max(self.counts['peak_disk_bytes'], self.disk_bytes)
+
+    def _drop_spilled(self, key: Key):
+        spilled = self._spilled.pop(key, None)
+        if spilled is not None:
+            path, mode, size = spilled
+            self.disk_bytes -= os.path.getsize(path)
+            path.unlink()
+
+    def _drop(self, key: Key):
+        image = self._memory.pop(key, None)
+        if image is not None:
+            self.memory_bytes -= self._size(image)
+        self._drop_spilled(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._memory) + list(self._spilled):
+                self._drop(key)
+            self._uses.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counts, 'memory_bytes': self.memory_bytes,
+                    'disk_bytes': self.disk_bytes}
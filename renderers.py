@@ -0,0 +1,162 @@
+import importlib.util
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# PyMuPDF en Pillow worden pas bij de eerste render geladen; hier alleen
+# kijken of de optionele backend er is
+HAS_PYMUPDF = importlib.util.find_spec('fitz') is not None
+
+
+def fit_zoom(page_width: float, page_height: float, max_size: Tuple[int, int]) -> float:
+    """Schaalfactor (t.o.v. 72 DPI) waarmee de pagina precies in max_size past"""
+    max_width, max_height = max_size
+    return min(max_width / page_width, max_height / page_height)
+
+
+class MuPDFHandles:
+    """Eén geopend fitz.Document per thread voor hetzelfde bestand
+
+    PyMuPDF-documenten zijn niet thread-safe; met een eigen handle per
+    thread kunnen de artikelthreads toch tegelijk renderen.
+    """
+
+    def __init__(self, source_pdf: str):
+        self.source_pdf = str(source_pdf)
+        self._local = threading.local()
+        self._documents = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """fitz.Document van de huidige thread, bij het eerste gebruik geopend"""
+        doc = getattr(self._local, 'doc', None)
+        if doc is None:
+            import fitz  # PyMuPDF
+
+            doc = fitz.open(self.source_pdf)
+            self._local.doc = doc
+            with self._lock:
+                self._documents.append(doc)
+        return doc
+
+    def close(self):
+        with self._lock:
+            for doc in self._documents:
+                doc.close()
+            self._documents.clear()
+            self._local = threading.local()
+
+
+class PageRenderer(ABC):
+    """Basis voor het renderen van losse pagina's uit het bron-PDF"""
+
+    name = None
+    # Is een render op lage resolutie duur genoeg om liever een grotere
+    # render (van de OCR) te verkleinen? Zie PDFProcessor._plan_renders
+    reuse_larger_renders = True
+
+    def __init__(self, source_pdf: str):
+        self.source_pdf = str(source_pdf)
+
+    @abstractmethod
+    def render_page(self, page_index: int, max_size: Tuple[int, int]) -> Optional['Image.Image']:
+        """Render pagina page_index (0-gebaseerd) passend binnen max_size"""
+
+    @abstractmethod
+    def render_page_at_dpi(self, page_index: int, dpi: int) -> Optional['Image.Image']:
+        """Render pagina page_index (0-gebaseerd) op een vaste resolutie"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PyMuPDFRenderer(PageRenderer):
+    """Rendert in-process; het document wordt één keer per thread geopend"""
+
+    name = 'pymupdf'
+    # MuPDF rendert direct op de kleine maat (JPEG's worden verkleind
+    # gedecodeerd); dat is sneller dan een render op OCR-resolutie verkleinen
+    reuse_larger_renders = False
+
+    def __init__(self, source_pdf: str, handles: MuPDFHandles = None):
+        super().__init__(source_pdf)
+        # Handles van de aanroeper (zie PDFDocument) sluit die zelf
+        self._owns_handles = handles is None
+        self._handles = handles or MuPDFHandles(self.source_pdf)
+
+    def render_page(self, page_index, max_size):
+        page = self._handles.get().load_page(page_index)
+        zoom = fit_zoom(page.rect.width, page.rect.height, max_size)
+        return self._render(page, zoom)
+
+    def render_page_at_dpi(self, page_index, dpi):
+        return self._render(self._handles.get().load_page(page_index), dpi / 72)
+
+    @staticmethod
+    def _render(page, zoom):
+        import fitz  # PyMuPDF
+        from PIL import Image
+
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+    def close(self):
+        if self._owns_handles:
+            self._handles.close()
+
+
+class Pdf2ImageRenderer(PageRenderer):
+    """Fallback via poppler (pdftoppm), één subprocess per pagina"""
+
+    name = 'pdf2image'
+
+    def render_page(self, page_index, max_size):
+        from pdf2image import convert_from_path
+
+        # De langste zijde direct op de doelgrootte laten schalen
+        images = convert_from_path(
+            self.source_pdf, first_page=page_index + 1, last_page=page_index + 1,
+            size=max(max_size))
+        return images[0] if images else None
+
+    def render_page_at_dpi(self, page_index, dpi):
+        from pdf2image import convert_from_path
+
+        images = convert_from_path(
+            self.source_pdf, first_page=page_index + 1, last_page=page_index + 1,
+            dpi=dpi)
+        return images[0] if images else None
+
+
+RENDERERS = {
+    PyMuPDFRenderer.name: PyMuPDFRenderer,
+    Pdf2ImageRenderer.name: Pdf2ImageRenderer,
+}
+
+
+def create_renderer(source_pdf: str, backend: str = 'auto',
+                    handles: MuPDFHandles = None) -> PageRenderer:
+    """Kies een render-backend; 'auto' geeft de voorkeur aan PyMuPDF
+
+    handles deelt de geopende PyMuPDF-documenten met de aanroeper.
+    """
+    if backend == 'auto':
+        backend = PyMuPDFRenderer.name if HAS_PYMUPDF else Pdf2ImageRenderer.name
+
+    if backend not in RENDERERS:
+        raise ValueError(f"Onbekende render-backend: {backend}")
+    if backend == PyMuPDFRenderer.name and not HAS_PYMUPDF:
+        raise ValueError("PyMuPDF is niet geïnstalleerd")
+
+    if backend == PyMuPDFRenderer.name:
+        return PyMuPDFRenderer(source_pdf, handles)
+    return RENDERERS[backend](source_pdf)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Verhogen als de uitvoer van een artikel inhoudelijk verandert
+CACHE_VERSION = 1
+
+
+class ResultCache:
+    """Schijfcache van uitvoer per artikel (PDF, afbeeldingen, tekst)
+
+    De sleutel bestaat uit de hash van het bron-PDF, de pagina's van het
+    artikel, de verwijderde pagina's binnen dat artikel en de instellingen
+    voor afbeeldingen en OCR. Bij een nieuwe inzending met één aangepast
+    bereik wordt dus alleen dat artikel opnieuw berekend. Elke entry is een
+    map met een manifest; de mtime van het manifest dient als LRU-tijdstip.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source_hash: str, page_range: List[int], pages_to_remove: List[int],
+                 settings: Dict) -> str:
+        removed = sorted(set(page_range) & set(pages_to_remove or []))
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'source': source_hash,
+            'pages': list(page_range),
+            'removed': removed,
+            'settings': settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str, base_path: Path, file_base_name: str) -> Optional[Dict[str, List[str]]]:
+        """Kopieer een entry naar base_path; None bij een misser"""
+        entry = self._entry_path(key)
+        try:
+            with open(entry / self.MANIFEST, encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            outputs = {}
+            for output_type, stored_name in manifest['files'].items():
+                extension = os.path.splitext(stored_name)[1]
+                target = base_path / output_type / \
+                    f"{file_base_name}{extension}"
+                shutil.copyfile(entry / stored_name, target)
+                outputs[output_type] = [str(target)]
+
+            # Gebruik registreren voor LRU
+            os.utime(entry / self.MANIFEST)
+        except (OSError, ValueError, KeyError):
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        return outputs
+
+    def put(self, key: str, files: Dict[str, str]):
+        """Sla de uitvoer van één artikel op ({type: pad})"""
+        entry = self._entry_path(key)
+        if entry.exists():
+            return
+
+        # Eerst in een tijdelijke map schrijven en daarna atomair hernoemen,
+        # zodat andere processen nooit een halve entry zien
+        tmp_entry = self.root / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp_entry.mkdir()
+            stored = {}
+            size = 0
+            for output_type, path in files.items():
+                stored_name = output_type + os.path.splitext(path)[1]
+                shutil.copyfile(path, tmp_entry / stored_name)
+                stored[output_type] = stored_name
+                size += os.path.getsize(path)
+
+            with open(tmp_entry / self.MANIFEST, 'w', encoding='utf-8') as f:
+                json.dump({'files': stored, 'size': size,
+                           'created': time.time()}, f)
+
+            entry.parent.mkdir(exist_ok=True)
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Een andere worker was ons voor, of de schijf is vol
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Verwijder de minst recent gebruikte entries tot onder max_bytes"""
+        entries = []
+        total = 0
+        for manifest in self.root.glob(f"*/*/{self.MANIFEST}"):
+            try:
+                with open(manifest, encoding='utf-8') as f:
+                    size = json.load(f)['size']
+                entries.append((manifest.stat().st_mtime, size, manifest.parent))
+            except (OSError, ValueError, KeyError):
+                continue
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,143 @@
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Verhogen als het schema verandert; een oude index wordt dan opnieuw opgebouwd
+SCHEMA_VERSION = 1
+
+SEARCH_TERM = re.compile(r'\w+\*?', re.UNICODE)
+
+
+def to_match_query(query: str) -> str:
+    """Zet zoekwoorden om naar een veilige FTS5-query
+
+    Elk woord wordt als losse term gequoot, zodat leestekens en operatoren in
+    de invoer geen syntaxisfouten geven; 'muse*' zoekt op voorvoegsel.
+    """
+    terms = []
+    for term in SEARCH_TERM.findall(query or ''):
+        prefix = term.endswith('*')
+        word = term.rstrip('*')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Geef minstens één zoekwoord op")
+    return ' '.join(terms)
+
+
+class SearchIndex:
+    """Doorzoekbare index van de artikeltekst, in SQLite FTS5
+
+    Per artikel staan jaar, nummer, paginabereik en bestandsnaam in de
+    tabel articles; de tekst staat in articles_fts met dezelfde rowid.
+    Een nummer wordt altijd als geheel vervangen, zodat opnieuw verwerken
+    geen verouderde artikelen achterlaat.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Schrijven na elkaar; lezen kan tegelijk dankzij WAL
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Eén verbinding per thread, hergebruikt tussen aanroepen"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        # Eigen verbinding die meteen weer dicht gaat: dit draait bij het importeren,
+        # mogelijk in de gunicorn-master vóór het forken van de workers
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            self._ensure_schema(connection)
+        finally:
+            connection.close()
+
+    def _ensure_schema(self, connection: sqlite3.Connection):
+        with self._write_lock, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS articles_fts")
+                connection.execute("DROP TABLE IF EXISTS articles")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    year TEXT NOT NULL,
+                    number TEXT NOT NULL,
+                    start_page INTEGER NOT NULL,
+                    end_page INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                )""")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS articles_issue ON articles (year, number)")
+            # remove_diacritics: 'cafe' vindt ook 'café'
+            connection.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    text, tokenize='unicode61 remove_diacritics 2'
+                )""")
+            connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def replace_issue(self, year: str, number: str, articles: List[Dict]):
+        """Vervang alle artikelen van één nummer
+
+        articles: dicts met start_page, end_page, filename en text.
+        """
+        number = number.zfill(2)
+        now = time.time()
+        connection = self._connect()
+        with self._write_lock, connection:
+            old_ids = [row[0] for row in connection.execute(
+                "SELECT id FROM articles WHERE year = ? AND number = ?", (year, number))]
+            connection.executemany(
+                "DELETE FROM articles_fts WHERE rowid = ?", [(i,) for i in old_ids])
+            connection.execute(
+                "DELETE FROM articles WHERE year = ? AND number = ?", (year, number))
+
+            for article in articles:
+                cursor = connection.execute(
+                    "INSERT INTO articles (year, number, start_page, end_page, filename, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (year, number, article['start_page'], article['end_page'],
+                     article['filename'], now))
+                connection.execute(
+                    "INSERT INTO articles_fts (rowid, text) VALUES (?, ?)",
+                    (cursor.lastrowid, article['text']))
+
+    def search(self, query: str, year: Optional[str] = None, limit: int = 20,
+               offset: int = 0) -> List[Dict]:
+        """Zoek artikelen, best passende eerst (bm25), met een tekstfragment"""
+        sql = """
+            SELECT a.year, a.number, a.start_page, a.end_page, a.filename,
+                   snippet(articles_fts, 0, '[', ']', '…', 16) AS snippet,
+                   bm25(articles_fts) AS score
+            FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+            WHERE articles_fts MATCH ?"""
+        params = [to_match_query(query)]
+        if year:
+            sql += " AND a.year = ?"
+            params.append(year)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        rows = self._connect().execute(sql, params).fetchall()
+        # bm25 is negatief; hoger betekent hier beter
+        return [{**dict(row), 'score': round(-row['score'], 6)} for row in rows]
+
+    def stats(self) -> Dict:
+        connection = self._connect()
+        articles, issues = connection.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT year || '/' || number) FROM articles").fetchone()
+        return {'articles': articles, 'issues': issues}
@@ -6,6 +6,15 @@ document.addEventListener('DOMContentLoaded', function() {
     const downloadLinks = document.getElementById('downloadLinks');
     const pdfPageCount = document.getElementById('pdfPageCount');
     const notificationSound = document.getElementById('notificationSound');
+    const pageIndex = document.getElementById('pageIndex');
+    const morePages = document.getElementById('morePages');
+    const removeSuggestion = document.getElementById('removeSuggestion');
+    const removeSuggestionText = document.getElementById('removeSuggestionText');
+    const removePagesInput = document.getElementById('remove_pages');
+
+    // Id of the stored upload, so processing does not send the file again
+    let uploadId = null;
+    let nextPagesUrl = null;
 
     // Form reset function
     function resetForm() {
@@ -16,33 +25,227 @@ document.addEventListener('DOMContentLoaded', function() {
         submitButton.disabled = false;
         submitButton.querySelector('span').textContent = 'Verwerken';
         pdfPageCount.textContent = ''; // Reset page count
+        resetPageIndex();
         const progressBar = submitButton.querySelector('.progress-bar');
         if (progressBar) {
             progressBar.style.width = '0%';
         }
     }
 
-    // Show the number of pages in the PDF
+    function resetPageIndex() {
+        uploadId = null;
+        nextPagesUrl = null;
+        pageIndex.innerHTML = '';
+        morePages.classList.add('hidden');
+        removeSuggestion.classList.add('hidden');
+        removeSuggestion.dataset.pages = '';
+    }
+
+    // Suggest blank and duplicate pages for removal
+    async function loadSuggestion(id) {
+        const response = await fetch(`/uploads/${id}/analysis`);
+        const analysis = await response.json();
+        if (!response.ok || uploadId !== id || !analysis.remove_pages) {
+            return;
+        }
+
+        const duplicates = analysis.duplicate_groups
+            .map(group => group.join('='))
+            .join(', ');
+        removeSuggestionText.textContent =
+            `Voorstel: ${analysis.remove_pages} ` +
+            `(blanco: ${analysis.blank_pages.join(',') || '-'}; ` +
+            `dubbel: ${duplicates || '-'})`;
+        removeSuggestion.dataset.pages = analysis.remove_pages;
+        removeSuggestion.classList.remove('hidden');
+    }
+
+    document.getElementById('applySuggestion').addEventListener('click', function() {
+        removePagesInput.value = removeSuggestion.dataset.pages;
+    });
+
+    // Load the next block of page thumbnails; images load lazily while scrolling
+    async function loadPages(url) {
+        const response = await fetch(url, { cache: 'no-store' });
+        const listing = await response.json();
+        if (!response.ok) {
+            throw new Error(listing.error || 'Er is een fout opgetreden');
+        }
+
+        for (const page of listing.pages) {
+            const figure = document.createElement('figure');
+            figure.className = 'text-center text-xs text-gray-500';
+            const img = document.createElement('img');
+            img.src = page.url;
+            img.loading = 'lazy';
+            img.alt = `Pagina ${page.page}`;
+            img.className = 'w-full border rounded bg-gray-50';
+            const caption = document.createElement('figcaption');
+            caption.textContent = page.page;
+            figure.appendChild(img);
+            figure.appendChild(caption);
+            pageIndex.appendChild(figure);
+        }
+
+        nextPagesUrl = listing.next;
+        morePages.classList.toggle('hidden', !nextPagesUrl);
+    }
+
+    morePages.addEventListener('click', function() {
+        if (nextPagesUrl) {
+            loadPages(nextPagesUrl).catch(function(error) {
+                pdfPageCount.textContent = error.message;
+            });
+        }
+    });
+
+    async function readJson(response) {
+        const body = await response.json();
+        if (!response.ok) {
+            const error = new Error(body.error || 'Er is een fout opgetreden');
+            error.status = response.status;
+            error.body = body;
+            throw error;
+        }
+        return body;
+    }
+
+    async function sha256Hex(buffer) {
+        const digest = await crypto.subtle.digest('SHA-256', buffer);
+        return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    // Send the file in checksummed chunks; after a dropped connection (or a
+    // reload and selecting the same file again) continue from the offset the
+    // server acknowledged instead of starting over
+    async function uploadInChunks(file, onProgress) {
+        const key = `upload:${file.name}:${file.size}:${file.lastModified}`;
+        let session = null;
+        const savedUrl = localStorage.getItem(key);
+        if (savedUrl) {
+            session = await readJson(await fetch(savedUrl, { cache: 'no-store' }))
+                .catch(() => null);
+        }
+        if (!session) {
+            session = await readJson(await fetch('/uploads/sessions', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size })
+            }));
+            localStorage.setItem(key, session.url);
+        }
+
+        let failures = 0;
+        while (session.offset < session.size) {
+            onProgress(session.offset / session.size);
+            try {
+                const start = session.offset;
+                const data = await file.slice(start, start + session.chunk_size).arrayBuffer();
+                session = await readJson(await fetch(`${session.url}/chunks/${session.chunks}`, {
+                    method: 'PUT',
+                    headers: {
+                        'Upload-Offset': String(start),
+                        'X-Chunk-SHA256': await sha256Hex(data)
+                    },
+                    body: data
+                }));
+                failures = 0;
+            } catch (error) {
+                if (error.status === 409) {
+                    // Out of step with the server: continue where it is
+                    session.offset = error.body.offset;
+                    session.chunks = error.body.chunks;
+                    continue;
+                }
+                if (error.status === 404 || error.status === 413 || ++failures > 5) {
+                    localStorage.removeItem(key);
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            }
+        }
+
+        // Every chunk was checked on arrival; the server hashes the assembled
+        // file itself and returns that SHA-256 as the upload_id
+        onProgress(1);
+        const upload = await readJson(await fetch(`${session.url}/complete`, {
+            method: 'POST'
+        }));
+        localStorage.removeItem(key);
+        return upload;
+    }
+
+    async function uploadFile(file) {
+        // Web Crypto only exists on https and localhost; otherwise send it in one go
+        if (window.crypto && crypto.subtle) {
+            return uploadInChunks(file, function(fraction) {
+                pdfPageCount.textContent =
+                    `PDF wordt geüpload... ${Math.floor(fraction * 100)}%`;
+            });
+        }
+        const formData = new FormData();
+        formData.append('pdf_file', file);
+        const upload = await readJson(await fetch('/uploads', {
+            method: 'POST',
+            body: formData
+        }));
+        return upload;
+    }
+
+    // Upload the PDF once, then show its page count and a contact sheet
     const fileInput = form.querySelector('input[type="file"]');
-    fileInput.addEventListener('change', function() {
+    fileInput.addEventListener('change', async function() {
+        resetPageIndex();
         const file = fileInput.files[0];
-        if (file) {
-            const reader = new FileReader();
-            reader.onload = function(e) {
-                const pdfData = new Uint8Array(e.target.result);
-                const loadingTask = pdfjsLib.getDocument(pdfData);
-                loadingTask.promise.then(function(pdf) {
-                    pdfPageCount.textContent = `Aantal pagina's: ${pdf.numPages}`;
-                }).catch(function(error) {
-                    pdfPageCount.textContent = 'Fout bij het lezen van PDF';
-                });
-            };
-            reader.readAsArrayBuffer(file);
-        } else {
+        if (!file) {
             pdfPageCount.textContent = ''; // Reset if no file is selected
+            return;
+        }
+
+        pdfPageCount.textContent = 'PDF wordt geüpload...';
+        try {
+            const upload = await uploadFile(file);
+            if (!upload.success) {
+                throw new Error(upload.error || 'Fout bij het lezen van PDF');
+            }
+            // Ignore the answer if another file was selected in the meantime
+            if (fileInput.files[0] !== file) {
+                return;
+            }
+
+            uploadId = upload.upload_id;
+            pdfPageCount.textContent = `Aantal pagina's: ${upload.page_count}`;
+            await loadPages(upload.pages_url);
+            loadSuggestion(upload.upload_id).catch(function() {
+                // The suggestion is optional; the form works without it
+            });
+        } catch (error) {
+            pdfPageCount.textContent = error.message;
         }
     });
 
+    // Poll a background job and show its real progress
+    async function pollJob(statusUrl, progressBar) {
+        while (true) {
+            const response = await fetch(statusUrl, { cache: 'no-store' });
+            const status = await response.json();
+            if (!response.ok) {
+                throw new Error(status.error || 'Er is een fout opgetreden');
+            }
+
+            progressBar.style.width = `${status.percent}%`;
+
+            if (status.status === 'done') {
+                return status;
+            }
+            if (status.status === 'failed') {
+                throw new Error(status.error || 'Er is een fout opgetreden');
+            }
+
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     form.addEventListener('submit', async function(e) {
         e.preventDefault();
 
@@ -58,49 +261,66 @@ document.addEventListener('DOMContentLoaded', function() {
         submitButton.classList.add('processing');
         submitButton.querySelector('span').textContent = 'Verwerking...';
 
-        let progress = 0;
-        const progressInterval = setInterval(() => {
-            progress = Math.min(progress + 5, 90); // Max 90% until completion
-            progressBar.style.width = `${progress}%`;
-        }, 200);
-
         try {
             submitButton.disabled = true;
-            const formData = new FormData(form);
+            // Form fields first, so the server can validate them before the file arrives
+            const formData = new FormData();
+            for (const [name, value] of new FormData(form)) {
+                if (name !== 'pdf_file') {
+                    formData.append(name, value);
+                }
+            }
+            // Refer to the stored upload if there is one, otherwise send the file
+            if (uploadId) {
+                formData.append('upload_id', uploadId);
+            } else {
+                formData.append('pdf_file', fileInput.files[0]);
+            }
 
-            const response = await fetch('/upload', {
+            let response = await fetch('/jobs', {
                 method: 'POST',
                 body: formData
             });
 
-            const result = await response.json();
+            // The stored upload may have expired; fall back to sending the file
+            if (response.status === 404 && uploadId) {
+                uploadId = null;
+                formData.delete('upload_id');
+                formData.append('pdf_file', fileInput.files[0]);
+                response = await fetch('/jobs', {
+                    method: 'POST',
+                    body: formData
+                });
+            }
+
+            const submitted = await response.json();
+            if (!response.ok || !submitted.success) {
+                throw new Error(submitted.error || 'Er is een fout opgetreden');
+            }
+
+            // Poll the job status until it is finished
+            const result = await pollJob(submitted.status_url, progressBar);
 
-            // Progress bar to 100%
-            clearInterval(progressInterval);
             progressBar.style.width = '100%';
 
-            if (result.success) {
-                downloadLocation.innerHTML = `
-                    <p class="text-green-500">${result.message}</p>
-                `;
-
-                // Play notification sound
-                notificationSound.play();
-
-                downloadLinks.innerHTML = `
-                    <div class="text-center p-4">
-                        <a href="data:application/zip;base64,${result.zip_file.data}"
-                           download="${result.zip_file.name}"
-                           class="bg-blue-500 hover:bg-blue-700 text-white font-bold py-3 px-6 rounded inline-flex items-center">
-                            Download Output (${result.zip_file.name})
-                        </a>
-                    </div>
-                `;
-
-                resultDiv.classList.remove('hidden');
-            } else {
-                throw new Error(result.error || 'Er is een fout opgetreden');
-            }
+            downloadLocation.innerHTML = `
+                <p class="text-green-500">Bestand is succesvol verwerkt</p>
+            `;
+
+            // Play notification sound
+            notificationSound.play();
+
+            downloadLinks.innerHTML = `
+                <div class="text-center p-4">
+                    <a href="${result.result_url}"
+                       download="${result.result_name}"
+                       class="bg-blue-500 hover:bg-blue-700 text-white font-bold py-3 px-6 rounded inline-flex items-center">
+                        Download Output (${result.result_name})
+                    </a>
+                </div>
+            `;
+
+            resultDiv.classList.remove('hidden');
         } catch (error) {
             downloadLocation.innerHTML = `
                 <p class="text-red-500">Fout: ${error.message}</p>
@@ -1,4 +1,4 @@
-const CACHE_NAME = 'pdf-tool-cache-v1';
+const CACHE_NAME = 'pdf-tool-cache-v6';
 const urlsToCache = [
   '/',
   '/static/css/style.css',
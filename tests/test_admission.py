@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from admission import AGING_SECONDS, AdmissionControl, OverloadedError, _Waiter, estimate_cost
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Voorwaarde niet op tijd bereikt")
+        time.sleep(0.01)
+
+
+class AdmissionControlTest(unittest.TestCase):
+    def test_estimate_cost(self):
+        self.assertEqual(estimate_cost([[1, 2], [3]], 2), 6)
+        self.assertEqual(estimate_cost([], 0), 1)
+
+    def test_oversized_request_runs_alone(self):
+        admission = AdmissionControl(10)
+
+        self.assertEqual(admission.acquire(50), 10)
+        self.assertEqual(admission.stats()['in_use'], 10)
+
+    def test_cheapest_waiter_goes_first(self):
+        admission = AdmissionControl(10, max_wait=5)
+        held = admission.acquire(10)
+        order = []
+
+        def run(name, cost, wait):
+            reserved = admission.acquire(cost, wait)
+            order.append(name)
+            admission.release(reserved)
+
+        large = threading.Thread(target=run, args=('groot', 8, False))
+        large.start()
+        wait_for(lambda: admission.stats()['waiting'] == 1)
+        small = threading.Thread(target=run, args=('klein', 2, True))
+        small.start()
+        wait_for(lambda: admission.stats()['waiting'] == 2)
+
+        admission.release(held)
+        large.join(timeout=5)
+        small.join(timeout=5)
+        self.assertEqual(order, ['klein', 'groot'])
+
+    def test_waiting_ages_the_priority(self):
+        old = _Waiter(100, 0, patient=False)
+        new = _Waiter(50, 1, patient=False)
+        now = old.since + 2 * AGING_SECONDS
+
+        self.assertAlmostEqual(old.priority(now)[0], 100 / 3)
+        self.assertLess(old.priority(now), new.priority(new.since))
+
+    def test_timeout_reports_retry_after(self):
+        admission = AdmissionControl(10, max_wait=0.05)
+        # 2 seconden per kosteneenheid
+        admission.release(admission.acquire(10), seconds=20)
+        admission.acquire(10)
+
+        with self.assertRaises(OverloadedError) as raised:
+            admission.acquire(4)
+        # Achterstand: 10 in gebruik + 4 wachtend + 4 gevraagd - budget 10
+        self.assertEqual(raised.exception.retry_after, 16)
+        self.assertEqual(admission.rejected, 1)
+
+    def test_rejects_at_once_when_work_ahead_fills_the_budget(self):
+        admission = AdmissionControl(10, max_wait=5)
+        held = admission.acquire(6)
+        waiter = threading.Thread(target=lambda: admission.release(admission.acquire(5)))
+        waiter.start()
+        wait_for(lambda: admission.stats()['waiting'] == 1)
+
+        started = time.monotonic()
+        with self.assertRaises(OverloadedError) as raised:
+            admission.acquire(6)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+
+        admission.release(held)
+        waiter.join(timeout=5)
+        self.assertEqual(admission.stats()['in_use'], 0)
+
+    def test_background_work_is_never_rejected(self):
+        admission = AdmissionControl(10, max_wait=0.01)
+        held = admission.acquire(10)
+        done = threading.Event()
+
+        def background():
+            admission.release(admission.acquire(10, wait=False))
+            done.set()
+
+        thread = threading.Thread(target=background)
+        thread.start()
+        time.sleep(0.1)
+        self.assertFalse(done.is_set())
+
+        admission.release(held)
+        thread.join(timeout=5)
+        self.assertTrue(done.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from job_queue import Job, JobManager
+
+
+class JobStatusTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = JobManager(root=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_failed_by_other_worker_is_kept(self):
+        job = self.manager.create_job()
+        job.set_status('running')
+
+        # Een andere worker markeert de taak als mislukt
+        Job.load(job.workdir).set_status('failed', error='De worker is gestopt')
+
+        job.update_progress('articles', 1, 2)
+        job.set_status('done', result_name='output.zip')
+
+        stored = Job.load(job.workdir)
+        self.assertEqual((stored.status, stored.error), ('failed', 'De worker is gestopt'))
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(stored.progress['articles'], {'done': 1, 'total': 2})
+
+    def test_save_leaves_no_temporary_files(self):
+        job = self.manager.create_job()
+        for done in range(3):
+            job.update_progress('articles', done, 3)
+
+        self.assertEqual(os.listdir(job.workdir), ['status.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import threading
+import time
+import unittest
+
+from memory_budget import MemoryBudget, estimate_render_bytes
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_estimate_scales_with_zoom(self):
+        # A4 op 72 DPI: 595 x 842 pixels, RGB, pixmap plus PIL-beeld
+        self.assertEqual(estimate_render_bytes((595, 842), 1), 595 * 842 * 3 * 2)
+        self.assertEqual(estimate_render_bytes((595, 842), 2), 1190 * 1684 * 3 * 2)
+
+    def test_oversized_request_is_clamped_to_the_limit(self):
+        budget = MemoryBudget(100)
+
+        self.assertEqual(budget.acquire(1000), 100)
+        self.assertEqual(budget.in_use, 100)
+        budget.release(100)
+        self.assertEqual(budget.acquire(-5), 0)
+
+    def test_waits_until_bytes_are_released(self):
+        budget = MemoryBudget(100)
+        budget.acquire(60)
+        acquired = threading.Event()
+
+        def second():
+            with budget.reserve(60):
+                acquired.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+
+        budget.release(60)
+        thread.join(timeout=5)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual((budget.in_use, budget.peak), (0, 60))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from raster_cache import RasterCache
+
+
+class RasterCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill_dir = Path(self.tmp.name) / 'raster'
+        self.renders = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, color):
+        def render():
+            self.renders.append(color)
+            return Image.new('RGB', (10, 10), color)
+        return render
+
+    def test_shared_render_is_made_once(self):
+        cache = RasterCache(self.spill_dir)
+        cache.expect(0, 150, uses=2)
+
+        first = cache.get(0, 150, self.render('red'))
+        second = cache.get(0, 150, self.render('blue'))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.renders, ['red'])
+        # Na het laatste verwachte gebruik is de render weg
+        self.assertEqual(cache.stats()['memory_bytes'], 0)
+
+    def test_unexpected_render_is_not_kept(self):
+        cache = RasterCache(self.spill_dir)
+
+        cache.get(0, 150, self.render('red'))
+        cache.get(0, 150, self.render('red'))
+
+        self.assertEqual(self.renders, ['red', 'red'])
+        self.assertEqual(cache.stats()['uncached'], 2)
+
+    def test_least_recently_used_render_spills_to_disk(self):
+        # Ruimte voor één render van 10 x 10 RGB in het geheugen
+        cache = RasterCache(self.spill_dir, memory_limit=300)
+        cache.expect(0, 150, uses=2)
+        cache.expect(1, 150, uses=2)
+
+        cache.get(0, 150, self.render('red'))
+        cache.get(1, 150, self.render('blue'))
+        stats = cache.stats()
+        self.assertEqual((stats['spills'], stats['memory_bytes'], stats['disk_bytes']),
+                         (1, 300, 300))
+        self.assertEqual(len(list(self.spill_dir.iterdir())), 1)
+
+        spilled = cache.get(0, 150, self.render('green'))
+        self.assertEqual(spilled.getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(self.renders, ['red', 'blue'])
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        # Laatste gebruik: het bestand is opgeruimd
+        self.assertEqual(list(self.spill_dir.iterdir()), [])
+
+    def test_without_spill_dir_the_render_is_made_again(self):
+        cache = RasterCache(memory_limit=300)
+        cache.expect(0, 150, uses=2)
+        cache.expect(1, 150, uses=2)
+
+        cache.get(0, 150, self.render('red'))
+        cache.get(1, 150, self.render('blue'))
+        cache.get(0, 150, self.render('red'))
+
+        self.assertEqual(self.renders, ['red', 'blue', 'red'])
+
+    def test_clear_removes_spilled_files(self):
+        cache = RasterCache(self.spill_dir, memory_limit=300)
+        for page_index in range(3):
+            cache.expect(page_index, 150, uses=2)
+            cache.get(page_index, 150, self.render('red'))
+
+        cache.clear()
+
+        self.assertEqual(list(self.spill_dir.iterdir()), [])
+        self.assertEqual((cache.memory_bytes, cache.disk_bytes), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
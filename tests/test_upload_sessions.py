@@ -0,0 +1,96 @@
+import hashlib
+import io
+import tempfile
+import unittest
+
+from upload_sessions import OffsetMismatchError, UploadSessionStore
+from upload_stream import UploadError
+
+PDF = b'%PDF-1.4\n' + b'x' * 3000
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadSessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = UploadSessionStore(self.tmp.name, chunk_size=1024, max_chunk_size=4096)
+        self.session = self.store.create('nummer.pdf', len(PDF))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def put(self, index, offset, data, checksum=None):
+        return self.store.put_chunk(self.session['id'], index, offset, len(data),
+                                    io.BytesIO(data), checksum or sha256(data))
+
+    def data_file(self):
+        return self.store._entry(self.session['id']) / self.store.DATA
+
+    def test_chunks_complete_the_upload(self):
+        for index, offset in enumerate(range(0, len(PDF), 1024)):
+            self.put(index, offset, PDF[offset:offset + 1024])
+
+        path, digest, state = self.store.finish(self.session['id'], sha256(PDF))
+        self.assertEqual(path.read_bytes(), PDF)
+        self.assertEqual((digest, state['chunks']), (sha256(PDF), 3))
+
+    def test_offset_mismatch_reports_where_to_resume(self):
+        self.put(0, 0, PDF[:1024])
+
+        with self.assertRaises(OffsetMismatchError) as raised:
+            self.put(2, 2048, PDF[2048:3072])
+        self.assertEqual(raised.exception.status, 409)
+        self.assertEqual((raised.exception.offset, raised.exception.chunks), (1024, 1))
+
+    def test_bad_chunk_is_truncated(self):
+        self.put(0, 0, PDF[:1024])
+
+        with self.assertRaises(UploadError):
+            self.put(1, 1024, PDF[1024:2048], checksum=sha256(b'iets anders'))
+        self.assertEqual(self.data_file().stat().st_size, 1024)
+        self.assertEqual(self.store.get(self.session['id'])['offset'], 1024)
+
+    def test_short_chunk_is_truncated(self):
+        with self.assertRaises(UploadError):
+            self.store.put_chunk(self.session['id'], 0, 0, 1024,
+                                 io.BytesIO(PDF[:500]), sha256(PDF[:1024]))
+        self.assertEqual(self.data_file().stat().st_size, 0)
+
+    def test_repeated_chunk_is_acknowledged(self):
+        self.put(0, 0, PDF[:1024])
+        state = self.put(0, 0, PDF[:1024])
+
+        self.assertEqual((state['offset'], state['chunks']), (1024, 1))
+
+    def test_file_checksum_mismatch_removes_session(self):
+        self.put(0, 0, PDF)
+
+        with self.assertRaises(UploadError):
+            self.store.finish(self.session['id'], sha256(b'iets anders'))
+        with self.assertRaises(UploadError) as raised:
+            self.store.get(self.session['id'])
+        self.assertEqual(raised.exception.status, 404)
+
+    def test_finish_only_once(self):
+        self.put(0, 0, PDF)
+        self.store.finish(self.session['id'])
+
+        with self.assertRaises(UploadError) as raised:
+            self.store.finish(self.session['id'])
+        self.assertEqual(raised.exception.status, 409)
+
+    def test_non_pdf_is_rejected(self):
+        session = self.store.create('plaatje.pdf', 2048)
+        data = b'GIF89a' + b'x' * 2042
+
+        with self.assertRaises(UploadError):
+            self.store.put_chunk(session['id'], 0, 0, len(data), io.BytesIO(data), sha256(data))
+        with self.assertRaises(UploadError):
+            self.store.get(session['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
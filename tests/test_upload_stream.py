@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+import unittest
+
+from upload_stream import PDFUploadReceiver, UploadError
+
+BOUNDARY = 'testgrens'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+PDF = b'%PDF-1.4\n' + b'0 0 obj\n' * 500
+
+
+def multipart(*parts):
+    """Bouw een multipart-body uit (naam, bestandsnaam of None, inhoud)"""
+    body = b''
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += (f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'
+                 .encode() + data + b'\r\n')
+    return io.BytesIO(body + f'--{BOUNDARY}--\r\n'.encode())
+
+
+class PDFUploadReceiverTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, 'input.pdf')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def receive(self, stream, **kwargs):
+        return PDFUploadReceiver(self.dest, chunk_size=256, **kwargs).receive(
+            stream, CONTENT_TYPE)
+
+    def test_streams_file_and_fields(self):
+        upload = self.receive(multipart(('year', None, b'2020'),
+                                        ('pdf_file', 'nummer.pdf', PDF)))
+
+        self.assertEqual((upload.filename, upload.size), ('nummer.pdf', len(PDF)))
+        self.assertEqual(upload.fields, {'year': '2020'})
+        with open(self.dest, 'rb') as f:
+            self.assertEqual(f.read(), PDF)
+
+    def test_second_file_part_is_rejected(self):
+        with self.assertRaises(UploadError):
+            self.receive(multipart(('pdf_file', 'a.pdf', PDF), ('pdf_file', 'b.pdf', PDF)))
+
+    def test_unexpected_file_part_is_rejected(self):
+        with self.assertRaises(UploadError):
+            self.receive(multipart(('bijlage', 'a.bin', b'x'), ('pdf_file', 'a.pdf', PDF)))
+
+    def test_fields_are_capped(self):
+        with self.assertRaises(UploadError) as raised:
+            self.receive(multipart(('a', None, b'x' * 600), ('b', None, b'x' * 600)),
+                         max_form_memory_size=1000)
+        self.assertEqual(raised.exception.status, 413)
+
+    def test_file_over_max_size_is_rejected(self):
+        with self.assertRaises(UploadError) as raised:
+            self.receive(multipart(('pdf_file', 'a.pdf', PDF)), max_size=len(PDF) - 1)
+        self.assertEqual(raised.exception.status, 413)
+
+    def test_non_pdf_is_rejected_by_header(self):
+        with self.assertRaises(UploadError):
+            self.receive(multipart(('pdf_file', 'a.pdf', b'GIF89a' + b'\n' * 2000)))
+
+    def test_linearized_page_count_is_validated_early(self):
+        linearized = b'%PDF-1.5\n1 0 obj\n<< /Linearized 1 /L 9999 /N 3 >>\nendobj\n'
+        seen = []
+
+        def validate(fields, page_count):
+            seen.append(page_count)
+            if page_count is not None and int(fields['last_page']) > page_count:
+                raise UploadError('Pagina buiten het bestand')
+
+        stream = multipart(('last_page', None, b'10'),
+                           ('pdf_file', 'a.pdf', linearized + b'\n' * 100000))
+        with self.assertRaises(UploadError):
+            self.receive(stream, validate=validate)
+        self.assertEqual(seen, [None, 3])
+        # Afgewezen voordat de rest van het bestand gelezen is
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+
+    def test_missing_file_is_allowed_when_optional(self):
+        upload = self.receive(multipart(('upload_id', None, b'abc')), file_optional=True)
+
+        self.assertIsNone(upload.path)
+        self.assertEqual(upload.fields, {'upload_id': 'abc'})
+
+
+if __name__ == '__main__':
+    unittest.main()
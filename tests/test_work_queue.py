@@ -0,0 +1,165 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from work_queue import QueueExecutor, SQLiteWorkQueue, WorkQueue, create_work_queue
+
+
+class SQLiteWorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteWorkQueue(Path(self.tmp.name) / 'queue.db', max_attempts=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_hands_out_each_task_once(self):
+        first = self.queue.publish('batch', {'n': 1})
+        second = self.queue.publish('batch', {'n': 2})
+
+        task_a = self.queue.claim('a', 60)
+        task_b = self.queue.claim('b', 60)
+
+        self.assertEqual((task_a.id, task_a.payload, task_a.attempt), (first, {'n': 1}, 1))
+        self.assertEqual(task_b.id, second)
+        self.assertIsNone(self.queue.claim('c', 60))
+
+    def test_complete_reports_result(self):
+        task_id = self.queue.publish('batch', {})
+        task = self.queue.claim('a', 60)
+
+        self.assertTrue(self.queue.complete(task.id, 'a', {'ok': True}))
+        self.assertEqual(self.queue.finished([task_id]),
+                         [{'id': task_id, 'status': 'done', 'result': {'ok': True}, 'error': None}])
+
+    def test_expired_lease_is_reissued(self):
+        self.queue.publish('batch', {})
+        task = self.queue.claim('a', 0.05)
+        time.sleep(0.1)
+
+        retry = self.queue.claim('b', 60)
+        self.assertEqual((retry.id, retry.attempt), (task.id, 2))
+        # De eerste worker is de taak kwijt
+        self.assertFalse(self.queue.heartbeat(task.id, 'a', 60))
+        self.assertFalse(self.queue.complete(task.id, 'a', {}))
+        self.assertTrue(self.queue.complete(task.id, 'b', {}))
+
+    def test_expired_lease_without_attempts_left_fails(self):
+        task_id = self.queue.publish('batch', {})
+        for worker in ('a', 'b'):
+            self.queue.claim(worker, 0.05)
+            time.sleep(0.1)
+
+        self.assertIsNone(self.queue.claim('c', 60))
+        self.assertEqual(self.queue.finished([task_id])[0]['status'], 'failed')
+
+    def test_fail_retries_until_max_attempts(self):
+        task_id = self.queue.publish('batch', {})
+        task = self.queue.claim('a', 60)
+        self.assertTrue(self.queue.fail(task.id, 'a', 'eerste fout'))
+        self.assertEqual(self.queue.finished([task_id]), [])
+
+        task = self.queue.claim('a', 60)
+        self.assertEqual(task.attempt, 2)
+        self.queue.fail(task.id, 'a', 'tweede fout')
+        self.assertEqual(self.queue.finished([task_id]),
+                         [{'id': task_id, 'status': 'failed', 'result': None,
+                           'error': 'tweede fout'}])
+
+    def test_busy_workers_keep_waiting_tasks_alive(self):
+        self.queue.publish('batch', {})
+        time.sleep(0.1)
+        # Een worker die bezig is met iets anders, meldt zich via zijn heartbeat
+        self.queue.heartbeat(0, 'a', 60)
+
+        self.assertEqual(self.queue.expire_without_workers('batch', 0.05), 0)
+
+    def test_tasks_fail_without_workers(self):
+        queued = self.queue.publish('batch', {})
+        running = self.queue.publish('batch', {})
+        other = self.queue.publish('other', {})
+        self.queue.claim('a', 0.05)
+        time.sleep(0.1)
+
+        self.assertEqual(self.queue.expire_without_workers('batch', 0.05), 2)
+        self.assertEqual({task['id'] for task in self.queue.finished([queued, running, other])},
+                         {queued, running})
+
+    def test_forget_and_purge(self):
+        self.queue.publish('batch', {})
+        done = self.queue.publish('other', {})
+        self.queue.forget('batch')
+        task = self.queue.claim('a', 60)
+        self.assertEqual(task.id, done)
+        self.queue.complete(task.id, 'a', {})
+
+        self.assertEqual(self.queue.purge(0), 1)
+        self.assertEqual(self.queue.finished([done]), [])
+
+
+class CreateWorkQueueTest(unittest.TestCase):
+    def test_urls(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            plain = create_work_queue(f"{tmp}/plain.db")
+            absolute = create_work_queue(f"sqlite:///{tmp}/absolute.db")
+            self.assertEqual(plain.path, Path(tmp) / 'plain.db')
+            self.assertEqual(absolute.path, Path(tmp) / 'absolute.db')
+            with self.assertRaises(ValueError):
+                create_work_queue('redis://localhost')
+
+    def test_incomplete_backend(self):
+        class PublishOnly(WorkQueue):
+            def publish(self, batch, payload):
+                return 1
+
+        with self.assertRaises(TypeError):
+            PublishOnly()
+
+
+class QueueExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteWorkQueue(Path(self.tmp.name) / 'queue.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _worker(self, stop):
+        queue = SQLiteWorkQueue(self.queue.path)
+        while not stop.is_set():
+            task = queue.claim('worker', 60)
+            if task is None:
+                time.sleep(0.01)
+                continue
+            if task.payload['fail']:
+                queue.fail(task.id, 'worker', 'kapot')
+            else:
+                queue.complete(task.id, 'worker', {'outputs': task.payload, 'timings': {},
+                                                   'pdf_report': {}})
+
+    def test_results_and_failures_reach_the_futures(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=self._worker, args=(stop,))
+        worker.start()
+        try:
+            with QueueExecutor(self.queue, poll_interval=0.01) as executor:
+                ok = executor.submit({'fail': False})
+                broken = executor.submit({'fail': True})
+                self.assertEqual(ok.result(timeout=10), ({'fail': False}, {}, {}))
+                with self.assertRaisesRegex(RuntimeError, 'kapot'):
+                    broken.result(timeout=10)
+        finally:
+            stop.set()
+            worker.join()
+
+    def test_futures_fail_without_workers(self):
+        with QueueExecutor(self.queue, poll_interval=0.01, worker_timeout=0.05) as executor:
+            future = executor.submit({})
+            with self.assertRaisesRegex(RuntimeError, 'geen actieve worker'):
+                future.result(timeout=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
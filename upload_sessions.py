@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (ontwikkelomgeving)
+    fcntl = None
+    import msvcrt
+
+from upload_stream import PDF_HEADER_WINDOW, UploadError
+
+
+SESSION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+CHECKSUM_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _lock_file(f, blocking: bool = True) -> bool:
+    """Exclusief slot op een open bestand, over processen heen"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        raise
+                    time.sleep(0.05)
+    except OSError:
+        if blocking:
+            raise
+        return False
+    return True
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class OffsetMismatchError(UploadError):
+    """Het stuk sluit niet aan op wat al bevestigd is; hervat vanaf offset"""
+
+    def __init__(self, offset: int, chunks: int):
+        super().__init__(
+            f"Verwacht stuk {chunks} vanaf offset {offset}", 409)
+        self.offset = offset
+        self.chunks = chunks
+
+
+class UploadSessionStore:
+    """Hervatbare uploads in genummerde stukken
+
+    Een sessie is een map met data.part en session.json. Elk stuk wordt
+    direct op zijn offset in data.part geschreven en gecontroleerd tegen
+    zijn SHA-256; pas daarna schuift de bevestigde offset op. Een
+    afgebroken of afgekeurd stuk wordt weer afgekapt, dus na een verbroken
+    verbinding gaat de client verder vanaf de offset die get() geeft.
+
+    Een sessie wordt met een slotbestand in de sessiemap vergrendeld, zodat
+    ook meerdere gunicorn-workers niet tegelijk in dezelfde sessie schrijven.
+    Sessies die ttl seconden geen stuk meer ontvingen, worden hooguit elke
+    sweep_interval seconden opgeruimd.
+    """
+
+    DATA = 'data.part'
+    STATE = 'session.json'
+    LOCK = 'session.lock'
+
+    def __init__(self, root: str, ttl: int = 86400, max_size: int = 2 * 1024 ** 3,
+                 chunk_size: int = 8 * 1024 * 1024, max_chunk_size: int = None,
+                 read_size: int = 64 * 1024, sweep_interval: int = 300):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_chunk_size = max_chunk_size or chunk_size
+        # Aanbevolen grootte voor de client
+        self.chunk_size = min(chunk_size, self.max_chunk_size)
+        self.read_size = read_size
+        self.sweep_interval = sweep_interval
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _entry(self, session_id: str) -> Path:
+        if not SESSION_ID_PATTERN.match(session_id or ''):
+            raise UploadError('Onbekende of verlopen upload', 404)
+        return self.root / session_id
+
+    @contextmanager
+    def _locked(self, session_id: str, blocking: bool = True):
+        """Slot op de sessie; geeft False als blocking uit staat en het slot bezet is"""
+        try:
+            f = open(self._entry(session_id) / self.LOCK, 'a+b')
+        except FileNotFoundError:
+            raise UploadError('Onbekende of verlopen upload', 404)
+        with f:
+            locked = _lock_file(f, blocking)
+            try:
+                yield locked
+            finally:
+                if locked:
+                    _unlock_file(f)
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.cleanup_expired()
+
+    def _load(self, session_id: str) -> Dict:
+        try:
+            with open(self._entry(session_id) / self.STATE, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError('Onbekende of verlopen upload', 404)
+
+    def _save(self, state: Dict):
+        entry = self._entry(state['id'])
+        tmp_state = entry / f"{self.STATE}.{uuid.uuid4().hex}"
+        with open(tmp_state, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_state, entry / self.STATE)
+
+    def describe(self, state: Dict) -> Dict:
+        """Sessiestatus voor de client"""
+        return {'session_id': state['id'], 'filename': state['filename'],
+                'size': state['size'], 'offset': state['offset'],
+                'chunks': state['chunks'], 'chunk_size': self.chunk_size,
+                'expires': state['updated'] + self.ttl}
+
+    def create(self, filename: str, size: int) -> Dict:
+        """Nieuwe sessie voor een bestand van size bytes"""
+        self._maybe_sweep()
+        if size <= 0:
+            raise UploadError('Het bestand is leeg')
+        if size > self.max_size:
+            raise UploadError(
+                f"Het bestand is groter dan {self.max_size // (1024 * 1024)} MB", 413)
+
+        session_id = uuid.uuid4().hex
+        entry = self.root / session_id
+        entry.mkdir()
+        (entry / self.DATA).touch()
+        now = time.time()
+        state = {'id': session_id, 'filename': filename, 'size': size, 'offset': 0,
+                 'chunks': 0, 'created': now, 'updated': now}
+        self._save(state)
+        return state
+
+    def get(self, session_id: str) -> Dict:
+        self._maybe_sweep()
+        return self._load(session_id)
+
+    def put_chunk(self, session_id: str, index: int, offset: int, length: int,
+                  stream, checksum: str) -> Dict:
+        """Schrijf stuk index (length bytes uit stream) op offset"""
+        checksum = (checksum or '').strip().lower()
+        if not CHECKSUM_PATTERN.match(checksum):
+            raise UploadError('De SHA-256 van het stuk ontbreekt of is ongeldig')
+        if length <= 0:
+            raise UploadError('Het stuk is leeg')
+        if length > self.max_chunk_size:
+            raise UploadError(
+                f"Een stuk mag hooguit {self.max_chunk_size // (1024 * 1024)} MB zijn", 413)
+
+        self._maybe_sweep()
+        with self._locked(session_id):
+            state = self._load(session_id)
+            if index < state['chunks'] and offset + length <= state['offset']:
+                # Herhaling van een bevestigd stuk; het antwoord ging verloren
+                for _ in iter(lambda: stream.read(self.read_size), b''):
+                    pass
+                return state
+            if index != state['chunks'] or offset != state['offset']:
+                raise OffsetMismatchError(state['offset'], state['chunks'])
+            if offset + length > state['size']:
+                raise UploadError('Het stuk valt buiten de opgegeven bestandsgrootte')
+
+            path = self._entry(session_id) / self.DATA
+            with open(path, 'r+b') as f:
+                # Resten van een eerder afgebroken stuk weghalen
+                f.seek(offset)
+                f.truncate()
+                digest = hashlib.sha256()
+                written = 0
+                while written < length:
+                    data = stream.read(min(self.read_size, length - written))
+                    if not data:
+                        break
+                    f.write(data)
+                    digest.update(data)
+                    written += len(data)
+                if written != length or digest.hexdigest() != checksum:
+                    f.truncate(offset)
+                    raise UploadError(
+                        'Het stuk is onvolledig ontvangen' if written != length
+                        else 'De SHA-256 van het stuk klopt niet')
+                # Bevestigd betekent: staat op schijf
+                f.flush()
+                os.fsync(f.fileno())
+
+            end = offset + length
+            if offset < PDF_HEADER_WINDOW <= end or end == state['size'] < PDF_HEADER_WINDOW:
+                with open(path, 'rb') as f:
+                    head = f.read(PDF_HEADER_WINDOW)
+                if b'%PDF-' not in head:
+                    self.remove(session_id)
+                    raise UploadError('Het bestand is geen geldig PDF-bestand')
+
+            state.update(offset=end, chunks=state['chunks'] + 1, updated=time.time())
+            self._save(state)
+            return state
+
+    def finish(self, session_id: str, sha256: str = None) -> Tuple[Path, str, Dict]:
+        """Controleer een volledige upload; geeft (pad, SHA-256, sessie)
+
+        Het pad blijft van de sessie tot de aanroeper het bestand verplaatst
+        en remove() aanroept. Een sessie wordt maar één keer afgerond; een
+        tweede gelijktijdige aanroep krijgt 409.
+        """
+        self._maybe_sweep()
+        with self._locked(session_id):
+            state = self._load(session_id)
+            if state.get('completing'):
+                raise UploadError('De upload wordt al afgerond', 409)
+            if state['offset'] != state['size']:
+                raise OffsetMismatchError(state['offset'], state['chunks'])
+
+            path = self._entry(session_id) / self.DATA
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            if sha256 and sha256.strip().lower() != digest.hexdigest():
+                # Alle stukken klopten, dus het bestand van de client is veranderd
+                self.remove(session_id)
+                raise UploadError('De SHA-256 van het bestand klopt niet')
+
+            # Vóór het vrijgeven van het slot, zodat een tweede aanroep het
+            # bestand niet opent terwijl de eerste het verplaatst
+            state['completing'] = True
+            self._save(state)
+            return path, digest.hexdigest(), state
+
+    def remove(self, session_id: str):
+        entry = self._entry(session_id)
+        # Eerst de status, zodat wie hierna het slot krijgt de sessie niet meer vindt
+        try:
+            (entry / self.STATE).unlink()
+        except OSError:
+            pass
+        shutil.rmtree(entry, ignore_errors=True)
+
+    def cleanup_expired(self):
+        """Verwijder sessies die langer dan ttl seconden geen stuk ontvingen"""
+        with self._sweep_lock:
+            self._last_sweep = now = time.time()
+            for entry in self.root.iterdir():
+                if not entry.is_dir() or not SESSION_ID_PATTERN.match(entry.name):
+                    continue
+                try:
+                    try:
+                        last_used = (entry / self.STATE).stat().st_mtime
+                    except FileNotFoundError:
+                        last_used = entry.stat().st_mtime
+                    if now - last_used <= self.ttl:
+                        continue
+                    with self._locked(entry.name, blocking=False) as locked:
+                        if not locked:
+                            # Er wordt nog een stuk geschreven
+                            continue
+                        self.remove(entry.name)
+                    # Onder Windows kan de map pas weg als het slotbestand dicht is
+                    shutil.rmtree(entry, ignore_errors=True)
+                except (OSError, UploadError):
+                    # Net door een andere worker verwijderd
+                    continue
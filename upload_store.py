@@ -0,0 +1,136 @@
+import errno
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadStore:
+    """Eerder geüploade PDF's, op te vragen via hun upload_id
+
+    De upload_id is de SHA-256 van het bestand, dus hetzelfde nummer
+    twee keer uploaden levert één kopie en één set voorbeeldafbeeldingen
+    op. Per upload is er een map met source.pdf, meta.json, previews/ en
+    na een pagina-analyse analysis.json.
+    De mtime van meta.json geldt als laatste gebruik voor het opruimen.
+    """
+
+    SOURCE = 'source.pdf'
+    # Uploads die nog binnenkomen; blijft er na een crash een staan, dan
+    # ruimt cleanup_expired hem op
+    INCOMING_PREFIX = '.incoming-'
+    META = 'meta.json'
+    ANALYSIS = 'analysis.json'
+
+    def __init__(self, root: str = None, ttl: int = 86400):
+        self.root = Path(root or os.path.join(tempfile.gettempdir(), 'museum_uploads'))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _entry(self, upload_id: str) -> Optional[Path]:
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            return None
+        return self.root / upload_id
+
+    def pdf_path(self, upload_id: str) -> Optional[Path]:
+        entry = self._entry(upload_id)
+        return entry / self.SOURCE if entry else None
+
+    def preview_dir(self, upload_id: str) -> Optional[Path]:
+        entry = self._entry(upload_id)
+        return entry / 'previews' if entry else None
+
+    def analysis_path(self, upload_id: str) -> Optional[Path]:
+        entry = self._entry(upload_id)
+        return entry / self.ANALYSIS if entry else None
+
+    def spool_path(self) -> str:
+        """Leeg bestand onder root voor een binnenkomende upload
+
+        Op hetzelfde volume als de uploads, zodat add() kan hernoemen.
+        """
+        fd, path = tempfile.mkstemp(prefix=self.INCOMING_PREFIX, suffix='.pdf', dir=self.root)
+        os.close(fd)
+        return path
+
+    def add(self, tmp_path: str, sha256: str, filename: str, size: int,
+            page_count: int) -> str:
+        """Neem een ontvangen bestand op; tmp_path wordt verplaatst of verwijderd"""
+        self.cleanup_expired()
+        entry = self._entry(sha256)
+        entry.mkdir(parents=True, exist_ok=True)
+        if (entry / self.SOURCE).is_file():
+            os.remove(tmp_path)
+        else:
+            self._move_into(tmp_path, entry / self.SOURCE)
+
+        meta = {'filename': filename, 'size': size, 'page_count': page_count,
+                'created': time.time()}
+        tmp_meta = entry / f"{self.META}.{uuid.uuid4().hex}"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, entry / self.META)
+        return sha256
+
+    @staticmethod
+    def _move_into(tmp_path: str, dest: Path):
+        """Verplaats tmp_path naar dest, ook vanaf een ander volume"""
+        try:
+            os.replace(tmp_path, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Eerst naast dest kopiëren, zodat dest nooit half geschreven is
+            partial = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}")
+            shutil.move(tmp_path, partial)
+            os.replace(partial, dest)
+
+    def get(self, upload_id: str) -> Optional[Dict]:
+        """Metadata van een upload, of None als die onbekend of verlopen is"""
+        entry = self._entry(upload_id)
+        if entry is None or not (entry / self.SOURCE).is_file():
+            return None
+        try:
+            with open(entry / self.META, encoding='utf-8') as f:
+                meta = json.load(f)
+            # Gebruik registreren, zodat een upload in gebruik niet verloopt
+            os.utime(entry / self.META)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def link_into(self, upload_id: str, dest_path: str):
+        """Zet een kopie van de upload op dest_path (hardlink waar mogelijk)"""
+        source = self.pdf_path(upload_id)
+        try:
+            os.link(source, dest_path)
+        except OSError:
+            shutil.copyfile(source, dest_path)
+
+    def cleanup_expired(self):
+        """Verwijder uploads die langer dan ttl seconden niet gebruikt zijn"""
+        now = time.time()
+        for entry in self.root.iterdir():
+            if entry.name.startswith(self.INCOMING_PREFIX):
+                try:
+                    if now - entry.stat().st_mtime > self.ttl:
+                        entry.unlink()
+                except OSError:
+                    pass
+                continue
+            if not entry.is_dir() or not UPLOAD_ID_PATTERN.match(entry.name):
+                continue
+            try:
+                last_used = (entry / self.META).stat().st_mtime
+            except OSError:
+                last_used = entry.stat().st_mtime
+            if now - last_used > self.ttl:
+                shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,190 @@
+import hashlib
+import re
+from typing import Callable, Dict, Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import (
+    Data, Epilogue, Field, File, MultipartDecoder, NeedData)
+
+
+# Volgens de PDF-specificatie staat de header binnen de eerste 1024 bytes
+PDF_HEADER_WINDOW = 1024
+# Een gelineariseerd PDF noemt het aantal pagina's (/N) vooraan in het bestand
+LINEARIZED_WINDOW = 4096
+LINEARIZED_PAGE_COUNT = re.compile(rb'<<\s*/Linearized[^>]*?/N\s+(\d+)', re.DOTALL)
+
+
+class UploadError(Exception):
+    """Upload afgekeurd tijdens het ontvangen"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class StreamedUpload:
+    """Resultaat van een gestreamde upload"""
+
+    def __init__(self, path: str, filename: str, sha256: str, size: int,
+                 fields: Dict[str, str], page_count_hint: Optional[int]):
+        self.path = path
+        self.filename = filename
+        self.sha256 = sha256
+        self.size = size
+        self.fields = fields
+        self.page_count_hint = page_count_hint
+
+
+class PDFUploadReceiver:
+    """Ontvang een multipart-upload in stukken direct op schijf
+
+    Het PDF wordt tijdens het ontvangen gehasht en gecontroleerd. Velden
+    die vóór het bestand staan worden meteen gevalideerd via
+    validate(fields, page_count); page_count is None zolang het aantal
+    pagina's onbekend is. Bij een gelineariseerd PDF is dat al na de
+    eerste kilobytes bekend, zodat ongeldige bereiken worden afgewezen
+    voordat de rest van het bestand binnen is. validate ziet alleen de
+    velden die al binnen zijn; velden na het bestand ontbreken dan nog.
+
+    Met file_optional=True mag het bestand ontbreken (bijvoorbeeld als
+    het formulier naar een eerdere upload verwijst); path is dan None.
+    Een bestand groter dan max_size bytes wordt tijdens het ontvangen
+    afgewezen met 413.
+    """
+
+    def __init__(self, dest_path: str, file_field: str = 'pdf_file',
+                 validate: Callable[[Dict[str, str], Optional[int]], None] = None,
+                 allowed_file: Callable[[str], bool] = None,
+                 chunk_size: int = 64 * 1024, max_form_memory_size: int = 1024 * 1024,
+                 file_optional: bool = False, max_size: int = None):
+        self.dest_path = dest_path
+        self.file_field = file_field
+        self.validate = validate
+        self.allowed_file = allowed_file
+        self.chunk_size = chunk_size
+        self.max_form_memory_size = max_form_memory_size
+        self.file_optional = file_optional
+        self.max_size = max_size
+
+    def receive(self, stream, content_type: str) -> StreamedUpload:
+        mimetype, options = parse_options_header(content_type or '')
+        if mimetype != 'multipart/form-data' or 'boundary' not in options:
+            raise UploadError('Er is geen bestand geüpload')
+
+        decoder = MultipartDecoder(
+            options['boundary'].encode('latin-1'), self.max_form_memory_size)
+
+        self._fields = {}
+        self._field_name = None
+        self._field_data = bytearray()
+        # Alle velden samen blijven onder max_form_memory_size
+        self._field_bytes = 0
+        self._file = None
+        self._filename = None
+        self._head = bytearray()
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._page_count = None
+        self._file_done = False
+
+        try:
+            finished = False
+            while not finished:
+                chunk = stream.read(self.chunk_size)
+                decoder.receive_data(chunk or None)
+                event = decoder.next_event()
+                while not isinstance(event, NeedData):
+                    if isinstance(event, Epilogue):
+                        finished = True
+                        break
+                    self._handle(event)
+                    event = decoder.next_event()
+                if not chunk and not finished:
+                    raise UploadError('De upload is onvolledig ontvangen')
+        except RequestEntityTooLarge as e:
+            # De decoder buffert een deel tot max_form_memory_size
+            raise UploadError('Een deel van de upload is te groot', 413) from e
+        except ValueError as e:
+            raise UploadError(str(e)) from e
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+        if not self._file_done:
+            if self.file_optional and self._filename is None:
+                return StreamedUpload(None, None, None, 0, self._fields, None)
+            raise UploadError('Er is geen bestand geüpload')
+
+        return StreamedUpload(self.dest_path, self._filename, self._digest.hexdigest(),
+                              self._size, self._fields, self._page_count)
+
+    def _handle(self, event):
+        if isinstance(event, File):
+            if event.name != self.file_field:
+                raise UploadError(f"Onverwacht bestand in het formulier: {event.name}")
+            if self._filename is not None:
+                # Een tweede bestand zou het eerste op schijf overschrijven
+                raise UploadError('Er kan maar één bestand tegelijk worden geüpload')
+            if not event.filename:
+                raise UploadError('Er is geen bestand geselecteerd')
+            if self.allowed_file and not self.allowed_file(event.filename):
+                raise UploadError('Niet-toegestaan bestandstype')
+            self._filename = event.filename
+            self._file = open(self.dest_path, 'wb')
+        elif isinstance(event, Field):
+            self._field_name = event.name
+            self._field_data = bytearray()
+        elif isinstance(event, Data):
+            if self._file is not None:
+                self._write_file_data(event.data)
+                if not event.more_data:
+                    self._finish_file()
+            elif self._field_name is not None:
+                self._field_data += event.data
+                self._field_bytes += len(event.data)
+                if self._field_bytes > self.max_form_memory_size:
+                    raise UploadError('De formuliervelden zijn te groot', 413)
+                if not event.more_data:
+                    self._finish_field()
+
+    def _write_file_data(self, data: bytes):
+        self._size += len(data)
+        if self.max_size and self._size > self.max_size:
+            raise UploadError(
+                f"Het bestand is groter dan {self.max_size // (1024 * 1024)} MB", 413)
+        self._file.write(data)
+        self._digest.update(data)
+
+        if len(self._head) < LINEARIZED_WINDOW:
+            previous = len(self._head)
+            self._head += data[:LINEARIZED_WINDOW - previous]
+            if previous < PDF_HEADER_WINDOW <= len(self._head):
+                self._check_header()
+            if self._page_count is None:
+                match = LINEARIZED_PAGE_COUNT.search(self._head)
+                if match:
+                    self._page_count = int(match.group(1))
+                    self._run_validation()
+
+    def _finish_file(self):
+        if len(self._head) < PDF_HEADER_WINDOW:
+            self._check_header()
+        self._file.close()
+        self._file = None
+        self._file_done = True
+
+    def _finish_field(self):
+        self._fields[self._field_name] = self._field_data.decode(
+            'utf-8', errors='replace')
+        self._field_name = None
+        self._run_validation()
+
+    def _check_header(self):
+        if b'%PDF-' not in bytes(self._head[:PDF_HEADER_WINDOW]):
+            raise UploadError('Het bestand is geen geldig PDF-bestand')
+
+    def _run_validation(self):
+        if self.validate:
+            self.validate(self._fields, self._page_count)
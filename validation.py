@@ -0,0 +1,74 @@
+import re
+
+
+def validate_year(year):
+    """Jaarwaarde controleren"""
+    if not year:
+        return False, "Voer een geldig jaar in"
+    if not re.match(r'^\d{4}$', year):
+        return False, "Het jaar moet uit 4 cijfers bestaan (bijvoorbeeld: 2024)"
+    return True, ""
+
+
+def validate_number(number):
+    """Valideer de getalwaarde"""
+    if not number:
+        return False, "Voer een geldig nummer in"
+    if not re.match(r'^\d{1,2}$', number):
+        return False, "Het nummer moet uit 1 of 2 cijfers bestaan (bijvoorbeeld: 1 of 01)"
+    return True, ""
+
+
+def process_ranges(ranges_str, max_pages):
+    """Paginabereiken verwerken"""
+    if not ranges_str:
+        return [[i + 1 for i in range(max_pages)]]
+
+    try:
+        ranges = []
+        parts = ranges_str.split(',')
+        for part in parts:
+            if '-' in part:
+                start, end = map(int, part.split('-'))
+                if start > end or start < 1 or end > max_pages:
+                    raise ValueError
+                ranges.append(list(range(start, end + 1)))
+            else:
+                page = int(part)
+                if page < 1 or page > max_pages:
+                    raise ValueError
+                ranges.append([page])
+        return ranges
+    except ValueError:
+        raise ValueError(
+            "Ongeldige paginabereiken. Gebruik het formaat: 1-3,4,5-6")
+
+
+def process_remove_pages(remove_str, max_pages):
+    """Te verwijderen procespagina's"""
+    if not remove_str:
+        return []
+
+    try:
+        pages = [int(x.strip()) for x in remove_str.split(',') if x.strip()]
+        if any(p < 1 or p > max_pages for p in pages):
+            raise ValueError
+        return pages
+    except ValueError:
+        raise ValueError(
+            "Ongeldige pagina's om te verwijderen. Gebruik komma's om pagina's te scheiden")
+
+
+def process_merge_indices(merge_str):
+    """Samengevoegde indexen verwerken"""
+    if not merge_str:
+        return None
+
+    try:
+        indices = [int(x.strip()) for x in merge_str.split(',') if x.strip()]
+        if len(indices) < 2:
+            raise ValueError
+        return indices
+    except ValueError:
+        raise ValueError(
+            "Ongeldige samenvoegingsindices. Gebruik komma's om artikelen te scheiden")
@@ -0,0 +1,353 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class Task:
+    """Eén geclaimde taak: payload plus het hoeveelste poging dit is"""
+
+    def __init__(self, task_id: int, batch: str, payload: Dict, attempt: int):
+        self.id = task_id
+        self.batch = batch
+        self.payload = payload
+        self.attempt = attempt
+
+
+class WorkQueue(ABC):
+    """Gedeelde wachtrij voor artikeltaken
+
+    Een verwerking publiceert haar artikelen als taken onder één batch;
+    workers (queue_worker.py) claimen een taak met een lease, verlengen die
+    zolang ze bezig zijn en melden het resultaat. Een taak waarvan de lease
+    verloopt (de worker is gecrasht) wordt opnieuw uitgegeven, tot
+    max_attempts pogingen. Een backend implementeert deze methoden.
+    """
+
+    @abstractmethod
+    def publish(self, batch: str, payload: Dict) -> int:
+        """Zet een taak in de rij onder batch; geeft het taak-id"""
+
+    @abstractmethod
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Task]:
+        """Neem de oudste open of verlopen taak met een lease; None als er geen is"""
+
+    @abstractmethod
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float) -> bool:
+        """Verleng de lease; False als de taak niet meer van deze worker is"""
+
+    @abstractmethod
+    def complete(self, task_id: int, worker: str, result: Dict) -> bool:
+        """Meld het resultaat; False als de taak niet meer van deze worker is"""
+
+    @abstractmethod
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Geef de taak terug voor een nieuwe poging, of laat hem mislukken"""
+
+    @abstractmethod
+    def finished(self, task_ids: List[int]) -> List[Dict]:
+        """Afgeronde taken uit task_ids: id, status ('done'/'failed'), result, error"""
+
+    @abstractmethod
+    def expire_without_workers(self, batch: str, max_idle: float) -> int:
+        """Laat open taken mislukken als geen worker zich max_idle seconden meldde
+
+        Een drukke rij is geen reden: zolang er workers claimen of hun lease
+        verlengen, blijven taken staan, hoe lang ze ook wachten.
+        """
+
+    @abstractmethod
+    def forget(self, batch: str):
+        """Verwijder alle taken van een batch; resten van een batch worden overgeslagen"""
+
+    @abstractmethod
+    def purge(self, max_age: float) -> int:
+        """Verwijder taken die langer dan max_age seconden niet gewijzigd zijn"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Wachtrij in één SQLite-bestand, zonder aparte broker
+
+    Alle workers en verwerkingen die bij het bestand kunnen, delen de rij;
+    op meerdere hosts moet het op gedeelde opslag met werkende file-locks
+    staan. Claimen gebeurt in een IMMEDIATE-transactie, zodat twee workers
+    nooit dezelfde taak krijgen. Geen WAL: dat werkt niet op netwerkschijven.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._create_schema()
+
+    def __repr__(self):
+        return f"sqlite:///{self.path}"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Eén verbinding per thread; transacties worden expliciet gestart"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        # Eigen verbinding, om niets open te laten staan vóór een fork
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS tasks (
+                        id INTEGER PRIMARY KEY,
+                        batch TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker TEXT,
+                        lease_until REAL,
+                        result TEXT,
+                        error TEXT,
+                        created REAL NOT NULL,
+                        updated REAL NOT NULL
+                    )""")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id)")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS tasks_batch ON tasks (batch)")
+                # Laatste teken van leven per worker (claimpoging of heartbeat)
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS workers (
+                        name TEXT PRIMARY KEY,
+                        last_seen REAL NOT NULL
+                    )""")
+        finally:
+            connection.close()
+
+    def _transaction(self):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        return _Transaction(connection)
+
+    def publish(self, batch: str, payload: Dict) -> int:
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO tasks (batch, payload, status, created, updated) "
+                "VALUES (?, ?, 'queued', ?, ?)", (batch, json.dumps(payload), now, now))
+            return cursor.lastrowid
+
+    @staticmethod
+    def _seen(connection: sqlite3.Connection, worker: str, now: float):
+        connection.execute(
+            "INSERT OR REPLACE INTO workers (name, last_seen) VALUES (?, ?)", (worker, now))
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Task]:
+        now = time.time()
+        with self._transaction() as connection:
+            self._seen(connection, worker, now)
+            while True:
+                row = connection.execute(
+                    "SELECT id, batch, payload, status, attempts FROM tasks "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is None:
+                    return None
+                if row['attempts'] >= self.max_attempts:
+                    # Verlopen lease en geen pogingen meer over
+                    connection.execute(
+                        "UPDATE tasks SET status = 'failed', worker = NULL, updated = ?, "
+                        "error = ? WHERE id = ?",
+                        (now, f"Worker reageert niet meer na {row['attempts']} pogingen",
+                         row['id']))
+                    continue
+                connection.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE id = ?",
+                    (worker, now + lease_seconds, now, row['id']))
+                return Task(row['id'], row['batch'], json.loads(row['payload']),
+                            row['attempts'] + 1)
+
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            self._seen(connection, worker, now)
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_until = ?, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, task_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: Dict) -> bool:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_until = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), task_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Geef de taak terug voor een nieuwe poging, of laat hem mislukken"""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+                "worker = NULL, lease_until = NULL, error = ?, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (self.max_attempts, error, time.time(), task_id, worker))
+            return cursor.rowcount == 1
+
+    def finished(self, task_ids: List[int]) -> List[Dict]:
+        rows = []
+        connection = self._connect()
+        # Binnen de limiet van SQLite voor het aantal parameters blijven
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            rows += connection.execute(
+                f"SELECT id, status, result, error FROM tasks WHERE id IN "
+                f"({','.join('?' * len(chunk))}) AND status IN ('done', 'failed')",
+                chunk).fetchall()
+        return [{'id': row['id'], 'status': row['status'],
+                 'result': json.loads(row['result']) if row['result'] else None,
+                 'error': row['error']} for row in rows]
+
+    def expire_without_workers(self, batch: str, max_idle: float) -> int:
+        now = time.time()
+        with self._transaction() as connection:
+            last_seen = connection.execute(
+                "SELECT MAX(last_seen) FROM workers").fetchone()[0]
+            if last_seen is not None and last_seen >= now - max_idle:
+                return 0
+            # Ook lopende taken met een verlopen lease: niemand pakt ze nog op
+            cursor = connection.execute(
+                "UPDATE tasks SET status = 'failed', worker = NULL, updated = ?, "
+                "error = 'Er is geen actieve worker voor de werkwachtrij' "
+                "WHERE batch = ? AND created < ? AND (status = 'queued' "
+                "OR (status = 'running' AND lease_until < ?))",
+                (now, batch, now - max_idle, now))
+            return cursor.rowcount
+
+    def forget(self, batch: str):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM tasks WHERE batch = ?", (batch,))
+
+    def purge(self, max_age: float) -> int:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "DELETE FROM tasks WHERE status != 'running' AND updated < ?",
+                (time.time() - max_age,))
+            connection.execute(
+                "DELETE FROM workers WHERE last_seen < ?", (time.time() - max_age,))
+            return cursor.rowcount
+
+
+class _Transaction:
+    """COMMIT bij succes, ROLLBACK bij een fout"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+WORK_QUEUES = {
+    'sqlite': SQLiteWorkQueue,
+}
+
+
+def create_work_queue(url: str) -> WorkQueue:
+    """Maak een wachtrij uit een URL, bijvoorbeeld sqlite:////gedeeld/queue.db"""
+    scheme, separator, location = url.partition('://')
+    if not separator:
+        # Een kaal pad is een SQLite-bestand
+        return SQLiteWorkQueue(url)
+    if scheme not in WORK_QUEUES:
+        raise ValueError(f"Onbekende werkwachtrij: {scheme}")
+    if scheme == 'sqlite' and location.startswith('/'):
+        # sqlite:///relatief.db en sqlite:////absoluut.db, zoals bij SQLAlchemy
+        location = location[1:]
+    return WORK_QUEUES[scheme](location)
+
+
+class QueueExecutor:
+    """Executor die taken via een WorkQueue laat uitvoeren
+
+    submit(payload) publiceert een taak en geeft een Future, die een
+    pollthread afrondt zodra een worker het resultaat heeft gemeld. Zo past
+    de wachtrij in dezelfde lus als de thread- en procespool. Meldt zich
+    worker_timeout seconden geen enkele worker, dan mislukken de open
+    taken in plaats van eeuwig te wachten. Bij het verlaten van het
+    with-blok wordt de batch uit de wachtrij verwijderd; taken die dan nog
+    niet begonnen zijn, worden niet meer uitgevoerd.
+    """
+
+    def __init__(self, queue: WorkQueue, poll_interval: float = 0.5,
+                 worker_timeout: float = 300):
+        self.queue = queue
+        self.batch = uuid.uuid4().hex
+        self.poll_interval = poll_interval
+        self.worker_timeout = worker_timeout
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, payload: Dict) -> Future:
+        future = Future()
+        future.set_running_or_notify_cancel()
+        task_id = self.queue.publish(self.batch, payload)
+        with self._lock:
+            self._futures[task_id] = future
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._poll, name='queue-poll', daemon=True)
+                self._thread.start()
+        return future
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                task_ids = list(self._futures)
+            if not task_ids:
+                continue
+            try:
+                self.queue.expire_without_workers(self.batch, self.worker_timeout)
+                finished = self.queue.finished(task_ids)
+            except Exception:
+                # Tijdelijk niet bereikbaar (bijvoorbeeld vergrendeld); later opnieuw
+                continue
+            for task in finished:
+                with self._lock:
+                    future = self._futures.pop(task['id'], None)
+                if future is None:
+                    continue
+                if task['status'] == 'done':
+                    result = task['result']
+                    future.set_result((result['outputs'], result['timings'], result['pdf_report']))
+                else:
+                    future.set_exception(RuntimeError(task['error'] or 'Taak mislukt'))
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            pending, self._futures = list(self._futures.values()), {}
+        for future in pending:
+            future.set_exception(RuntimeError("De verwerking is afgebroken"))
+        self.queue.forget(self.batch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
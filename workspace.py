@@ -0,0 +1,167 @@
+import json
+import os
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+
+WORKSPACE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class WorkspaceQuotaError(Exception):
+    """De werkmap van een verwerking is groter geworden dan het quotum"""
+
+
+def _process_start(pid: int) -> Optional[float]:
+    """Starttijd van een proces via /proc (Linux); None als die onbekend is"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as f:
+            ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat', encoding='utf-8') as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+    return boot + ticks / os.sysconf('SC_CLK_TCK')
+
+
+def owner_alive(pid: int, created: float) -> bool:
+    """Bestaat het proces dat de werkmap op tijdstip created aanmaakte nog?"""
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) beëindigt op Windows het proces; daar telt alleen de leeftijd
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # Na een herstart van de container kan hetzelfde pid een nieuw proces zijn
+    started = _process_start(pid)
+    return started is None or started <= created + 1
+
+
+class Workspace:
+    """Werkmap van één verwerking: invoer, tussenbestanden, log en ZIP
+
+    Alles van de verwerking staat onder path, zodat remove() de hele
+    verwerking in één keer opruimt, ook na een fout.
+    """
+
+    def __init__(self, path: Path, quota_bytes: int = 0):
+        self.path = path
+        self.quota_bytes = quota_bytes
+
+    def folder(self, name: str) -> Path:
+        folder = self.path / name
+        folder.mkdir(parents=True, exist_ok=True)
+        return folder
+
+    def usage(self) -> int:
+        """Aantal bytes in de werkmap"""
+        total = 0
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.stat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def check_quota(self):
+        """WorkspaceQuotaError als de werkmap groter is dan het quotum"""
+        if not self.quota_bytes:
+            return
+        usage = self.usage()
+        if usage > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"De werkmap gebruikt {usage / (1024 * 1024):.1f} MB, meer dan het "
+                f"quotum van {self.quota_bytes / (1024 * 1024):.1f} MB per verwerking")
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.remove()
+
+
+class WorkspaceManager:
+    """Maakt werkmappen onder één root en ruimt achtergebleven mappen op
+
+    De root kan op een RAM-schijf staan (tmpfs, /dev/shm), zodat
+    tussentijdse PDF's en renders niet via de schijf gaan. Elke werkmap
+    krijgt een eigenaarsbestand met host en pid; als dat proces niet meer
+    bestaat (een gecrashte worker) of de map ouder is dan max_age, wordt de
+    map bij het opstarten en daarna hooguit elke sweep_interval seconden
+    verwijderd.
+    """
+
+    OWNER = '.owner.json'
+    # Een map zonder eigenaarsbestand kan net aangemaakt zijn
+    OWNER_GRACE = 60
+
+    def __init__(self, root: str = None, quota_bytes: int = 0, max_age: int = 21600,
+                 sweep_interval: int = 300):
+        self.root = Path(root or os.path.join(tempfile.gettempdir(), 'museum_work'))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._host = socket.gethostname()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.swept = self.sweep_orphans()
+
+    def create(self) -> Workspace:
+        """Nieuwe, lege werkmap voor één verwerking"""
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep_orphans()
+        path = self.root / uuid.uuid4().hex
+        path.mkdir()
+        with open(path / self.OWNER, 'w', encoding='utf-8') as f:
+            json.dump({'host': self._host, 'pid': os.getpid(), 'created': time.time()}, f)
+        return Workspace(path, self.quota_bytes)
+
+    def _owner(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path / self.OWNER, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_orphan(self, path: Path, now: float = None) -> bool:
+        now = now or time.time()
+        owner = self._owner(path)
+        if owner is None:
+            try:
+                return now - path.stat().st_mtime > self.OWNER_GRACE
+            except OSError:
+                return False
+        if now - owner.get('created', 0) > self.max_age:
+            return True
+        # Een pid zegt alleen iets op dezelfde host (een gedeelde root kan van
+        # meerdere containers zijn)
+        return (owner.get('host') == self._host
+                and not owner_alive(owner.get('pid', 0), owner.get('created', 0)))
+
+    def sweep_orphans(self) -> int:
+        """Verwijder werkmappen van verdwenen processen; geeft het aantal terug"""
+        with self._lock:
+            self._last_sweep = now = time.time()
+            removed = 0
+            for path in self.root.iterdir():
+                if not path.is_dir() or not WORKSPACE_ID_PATTERN.match(path.name):
+                    continue
+                if self.is_orphan(path, now):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            return removed